@@ -0,0 +1,78 @@
+# Файл: benchmarks/bench_batch.py
+"""
+Массовое редактирование: N отдельных запросов POST /api/task/{id}/toggle
+против одного POST /api/batch/{workspace_id}/{telegram_id}.
+
+Запросы идут через TestClient во временную базу, так что сеть не
+учитывается — разница только в обработке запросов и транзакциях.
+
+    python benchmarks/bench_batch.py [--tasks 200] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+# Сотни запросов подряд от одного клиента — без ограничения частоты
+os.environ.setdefault("RATE_LIMIT_USER_RATE", "0")
+os.environ.setdefault("RATE_LIMIT_WORKSPACE_RATE", "0")
+
+from fastapi.testclient import TestClient
+
+from bot import database as db
+from bot.api import api_app, router
+from bot.auth import issue_token
+
+
+async def seed(count: int):
+    async with db.transaction():
+        user = await db.create_user(1, "bench", "Benchmark")
+        workspace_id = await db.create_workspace("Bench", user)
+        task_ids = [
+            await db.create_task(workspace_id, f"Задача {i}", created_by=user)
+            for i in range(count)
+        ]
+    return user, workspace_id, task_ids
+
+
+def main(count: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DATABASE_PATH = os.path.join(tmp, "bench.db")
+        asyncio.run(db.init_database())
+        user_id, workspace_id, task_ids = asyncio.run(seed(count))
+
+        api_app.include_router(router)
+        client = TestClient(api_app)
+        client.headers["Authorization"] = f"Bearer {issue_token(user_id, 1)[0]}"
+
+        single = batch = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for task_id in task_ids:
+                client.post(f"/api/task/{task_id}/toggle").raise_for_status()
+            single = min(single, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            client.post(
+                f"/api/batch/{workspace_id}/1",
+                json={"ops": [{"op": "toggle", "task_id": task_id} for task_id in task_ids]},
+            ).raise_for_status()
+            batch = min(batch, time.perf_counter() - started)
+
+        print(
+            f"{count} задач: по одной {single * 1000:8.1f} мс   "
+            f"batch {batch * 1000:7.1f} мс   x{single / batch:5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.tasks, args.repeat)
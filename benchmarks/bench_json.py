@@ -0,0 +1,90 @@
+# Файл: benchmarks/bench_json.py
+"""
+CPU на сериализацию ответа доски: jsonable_encoder + json против FastJSONResponse.
+
+    python benchmarks/bench_json.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from bot.models import Member, Task, Workspace
+from bot.responses import FastJSONResponse, orjson
+
+
+def make_board(count: int) -> dict:
+    """Ответ GET /api/workspace/{id} с count задачами"""
+    workspace = Workspace(1, "Команда", "Описание", 1, False, "invite", count, "2026-01-01 00:00:00")
+    members = [
+        Member(i, 1000 + i, f"user{i}", f"Пользователь {i}", f"user{i}", None, "2026-01-01 00:00:00",
+               role="member", can_edit_tasks=1, can_delete_tasks=0, can_assign_tasks=0,
+               can_manage_members=0, joined_at="2026-01-01 00:00:00")
+        for i in range(1, 11)
+    ]
+    tasks = [
+        Task(i, 1, 1, 1 + i % 3, f"Задача {i}", "Описание задачи " * 4,
+             ("low", "medium", "high")[i % 3], "done" if i % 4 == 0 else "todo",
+             f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}" if i % 2 else None, None,
+             1, 1 + i % 10, f"user{1 + i % 10}", "2026-01-01 00:00:00", "2026-01-02 00:00:00", "V")
+        for i in range(count)
+    ]
+    stages = [
+        {"id": stage_id, "funnel_id": 1, "name": name, "position": stage_id - 1, "color": "#95a5a6",
+         "tasks": [t for t in tasks if t.stage_id == stage_id]}
+        for stage_id, name in ((1, "📥 Новые"), (2, "🔄 В работе"), (3, "✅ Готово"))
+    ]
+    return {
+        "workspace": workspace,
+        "funnels": [{"id": 1, "workspace_id": 1, "name": "Основная", "stages": stages}],
+        "tasks": tasks,
+        "members": members,
+    }
+
+
+def generic_path(payload: dict) -> bytes:
+    """Что делал FastAPI для dict: jsonable_encoder, затем JSONResponse"""
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def fast_path(payload: dict) -> bytes:
+    return FastJSONResponse(payload).body
+
+
+def cpu_time(fn, payload: dict, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn(payload)
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def main(sizes, repeat: int):
+    print(f"Сериализатор: {'orjson ' + orjson.__version__ if orjson else 'json (stdlib)'}")
+    for count in sizes:
+        payload = make_board(count)
+        size = len(fast_path(payload))
+        generic = cpu_time(generic_path, payload, repeat)
+        fast = cpu_time(fast_path, payload, repeat)
+        print(
+            f"{count:>7} задач ({size / 1024 / 1024:5.1f} МБ): "
+            f"jsonable_encoder+json {generic * 1000:8.1f} мс   "
+            f"FastJSONResponse {fast * 1000:7.1f} мс   "
+            f"x{generic / fast:5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,101 @@
+# Файл: benchmarks/bench_models.py
+"""
+Записи со __slots__ против dict(row) на доске из 100k задач.
+
+    python benchmarks/bench_models.py [--tasks 100000] [--repeat 5]
+
+Меряет время чтения доски, память под результат и сериализацию в JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+import aiosqlite
+
+from bot import database as db
+from bot.models import Record
+
+
+async def seed(count: int) -> int:
+    await db.init_database()
+    async with db.transaction():
+        user_id = await db.create_user(1, "bench", "Bench")
+        workspace_id = await db.create_workspace("Bench", user_id)
+    async with aiosqlite.connect(db.DATABASE_PATH) as conn:
+        await conn.executemany(
+            "INSERT INTO tasks (workspace_id, title, description, priority, status, due_date, created_by) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (workspace_id, f"Задача {i}", "Описание задачи " * 4,
+                 ("low", "medium", "high")[i % 3], "done" if i % 4 == 0 else "todo",
+                 f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d}" if i % 2 else None, user_id)
+                for i in range(count)
+            )
+        )
+        await conn.commit()
+    return workspace_id
+
+
+async def load_dicts(workspace_id: int):
+    """Прежний путь: aiosqlite.Row + dict(row)"""
+    async with aiosqlite.connect(db.DATABASE_PATH) as conn:
+        conn.row_factory = aiosqlite.Row
+        cursor = await conn.execute(
+            "SELECT * FROM tasks WHERE workspace_id = ? ORDER BY priority DESC, created_at DESC",
+            (workspace_id,)
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def load_records(workspace_id: int):
+    return await db.get_tasks(workspace_id)
+
+
+async def measure(name: str, load, workspace_id: int, repeat: int, default=None):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await load(workspace_id)
+        timings.append(time.perf_counter() - started)
+    del rows
+
+    tracemalloc.start()
+    rows = await load(workspace_id)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    payload = json.dumps(rows, ensure_ascii=False, default=default)
+    dump_time = time.perf_counter() - started
+
+    print(
+        f"{name:<8} чтение {min(timings) * 1000:8.1f} мс   "
+        f"память {retained / 1024 / 1024:7.1f} МБ ({retained / len(rows):5.0f} Б/строку)   "
+        f"json {dump_time * 1000:7.1f} мс ({len(payload) / 1024 / 1024:.1f} МБ)"
+    )
+
+
+async def main(count: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DATABASE_PATH = os.path.join(tmp, "bench.db")
+        workspace_id = await seed(count)
+        print(f"Задач на доске: {count}")
+        await measure("dict", load_dicts, workspace_id, repeat)
+        await measure("records", load_records, workspace_id, repeat, default=Record.to_dict)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.repeat))
@@ -0,0 +1,99 @@
+# Файл: benchmarks/bench_runtime.py
+"""
+Профили рантайма: `python -m bot.main` с RUNTIME_PROFILE=standard
+(asyncio, h11) и fast (uvloop, httptools, настройки сервера) на
+временной базе. Нагрузка — GET /api/workspace/{id} с параллельными
+запросами по keep-alive; печатает p50/p99 задержки и запросы в секунду.
+
+    python benchmarks/bench_runtime.py [--profiles standard fast] [--seconds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_workers import ROOT, free_port, seed, wait_ready
+
+import httpx
+
+from bot import database as db
+from bot.auth import issue_token
+from bot.runtime import describe
+
+
+async def _load(url: str, token: str, seconds: float, concurrency: int):
+    latencies = []
+    deadline = time.monotonic() + seconds
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(headers=headers, limits=limits) as client:
+        async def worker():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.get(url)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def run(profile: str, db_path: str, url_path: str, token: str, args):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        RUNTIME_PROFILE=profile,
+        WEB_CONCURRENCY="1",
+        DATABASE_PATH=db_path,
+        APP_BASE_URL="",
+        BOT_MODE="webhook",
+        RATE_LIMIT_USER_RATE="0",
+        RATE_LIMIT_WORKSPACE_RATE="0",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "bot.main"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(base_url)
+        url = f"{base_url}{url_path}"
+        asyncio.run(_load(url, token, 1.0, args.concurrency))
+        return asyncio.run(_load(url, token, args.seconds, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db.DATABASE_PATH = db_path
+        asyncio.run(db.init_database())
+        user_id, workspace_id = asyncio.run(seed(args.tasks))
+        token = issue_token(user_id, 1, ttl=3600)[0]
+
+        for profile in args.profiles:
+            latencies = run(profile, db_path, f"/api/workspace/{workspace_id}", token, args)
+            percentiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{describe(profile):32s}  p50 {percentiles[49] * 1000:6.2f} мс   "
+                f"p99 {percentiles[98] * 1000:6.2f} мс   {len(latencies) / args.seconds:7.0f} запросов/с"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", choices=["standard", "fast"], default=["standard", "fast"])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16, help="запросов в полёте")
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+# Файл: benchmarks/bench_updates.py
+"""
+Обработка апдейтов: по одному, с ответом Telegram после обработки (как
+было у webhook), против очереди UpdateQueue с пулом обработчиков.
+Обработчик ждёт --delay мс — имитация запроса к Bot API. Апдейты
+приходят от --chats разных чатов; печатает время до ответа на апдейт и
+время обработки всей пачки.
+
+    python benchmarks/bench_updates.py [--updates 500] [--chats 50] [--workers 1 8 32]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Chat, Message, Update, User
+
+from bot.updates import UpdateQueue
+
+
+def make_updates(count: int, chats: int):
+    return [
+        Update(
+            update_id=i,
+            message=Message(
+                message_id=i,
+                date=datetime.now(),
+                chat=Chat(id=i % chats + 1, type="private"),
+                from_user=User(id=i % chats + 1, is_bot=False, first_name="Bench"),
+                text="/start",
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def make_dispatcher(delay: float):
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message):
+        await asyncio.sleep(delay)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def sequential(bot: Bot, dp: Dispatcher, updates):
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    total = time.perf_counter() - started
+    return total / len(updates), total
+
+
+async def queued(bot: Bot, dp: Dispatcher, updates, workers: int):
+    queue = UpdateQueue(dp, bot, workers=workers, maxsize=len(updates))
+    queue.start()
+    started = time.perf_counter()
+    for update in updates:
+        await queue.put(update)
+    ack = (time.perf_counter() - started) / len(updates)
+    await queue.stop(timeout=600)
+    return ack, time.perf_counter() - started
+
+
+async def main(args):
+    bot = Bot(token=os.environ["BOT_TOKEN"])
+    dp = make_dispatcher(args.delay / 1000)
+    updates = make_updates(args.updates, args.chats)
+
+    ack, total = await sequential(bot, dp, updates)
+    print(f"{'по одному':14s}  ответ {ack * 1000:8.3f} мс   всё {total:6.2f} с")
+    for workers in args.workers:
+        ack, total = await queued(bot, dp, updates, workers)
+        print(f"{f'очередь x{workers}':14s}  ответ {ack * 1000:8.3f} мс   всё {total:6.2f} с")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=20.0, help="мс на обработку апдейта")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    asyncio.run(main(parser.parse_args()))
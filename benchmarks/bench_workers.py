@@ -0,0 +1,138 @@
+# Файл: benchmarks/bench_workers.py
+"""
+Масштабирование по числу воркеров: `python -m bot.main` с
+WEB_CONCURRENCY = 1, 2, 4 ... на временной базе, нагрузка — GET
+/api/workspace/{id} из нескольких процессов-клиентов с параллельными
+запросами. Печатает запросы в секунду для каждого числа воркеров.
+Рост виден, только если ядер хватает и воркерам, и клиентам.
+
+    python benchmarks/bench_workers.py [--workers 1 2 4] [--seconds 5]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+
+import httpx
+
+from bot import database as db
+from bot.auth import issue_token
+
+
+async def seed(tasks: int):
+    async with db.transaction():
+        user = await db.create_user(1, "bench", "Benchmark")
+        workspace_id = await db.create_workspace("Bench", user)
+        for i in range(tasks):
+            await db.create_task(workspace_id, f"Задача {i}", created_by=user)
+    return user, workspace_id
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+
+async def _load(url: str, token: str, seconds: float, concurrency: int) -> int:
+    done = 0
+    deadline = time.monotonic() + seconds
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(headers=headers, limits=limits) as client:
+        async def worker():
+            nonlocal done
+            while time.monotonic() < deadline:
+                response = await client.get(url)
+                response.raise_for_status()
+                done += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done
+
+
+def load(url: str, token: str, seconds: float, concurrency: int) -> int:
+    return asyncio.run(_load(url, token, seconds, concurrency))
+
+
+def run(workers: int, db_path: str, url_path: str, token: str, args) -> float:
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        DATABASE_PATH=db_path,
+        APP_BASE_URL="",
+        BOT_MODE="webhook",
+        RATE_LIMIT_USER_RATE="0",
+        RATE_LIMIT_WORKSPACE_RATE="0",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "bot.main"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_ready(base_url)
+        url = f"{base_url}{url_path}"
+        # Прогрев: каждый воркер успевает принять соединения и наполнить кэш
+        load(url, token, 1.0, args.concurrency)
+
+        with ProcessPoolExecutor(args.clients) as pool:
+            futures = [
+                pool.submit(load, url, token, args.seconds, args.concurrency)
+                for _ in range(args.clients)
+            ]
+            total = sum(future.result() for future in futures)
+        return total / args.seconds
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db.DATABASE_PATH = db_path
+        asyncio.run(db.init_database())
+        user_id, workspace_id = asyncio.run(seed(args.tasks))
+        token = issue_token(user_id, 1, ttl=3600)[0]
+
+        baseline = None
+        for workers in args.workers:
+            rps = run(workers, db_path, f"/api/workspace/{workspace_id}", token, args)
+            baseline = baseline or rps
+            print(f"воркеров: {workers:2d}   {rps:8.0f} запросов/с   x{rps / baseline:4.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=4, help="процессов-клиентов")
+    parser.add_argument("--concurrency", type=int, default=16, help="запросов в полёте на клиента")
+    main(parser.parse_args())
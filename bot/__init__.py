@@ -2,7 +2,7 @@
 Инициализация обработчиков
 """
 
-from bot.handlers import start, tasks, workspaces, reminders, comments
+from bot.handlers import start, tasks, workspaces, reminders, comments, search
 
 # Список всех роутеров
 routers = [
@@ -11,4 +11,5 @@ routers = [
     tasks.router,
     reminders.router,
     comments.router,
+    search.router,
 ]
@@ -3,23 +3,42 @@
 API для Mini App
 """
 
-from fastapi import FastAPI, HTTPException, APIRouter
+from fastapi import FastAPI, HTTPException, APIRouter, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+import asyncio
+import math
 import os
 import logging
 
 from bot import database as db
+from bot.loader import Loader, get_loader
+from bot.cache import TTLCache
+from bot.config import (
+    WEBAPP_INLINE_BOOTSTRAP,
+    RATE_LIMIT_USER_RATE, RATE_LIMIT_USER_BURST,
+    RATE_LIMIT_WORKSPACE_RATE, RATE_LIMIT_WORKSPACE_BURST,
+    RATE_LIMIT_MAX_KEYS, TRUSTED_PROXY_COUNT,
+)
+from bot.auth import Session, get_session, user_session, issue_token, validate_init_data, verify_uid
+from bot.idempotency import idempotent_write
+from bot.metrics import MetricsMiddleware
+from bot.models import Member
+from bot.tracing import TracingMiddleware
+from bot.ratelimit import RateLimiter, RateLimitMiddleware, TOO_MANY_REQUESTS
+from bot.responses import FastJSONResponse, dumps
+from bot.static import StaticAssets
 
 logger = logging.getLogger(__name__)
 
 # -------------------------------------------------------------
 # 1. ОСНОВНОЕ FASTAPI ПРИЛОЖЕНИЕ
 # -------------------------------------------------------------
-api_app = FastAPI(title="CRM Mini App")
+api_app = FastAPI(title="CRM Mini App", default_response_class=FastJSONResponse)
 
 api_app.add_middleware(
     CORSMiddleware,
@@ -29,13 +48,38 @@ api_app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие JSON-ответов API; статика приходит уже сжатой и не трогается
+api_app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Частота запросов на пользователя; добавлено последним, поэтому
+# срабатывает первым и отказывает до любой работы. Ведро пространства
+# списывается в workspace_member — после проверки сессии и участия
+user_limiter = RateLimiter(RATE_LIMIT_USER_RATE, RATE_LIMIT_USER_BURST, RATE_LIMIT_MAX_KEYS)
+workspace_limiter = RateLimiter(RATE_LIMIT_WORKSPACE_RATE, RATE_LIMIT_WORKSPACE_BURST, RATE_LIMIT_MAX_KEYS)
+
+api_app.add_middleware(
+    RateLimitMiddleware,
+    user_limiter=user_limiter,
+    trusted_proxies=TRUSTED_PROXY_COUNT,
+)
+
+# Время запросов по маршрутам — снаружи всех, чтобы учесть и отказы 429
+api_app.add_middleware(MetricsMiddleware)
+
+# Корневой спан трассировки на запрос (при TRACE_SAMPLE_RATE > 0)
+api_app.add_middleware(TracingMiddleware)
+
 # -------------------------------------------------------------
 # 2. РОУТЕР ДЛЯ API ЭНДПОИНТОВ
 # -------------------------------------------------------------
-router = APIRouter(prefix="/api")
+# Все эндпоинты /api/* требуют сессию; выдаёт её POST /api/session
+router = APIRouter(prefix="/api", dependencies=[Depends(get_session)])
 
 WEBAPP_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "webapp")
 
+# Загружается при старте (bot.main), а при первом запросе — если старт пропущен
+static_assets = StaticAssets(WEBAPP_DIR)
+
 
 # ==================== ФУНКЦИЯ ОТПРАВКИ УВЕДОМЛЕНИЙ ====================
 
@@ -78,6 +122,22 @@ class TaskUpdate(BaseModel):
     assigned_username: Optional[str] = None
 
 
+class BatchOp(BaseModel):
+    op: str  # toggle | move | delete | update
+    task_id: int
+    stage_id: Optional[int] = None
+    after_id: Optional[int] = None  # move: поставить после этой задачи
+    fields: Optional[TaskUpdate] = None
+
+
+class BatchRequest(BaseModel):
+    ops: List[BatchOp]
+
+
+class SessionCreate(BaseModel):
+    init_data: str
+
+
 class MemberAdd(BaseModel):
     username: str
     role: str = "member"
@@ -114,76 +174,190 @@ class NoteUpdate(BaseModel):
 # ==================== СТРАНИЦЫ ====================
 
 @api_app.get("/", response_class=HTMLResponse)
-async def index():
-    filepath = os.path.join(WEBAPP_DIR, "index.html")
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
-    return HTMLResponse(content="<h1>Mini App</h1>")
+async def index(request: Request, uid: Optional[int] = None, exp: Optional[int] = None,
+                sig: Optional[str] = None):
+    asset = static_assets.get("index.html")
+    if not asset:
+        return HTMLResponse(content="<h1>Mini App</h1>")
+    
+    # Стартовые данные прямо в HTML — первый экран без дополнительного запроса
+    # uid из меню бота подписан вместе со сроком — чужой uid подставить нельзя,
+    # а старая ссылка из истории чата перестаёт действовать
+    if WEBAPP_INLINE_BOOTSTRAP and uid and verify_uid(uid, exp, sig):
+        data = await build_bootstrap(uid)
+        if data:
+            return HTMLResponse(
+                content=static_assets.render_index(dumps(data)),
+                headers={"Cache-Control": "private, no-store"}
+            )
+    
+    return static_assets.response(request, asset)
 
 
 @api_app.get("/style.css")
-async def get_css():
-    filepath = os.path.join(WEBAPP_DIR, "style.css")
-    if os.path.exists(filepath):
-        return FileResponse(filepath, media_type="text/css")
+async def get_css(request: Request):
+    asset = static_assets.get("style.css")
+    if asset:
+        return static_assets.response(request, asset)
     raise HTTPException(status_code=404)
 
 
 @api_app.get("/app.js")
-async def get_js():
-    filepath = os.path.join(WEBAPP_DIR, "app.js")
-    if os.path.exists(filepath):
-        return FileResponse(filepath, media_type="application/javascript")
+async def get_js(request: Request):
+    asset = static_assets.get("app.js")
+    if asset:
+        return static_assets.response(request, asset)
     raise HTTPException(status_code=404)
 
 
+@api_app.get("/assets/{filename}")
+async def get_asset(filename: str, request: Request):
+    """CSS и JS по адресу с хэшем содержимого — кэшируются навсегда"""
+    asset = static_assets.get(f"assets/{filename}")
+    if asset:
+        return static_assets.response(request, asset)
+    raise HTTPException(status_code=404)
+
+
+# ==================== СЕССИЯ ====================
+
+@api_app.post("/api/session")
+async def create_session(body: SessionCreate):
+    """
+    Проверяет initData Telegram WebApp и выдаёт токен сессии.
+    Пользователь, открывший Mini App без /start, регистрируется здесь же
+    """
+    try:
+        tg_user = validate_init_data(body.init_data)
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    
+    full_name = " ".join(filter(None, [tg_user.get("first_name"), tg_user.get("last_name")])) or None
+    user = await db.ensure_user(int(tg_user["id"]), tg_user.get("username"), full_name)
+    token, expires_at = issue_token(user.id, user.telegram_id)
+    return {"token": token, "expires_at": expires_at, "user": user}
+
+
+# ==================== ДОСТУП К ПРОСТРАНСТВУ ====================
+
+async def require_member(workspace_id: int, session: Session) -> Member:
+    """Участник пространства из сессии; 403 — если пользователь не участник"""
+    member = await db.get_workspace_member(workspace_id, session.user_id)
+    if not member:
+        raise HTTPException(status_code=403, detail="Нет доступа к пространству")
+    return member
+
+
+async def workspace_member(request: Request, session: Session = Depends(get_session),
+                           loader: Loader = Depends(get_loader)) -> Member:
+    """
+    Зависимость FastAPI: пространство объекта из адреса (workspace_id,
+    task_id, note_id или stage_id) и участник этого пространства из сессии.
+    404 — если объекта нет, 403 — если пользователь не участник, 429 —
+    если исчерпано ведро пространства
+    """
+    params = request.path_params
+    workspace_id = None
+    try:
+        if "workspace_id" in params:
+            workspace_id = int(params["workspace_id"])
+        elif "task_id" in params:
+            task = await loader.task(int(params["task_id"]))
+            workspace_id = task["workspace_id"] if task else None
+        elif "note_id" in params:
+            note = await db.get_note(int(params["note_id"]))
+            workspace_id = note["workspace_id"] if note else None
+        elif "stage_id" in params:
+            workspace_id = await db.get_stage_workspace_id(int(params["stage_id"]))
+    except ValueError:
+        pass
+    if workspace_id is None:
+        raise HTTPException(status_code=404)
+    member = await require_member(workspace_id, session)
+    
+    allowed, retry_after = workspace_limiter.hit(f"workspace:{workspace_id}")
+    if not allowed:
+        # Запрос не выполнен — жетон пользователя, списанный middleware, возвращаем
+        user_limiter.refund(f"user:{session.user_id}")
+        raise HTTPException(
+            status_code=429,
+            detail=TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    return member
+
+
 # ==================== API ПОЛЬЗОВАТЕЛЯ ====================
 
 @router.get("/user/{telegram_id}")
-async def get_user_data(telegram_id: int):
+async def get_user_data(telegram_id: int, session: Session = Depends(user_session)):
     user = await db.get_user(telegram_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     workspaces = await db.get_user_workspaces(user["id"])
+    stats = await db.get_user_task_stats(user["id"])
+    
+    return FastJSONResponse({
+        "user": user,
+        "workspaces": workspaces,
+        "stats": stats
+    })
+
+
+async def build_bootstrap(telegram_id: int) -> Optional[dict]:
+    """Пользователь, его пространства, статистика и личная доска одним ответом"""
+    user = await db.get_user(telegram_id)
+    if not user:
+        return None
     
-    total = 0
-    done = 0
-    for ws in workspaces:
-        tasks = await db.get_tasks(ws["id"])
-        total += len(tasks)
-        done += len([t for t in tasks if t.get("status") == "done"])
+    workspaces, stats, board = await asyncio.gather(
+        db.get_user_workspaces(user["id"]),
+        db.get_user_task_stats(user["id"]),
+        build_board(user["personal_workspace_id"])
+    )
     
     return {
         "user": user,
         "workspaces": workspaces,
-        "stats": {
-            "total": total,
-            "done": done
-        }
+        "stats": stats,
+        "board": board
     }
 
 
+@router.get("/bootstrap/{telegram_id}")
+async def get_bootstrap(telegram_id: int, session: Session = Depends(user_session)):
+    """Всё для первого экрана Mini App за один запрос"""
+    data = await build_bootstrap(telegram_id)
+    if not data:
+        raise HTTPException(status_code=404, detail="User not found")
+    return FastJSONResponse(data)
+
+
 # ==================== API ПРОСТРАНСТВ ====================
 
-@router.get("/workspace/{workspace_id}")
-async def get_workspace(workspace_id: int):
+async def build_board(workspace_id: int) -> Optional[dict]:
+    """Доска пространства: задачи по этапам воронок и участники"""
     workspace = await db.get_workspace(workspace_id)
     if not workspace:
-        raise HTTPException(status_code=404)
+        return None
     
-    tasks = await db.get_tasks(workspace_id)
-    funnels = await db.get_funnels(workspace_id)
-    members = await db.get_workspace_members(workspace_id)
+    tasks, funnels, members = await asyncio.gather(
+        db.get_tasks(workspace_id),
+        db.get_funnels(workspace_id),
+        db.get_workspace_members(workspace_id)
+    )
+    
+    tasks_by_stage = {}
+    for task in tasks:
+        tasks_by_stage.setdefault(task["stage_id"], []).append(task)
     
     result_funnels = []
     for funnel in funnels:
         stages = await db.get_funnel_stages(funnel["id"])
-        stages_with_tasks = []
-        for stage in stages:
-            stage_tasks = [t for t in tasks if t.get("stage_id") == stage["id"]]
-            stages_with_tasks.append({**stage, "tasks": stage_tasks})
+        stages_with_tasks = [
+            {**stage, "tasks": tasks_by_stage.get(stage["id"], [])} for stage in stages
+        ]
         result_funnels.append({**funnel, "stages": stages_with_tasks})
     
     return {
@@ -194,22 +368,79 @@ async def get_workspace(workspace_id: int):
     }
 
 
-@router.get("/workspace/{workspace_id}/members")
+@router.get("/workspace/{workspace_id}", dependencies=[Depends(workspace_member)])
+async def get_workspace(workspace_id: int):
+    board = await build_board(workspace_id)
+    if not board:
+        raise HTTPException(status_code=404)
+    
+    # Доска может быть большой — сериализуем сразу, без jsonable_encoder
+    return FastJSONResponse(board)
+
+
+# Календарь месяца, ключ — (пространство, месяц, версия пространства)
+_calendar_cache = TTLCache(maxsize=512, ttl=300)
+
+
+@router.get("/workspace/{workspace_id}/calendar", dependencies=[Depends(workspace_member)])
+async def get_calendar(workspace_id: int, month: str):
+    """
+    Счётчики по дням и элементы со сроком за месяц (month=YYYY-MM) и
+    срочные задачи пространства — всё, что нужно главной и календарю
+    без полного списка задач
+    """
+    try:
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month должен быть в формате YYYY-MM")
+    month = start.strftime("%Y-%m")
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    
+    version = await db.get_workspace_version(workspace_id)
+    if version is None:
+        raise HTTPException(status_code=404)
+    
+    key = (workspace_id, month, version)
+    calendar = _calendar_cache.get(key)
+    if calendar is not None:
+        return calendar
+    
+    items, urgent = await asyncio.gather(
+        db.get_calendar_items(workspace_id, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")),
+        db.get_urgent_tasks(workspace_id)
+    )
+    
+    days = {}
+    for task in items["tasks"]:
+        day = days.setdefault(task["due_date"][:10], {"tasks": 0, "done": 0, "notes": 0})
+        day["tasks"] += 1
+        if task["status"] == "done":
+            day["done"] += 1
+    for note in items["notes"]:
+        day = days.setdefault(note["note_date"][:10], {"tasks": 0, "done": 0, "notes": 0})
+        day["notes"] += 1
+    
+    calendar = {
+        "month": month,
+        "version": version,
+        "days": days,
+        "tasks": items["tasks"],
+        "notes": items["notes"],
+        "urgent": urgent
+    }
+    _calendar_cache.set(key, calendar)
+    return calendar
+
+
+@router.get("/workspace/{workspace_id}/members", dependencies=[Depends(workspace_member)])
 async def get_members(workspace_id: int):
     members = await db.get_workspace_members(workspace_id)
     return {"members": members}
 
 
-@router.post("/workspace/{workspace_id}/members")
-async def add_member(workspace_id: int, member: MemberAdd):
-    user = await db.get_user_by_username(member.username)
-    
-    if not user:
-        raise HTTPException(
-            status_code=404, 
-            detail=f"Пользователь @{member.username} не найден. Он должен сначала написать боту /start"
-        )
-    
+@router.post("/workspace/{workspace_id}/members", dependencies=[Depends(workspace_member)])
+async def add_member(workspace_id: int, member: MemberAdd, full: bool = False):
+    """Добавить участника; full=true — вернуть и весь список участников"""
     permissions = {
         "can_edit_tasks": member.can_edit_tasks,
         "can_delete_tasks": member.can_delete_tasks,
@@ -217,15 +448,32 @@ async def add_member(workspace_id: int, member: MemberAdd):
         "can_manage_members": member.can_manage_members
     }
     
-    success = await db.add_member_to_workspace(
-        workspace_id, user["id"], member.role, member.custom_role, permissions
-    )
-    
-    if not success:
-        raise HTTPException(status_code=400, detail="Пользователь уже в команде")
+    async with db.transaction():
+        user = await db.get_user_by_username(member.username)
+        
+        if not user:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Пользователь @{member.username} не найден. Он должен сначала написать боту /start"
+            )
+        
+        success = await db.add_member_to_workspace(
+            workspace_id, user["id"], member.role, member.custom_role, permissions
+        )
+        
+        if not success:
+            raise HTTPException(status_code=400, detail="Пользователь уже в команде")
+        
+        workspace = await db.get_workspace(workspace_id)
+        result = {
+            "success": True,
+            "member": await db.get_workspace_member(workspace_id, user["id"]),
+            "version": workspace["version"]
+        }
+        if full:
+            result["members"] = await db.get_workspace_members(workspace_id)
     
-    # Уведомляем пользователя о добавлении в команду
-    workspace = await db.get_workspace(workspace_id)
+    # Уведомляем пользователя о добавлении в команду (уже после коммита)
     await send_notification(
         user["telegram_id"],
         f"👥 **Вас добавили в команду!**\n\n"
@@ -233,12 +481,11 @@ async def add_member(workspace_id: int, member: MemberAdd):
         f"🎭 Роль: {member.custom_role or member.role}"
     )
     
-    members = await db.get_workspace_members(workspace_id)
-    return {"success": True, "members": members}
+    return result
 
 
-@router.put("/workspace/{workspace_id}/members/{user_id}")
-async def update_member(workspace_id: int, user_id: int, member: MemberUpdate):
+@router.put("/workspace/{workspace_id}/members/{user_id}", dependencies=[Depends(workspace_member)])
+async def update_member(workspace_id: int, user_id: int, member: MemberUpdate, full: bool = False):
     permissions = {}
     if member.can_edit_tasks is not None:
         permissions["can_edit_tasks"] = member.can_edit_tasks
@@ -249,33 +496,49 @@ async def update_member(workspace_id: int, user_id: int, member: MemberUpdate):
     if member.can_manage_members is not None:
         permissions["can_manage_members"] = member.can_manage_members
     
-    await db.update_member_role(
-        workspace_id, user_id, 
-        role=member.role, 
-        custom_role=member.custom_role,
-        permissions=permissions if permissions else None
-    )
+    async with db.transaction():
+        await db.update_member_role(
+            workspace_id, user_id, 
+            role=member.role, 
+            custom_role=member.custom_role,
+            permissions=permissions if permissions else None
+        )
+        updated = await db.get_workspace_member(workspace_id, user_id)
+        if not updated:
+            raise HTTPException(status_code=404, detail="Участник не найден")
+        
+        result = {
+            "success": True,
+            "member": updated,
+            "version": await db.get_workspace_version(workspace_id)
+        }
+        if full:
+            result["members"] = await db.get_workspace_members(workspace_id)
     
-    members = await db.get_workspace_members(workspace_id)
-    return {"success": True, "members": members}
+    return result
 
 
-@router.delete("/workspace/{workspace_id}/members/{user_id}")
-async def remove_member(workspace_id: int, user_id: int):
-    await db.remove_member_from_workspace(workspace_id, user_id)
-    members = await db.get_workspace_members(workspace_id)
-    return {"success": True, "members": members}
+@router.delete("/workspace/{workspace_id}/members/{user_id}", dependencies=[Depends(workspace_member)])
+async def remove_member(workspace_id: int, user_id: int, full: bool = False):
+    async with db.transaction():
+        await db.remove_member_from_workspace(workspace_id, user_id)
+        result = {
+            "success": True,
+            "user_id": user_id,
+            "version": await db.get_workspace_version(workspace_id)
+        }
+        if full:
+            result["members"] = await db.get_workspace_members(workspace_id)
+    return result
 
 
 # ==================== API ЗАДАЧ ====================
 
-@router.post("/tasks/{workspace_id}/{telegram_id}")
-async def create_task(workspace_id: int, telegram_id: int, task: TaskCreate):
-    """Создать задачу"""
-    user = await db.get_user(telegram_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Пользователь не найден")
-    
+@router.post("/tasks/{workspace_id}/{telegram_id}", dependencies=[Depends(workspace_member)])
+async def create_task(workspace_id: int, telegram_id: int, task: TaskCreate, request: Request,
+                      idempotency_key: Optional[str] = Header(None),
+                      session: Session = Depends(user_session)):
+    """Создать задачу (повтор с тем же Idempotency-Key вернёт ту же задачу)"""
     assigned_to = None
     assigned_user = None
     clean_username = None
@@ -292,20 +555,30 @@ async def create_task(workspace_id: int, telegram_id: int, task: TaskCreate):
                 )
             assigned_to = assigned_user["id"]
     
-    task_id = await db.create_task(
-        workspace_id=workspace_id,
-        title=task.title,
-        created_by=user["id"],
-        description=task.description,
-        priority=task.priority,
-        due_date=task.due_date,
-        due_time=task.due_time,
-        assigned_to=assigned_to,
-        assigned_username=clean_username
-    )
+    async with idempotent_write(request, session.user_id, idempotency_key) as write:
+        if write.replayed:
+            return write.replayed
+        
+        task_id = await db.create_task(
+            workspace_id=workspace_id,
+            title=task.title,
+            created_by=session.user_id,
+            description=task.description,
+            priority=task.priority,
+            due_date=task.due_date,
+            due_time=task.due_time,
+            assigned_to=assigned_to,
+            assigned_username=clean_username
+        )
+        created_task = await db.get_task(task_id)
+        response = write.respond({
+            "task": created_task,
+            "version": await db.get_workspace_version(workspace_id)
+        })
     
     # Отправляем уведомление назначенному пользователю
     if assigned_user and assigned_user["telegram_id"] != telegram_id:
+        author = await db.get_user(telegram_id)
         priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
         priority_icon = priority_icons.get(task.priority, "🟡")
         
@@ -314,7 +587,7 @@ async def create_task(workspace_id: int, telegram_id: int, task: TaskCreate):
             f"**{task.title}**\n"
             f"{task.description or ''}\n\n"
             f"{priority_icon} Приоритет: {task.priority}\n"
-            f"👤 От: @{user.get('username') or user.get('full_name', 'Пользователь')}"
+            f"👤 От: @{author.get('username') or author.get('full_name', 'Пользователь')}"
         )
         
         if task.due_date:
@@ -324,19 +597,13 @@ async def create_task(workspace_id: int, telegram_id: int, task: TaskCreate):
         
         await send_notification(assigned_user["telegram_id"], notification_text)
     
-    return {"task": await db.get_task(task_id)}
+    return response
 
 
-@router.put("/task/{task_id}")
-async def update_task(task_id: int, task: TaskUpdate):
-    """Обновить задачу"""
-    old_task = await db.get_task(task_id)
-    if not old_task:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
-    
+async def prepare_task_update(task: TaskUpdate, users: dict = None):
+    """Поля для db.update_task и назначенный пользователь (если меняется исполнитель)"""
     data = {}
     assigned_user = None
-    old_assigned_username = old_task.get("assigned_username")
     
     if task.title is not None:
         data["title"] = task.title
@@ -359,7 +626,12 @@ async def update_task(task_id: int, task: TaskUpdate):
         data["assigned_username"] = clean_username
         
         if clean_username:
-            assigned_user = await db.get_user_by_username(clean_username)
+            if users is not None and clean_username.lower() in users:
+                assigned_user = users[clean_username.lower()]
+            else:
+                assigned_user = await db.get_user_by_username(clean_username)
+                if users is not None:
+                    users[clean_username.lower()] = assigned_user
             if not assigned_user:
                 raise HTTPException(
                     status_code=400, 
@@ -369,8 +641,26 @@ async def update_task(task_id: int, task: TaskUpdate):
         else:
             data["assigned_to"] = None
     
-    if data:
-        await db.update_task(task_id, **data)
+    return data, assigned_user
+
+
+@router.put("/task/{task_id}", dependencies=[Depends(workspace_member)])
+async def update_task(task_id: int, task: TaskUpdate, loader: Loader = Depends(get_loader)):
+    """Обновить задачу"""
+    old_task = await loader.task(task_id)
+    if not old_task:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    old_assigned_username = old_task.get("assigned_username")
+    data, assigned_user = await prepare_task_update(task)
+    
+    # Версия читается в той же транзакции, что и запись, — она соответствует строке
+    async with db.transaction():
+        updated_task = await db.update_task(task_id, **data) if data else await db.get_task(task_id)
+        if not updated_task:
+            raise HTTPException(status_code=404, detail="Задача не найдена")
+        version = await db.get_workspace_version(updated_task["workspace_id"])
+    loader.tasks.prime(updated_task)
     
     # Отправляем уведомление если назначен новый пользователь
     new_username = data.get("assigned_username")
@@ -396,37 +686,226 @@ async def update_task(task_id: int, task: TaskUpdate):
         
         await send_notification(assigned_user["telegram_id"], notification_text)
     
-    return {"task": await db.get_task(task_id)}
+    return {"task": updated_task, "version": version}
 
 
-@router.delete("/task/{task_id}")
+@router.delete("/task/{task_id}", dependencies=[Depends(workspace_member)])
 async def delete_task(task_id: int):
     """Удалить задачу"""
-    await db.delete_task(task_id)
-    return {"success": True}
+    async with db.transaction():
+        workspace_id = await db.delete_task(task_id)
+        if workspace_id is None:
+            raise HTTPException(status_code=404, detail="Задача не найдена")
+        return {"success": True, "version": await db.get_workspace_version(workspace_id)}
+
+
+@router.post("/task/{task_id}/toggle", dependencies=[Depends(workspace_member)])
+async def toggle_task(task_id: int, request: Request, idempotency_key: Optional[str] = Header(None),
+                      session: Session = Depends(get_session)):
+    """Переключить статус задачи (повтор с тем же Idempotency-Key не переключит обратно)"""
+    async with idempotent_write(request, session.user_id, idempotency_key) as write:
+        if write.replayed:
+            return write.replayed
+        
+        task = await db.toggle_task(task_id)
+        if not task:
+            raise HTTPException(status_code=404)
+        return write.respond({"task": task, "version": await db.get_workspace_version(task["workspace_id"])})
+
+
+@router.post("/task/{task_id}/move/{stage_id}", dependencies=[Depends(workspace_member)])
+async def move_task(task_id: int, stage_id: int, after_id: Optional[int] = None):
+    """Переместить задачу в этап — после задачи after_id или первой"""
+    async with db.transaction():
+        try:
+            task = await db.move_task(task_id, stage_id, after_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not task:
+            raise HTTPException(status_code=404)
+        return {"task": task, "version": await db.get_workspace_version(task["workspace_id"])}
+
+
+@router.post("/stage/{stage_id}/move", dependencies=[Depends(workspace_member)])
+async def move_stage(stage_id: int, after_id: Optional[int] = None):
+    """Переставить этап воронки — после этапа after_id или первым"""
+    try:
+        stage = await db.move_stage(stage_id, after_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not stage:
+        raise HTTPException(status_code=404)
+    return {"stage": stage}
+
+
+# ==================== ПАКЕТНЫЕ ОПЕРАЦИИ ====================
+
+BATCH_MAX_OPS = 500
+
+# Какое право нужно для операции
+BATCH_PERMISSIONS = {
+    "toggle": "can_edit_tasks",
+    "move": "can_edit_tasks",
+    "update": "can_edit_tasks",
+    "delete": "can_delete_tasks",
+}
+
+
+@router.post("/batch/{workspace_id}/{telegram_id}")
+async def batch_tasks(workspace_id: int, telegram_id: int, batch: BatchRequest, request: Request,
+                      idempotency_key: Optional[str] = Header(None),
+                      session: Session = Depends(user_session),
+                      member: Member = Depends(workspace_member)):
+    """
+    Несколько операций над задачами пространства одним запросом:
+    права проверяются один раз, всё применяется одной транзакцией,
+    результат — по каждой операции в том же порядке
+    """
+    if len(batch.ops) > BATCH_MAX_OPS:
+        raise HTTPException(status_code=400, detail=f"Не больше {BATCH_MAX_OPS} операций за раз")
+    
+    results = []
+    assigned = {}  # telegram_id -> названия задач, для одного уведомления
+    users = {}
+    
+    async with idempotent_write(request, session.user_id, idempotency_key) as write:
+        if write.replayed:
+            return write.replayed
+        
+        is_owner = member["role"] == "owner"
+        
+        tasks = {
+            t["id"]: t for t in await db.get_tasks_by_ids(list({op.task_id for op in batch.ops}))
+        }
+        
+        for op in batch.ops:
+            permission = BATCH_PERMISSIONS.get(op.op)
+            task = tasks.get(op.task_id)
+            
+            if not permission:
+                results.append({"ok": False, "error": f"Неизвестная операция: {op.op}"})
+                continue
+            if not task or task["workspace_id"] != workspace_id:
+                results.append({"ok": False, "error": "Задача не найдена"})
+                continue
+            if not (is_owner or member[permission]):
+                results.append({"ok": False, "error": "Недостаточно прав"})
+                continue
+            
+            if op.op == "toggle":
+                task = await db.toggle_task(op.task_id)
+            elif op.op == "move":
+                if op.stage_id is None:
+                    results.append({"ok": False, "error": "Не указан stage_id"})
+                    continue
+                try:
+                    task = await db.move_task(op.task_id, op.stage_id, op.after_id)
+                except ValueError as e:
+                    results.append({"ok": False, "error": str(e)})
+                    continue
+            elif op.op == "delete":
+                await db.delete_task(op.task_id)
+                del tasks[op.task_id]
+                results.append({"ok": True, "task_id": op.task_id})
+                continue
+            else:
+                try:
+                    data, assigned_user = await prepare_task_update(op.fields or TaskUpdate(), users)
+                except HTTPException as e:
+                    results.append({"ok": False, "error": e.detail})
+                    continue
+                if assigned_user and not (is_owner or member["can_assign_tasks"]):
+                    results.append({"ok": False, "error": "Недостаточно прав для назначения"})
+                    continue
+                if data:
+                    new_username = data.get("assigned_username")
+                    if (assigned_user and new_username != task["assigned_username"]
+                            and assigned_user["telegram_id"] != telegram_id):
+                        assigned.setdefault(assigned_user["telegram_id"], []).append(
+                            data.get("title", task["title"])
+                        )
+                    task = await db.update_task(op.task_id, **data)
+            
+            tasks[op.task_id] = task
+            results.append({"ok": True, "task": task})
+        
+        response = write.respond({
+            "results": [{"index": i, **result} for i, result in enumerate(results)],
+            "version": await db.get_workspace_version(workspace_id),
+        })
+    
+    # Одно уведомление на исполнителя — уже после коммита
+    if assigned:
+        workspace = await db.get_workspace(workspace_id)
+        author = member.username or member.full_name or "Пользователь"
+        for assignee_telegram_id, titles in assigned.items():
+            text = f"📋 **Вам назначены задачи ({len(titles)})**\n\n"
+            text += "\n".join(f"• {title}" for title in titles[:20])
+            if len(titles) > 20:
+                text += f"\n… и ещё {len(titles) - 20}"
+            text += f"\n\n📂 {workspace['name']}\n👤 От: @{author}"
+            await send_notification(assignee_telegram_id, text)
+    
+    return response
 
 
-@router.post("/task/{task_id}/toggle")
-async def toggle_task(task_id: int):
-    """Переключить статус задачи"""
-    task = await db.get_task(task_id)
-    if not task:
-        raise HTTPException(status_code=404)
+@router.get("/inbox/{telegram_id}")
+async def get_inbox(telegram_id: int, status: str = "todo", cursor: Optional[str] = None, limit: int = 20,
+                    session: Session = Depends(user_session)):
+    """Задачи, назначенные пользователю, во всех пространствах (постранично по курсору)"""
+    limit = max(1, min(limit, 100))
+    try:
+        tasks, next_cursor = await db.get_assigned_tasks(session.user_id, status, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    new_status = "todo" if task.get("status") == "done" else "done"
-    await db.update_task(task_id, status=new_status)
-    return {"task": await db.get_task(task_id)}
+    return {"tasks": tasks, "next_cursor": next_cursor}
+
 
+# ==================== ПОИСК ====================
 
-@router.post("/task/{task_id}/move/{stage_id}")
-async def move_task(task_id: int, stage_id: int):
-    """Переместить задачу"""
-    await db.update_task(task_id, stage_id=stage_id)
-    return {"task": await db.get_task(task_id)}
+@router.get("/search/{telegram_id}")
+async def search(telegram_id: int, q: str, limit: int = 20, offset: int = 0,
+                 session: Session = Depends(user_session)):
+    """Поиск по задачам, заметкам и комментариям во всех пространствах пользователя"""
+    limit = max(1, min(limit, 50))
+    offset = max(0, offset)
+    
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    results = await db.search(session.user_id, q, limit=limit + 1, offset=offset)
+    has_more = len(results) > limit
+    
+    return {
+        "results": results[:limit],
+        "next_offset": offset + limit if has_more else None
+    }
 
 
 # ==================== ПРОВЕРКА ПОЛЬЗОВАТЕЛЯ ====================
 
+# Подсказки повторяются на каждое нажатие клавиши — держим их в памяти
+_autocomplete_cache = TTLCache(maxsize=2048, ttl=30)
+
+
+@router.get("/users/autocomplete")
+async def autocomplete_users(q: str, workspace_id: Optional[int] = None, limit: int = 8,
+                             session: Session = Depends(get_session)):
+    """Подсказки username для назначения и добавления в команду"""
+    query = q.replace('@', '').strip().lower()
+    limit = max(1, min(limit, 20))
+    if not query:
+        return {"users": []}
+    if workspace_id is not None:
+        await require_member(workspace_id, session)
+    
+    key = (workspace_id, query, limit)
+    users = _autocomplete_cache.get(key)
+    if users is None:
+        users = await db.autocomplete_users(query, workspace_id, limit)
+        _autocomplete_cache.set(key, users)
+    
+    return {"users": users}
+
 @router.get("/check-user/{username}")
 async def check_user_exists(username: str):
     """Проверить существует ли пользователь"""
@@ -448,43 +927,60 @@ async def check_user_exists(username: str):
 
 # ==================== API ЗАМЕТОК ====================
 
-@router.get("/notes/{workspace_id}")
+@router.get("/notes/{workspace_id}", dependencies=[Depends(workspace_member)])
 async def get_notes(workspace_id: int, date: Optional[str] = None):
     notes = await db.get_notes(workspace_id, date)
     return {"notes": notes}
 
 
-@router.post("/notes/{workspace_id}/{telegram_id}")
-async def create_note(workspace_id: int, telegram_id: int, note: NoteCreate):
-    user = await db.get_user(telegram_id)
-    if not user:
-        raise HTTPException(status_code=404)
-    
-    note_id = await db.create_note(
-        workspace_id=workspace_id,
-        user_id=user["id"],
-        title=note.title,
-        content=note.content,
-        note_date=note.note_date,
-        color=note.color
-    )
-    
-    notes = await db.get_notes(workspace_id)
-    return {"note_id": note_id, "notes": notes}
+@router.post("/notes/{workspace_id}/{telegram_id}", dependencies=[Depends(workspace_member)])
+async def create_note(workspace_id: int, telegram_id: int, note: NoteCreate, request: Request,
+                      full: bool = False, idempotency_key: Optional[str] = Header(None),
+                      session: Session = Depends(user_session)):
+    """Создать заметку; full=true — вернуть и все заметки пространства"""
+    async with idempotent_write(request, session.user_id, idempotency_key) as write:
+        if write.replayed:
+            return write.replayed
+        
+        note_id = await db.create_note(
+            workspace_id=workspace_id,
+            user_id=session.user_id,
+            title=note.title,
+            content=note.content,
+            note_date=note.note_date,
+            color=note.color
+        )
+        result = {
+            "note_id": note_id,
+            "note": await db.get_note(note_id),
+            "version": await db.get_workspace_version(workspace_id)
+        }
+        if full:
+            result["notes"] = await db.get_notes(workspace_id)
+        return write.respond(result)
 
 
-@router.put("/note/{note_id}")
+@router.put("/note/{note_id}", dependencies=[Depends(workspace_member)])
 async def update_note(note_id: int, note: NoteUpdate):
     data = {k: v for k, v in note.dict().items() if v is not None}
-    if data:
-        await db.update_note(note_id, **data)
-    return {"success": True}
+    async with db.transaction():
+        updated = await db.update_note(note_id, **data) if data else await db.get_note(note_id)
+        if not updated:
+            return {"success": True}
+        return {
+            "success": True,
+            "note": updated,
+            "version": await db.get_workspace_version(updated["workspace_id"])
+        }
 
 
-@router.delete("/note/{note_id}")
+@router.delete("/note/{note_id}", dependencies=[Depends(workspace_member)])
 async def delete_note(note_id: int):
-    await db.delete_note(note_id)
-    return {"success": True}
+    async with db.transaction():
+        workspace_id = await db.delete_note(note_id)
+        if workspace_id is None:
+            raise HTTPException(status_code=404, detail="Заметка не найдена")
+        return {"success": True, "version": await db.get_workspace_version(workspace_id)}
 
 
 # ==================== ПРЕДУСТАНОВЛЕННЫЕ РОЛИ ====================
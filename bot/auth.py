@@ -0,0 +1,134 @@
+# Файл: bot/auth.py
+"""
+Сессии Mini App.
+
+Mini App один раз присылает initData из Telegram WebApp на
+POST /api/session. Сервер проверяет подпись initData токеном бота и
+выдаёт короткоживущий токен «user_id.telegram_id.expires.подпись»
+(HMAC-SHA256). Дальше каждый запрос несёт токен в заголовке
+Authorization: Bearer; проверка — одно сравнение HMAC за постоянное
+время, без обращения к базе.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import Depends, Header, HTTPException
+
+from bot.config import TOKEN, SESSION_SECRET, SESSION_TTL, INIT_DATA_MAX_AGE, WEBAPP_LINK_TTL
+
+# Без SESSION_SECRET ключ выводится из токена бота — одинаковый во всех процессах
+_secret = (
+    SESSION_SECRET.encode() if SESSION_SECRET
+    else hmac.new(b"crm-session", TOKEN.encode(), hashlib.sha256).digest()
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Session:
+    user_id: int
+    telegram_id: int
+    expires_at: int
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(_secret, payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+# ==================== INITDATA ====================
+
+def validate_init_data(init_data: str, max_age: int = INIT_DATA_MAX_AGE) -> Dict:
+    """
+    Проверка initData по алгоритму Telegram; возвращает поле user.
+    ValueError — если подпись неверна или данные устарели
+    """
+    fields = dict(parse_qsl(init_data, keep_blank_values=True))
+    received_hash = fields.pop("hash", None)
+    if not received_hash:
+        raise ValueError("В initData нет подписи")
+
+    data_check_string = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", TOKEN.encode(), hashlib.sha256).digest()
+    expected_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected_hash.encode(), received_hash.encode()):
+        raise ValueError("Неверная подпись initData")
+
+    try:
+        auth_date = int(fields.get("auth_date", "0"))
+        user = json.loads(fields["user"])
+        int(user["id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Некорректный initData")
+    if time.time() - auth_date > max_age:
+        raise ValueError("initData устарел")
+    return user
+
+
+# ==================== ТОКЕНЫ СЕССИИ ====================
+
+def issue_token(user_id: int, telegram_id: int, ttl: int = SESSION_TTL) -> Tuple[str, int]:
+    """(токен, время истечения в секундах unix)"""
+    expires_at = int(time.time()) + ttl
+    payload = f"{user_id}.{telegram_id}.{expires_at}"
+    return f"{payload}.{_sign(payload)}", expires_at
+
+
+def verify_token(token: str) -> Optional[Session]:
+    payload, _, signature = token.rpartition(".")
+    if not payload or not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        user_id, telegram_id, expires_at = map(int, payload.split("."))
+    except ValueError:
+        return None
+    if expires_at < time.time():
+        return None
+    return Session(user_id, telegram_id, expires_at)
+
+
+async def get_session(authorization: Optional[str] = Header(None)) -> Session:
+    """Зависимость FastAPI: сессия из Authorization: Bearer <токен>"""
+    scheme, _, token = (authorization or "").partition(" ")
+    session = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    if session is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Нужна сессия Mini App",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return session
+
+
+async def user_session(telegram_id: int, session: Session = Depends(get_session)) -> Session:
+    """Сессия владельца telegram_id из адреса запроса"""
+    if session.telegram_id != telegram_id:
+        raise HTTPException(status_code=403, detail="Нет доступа")
+    return session
+
+
+# ==================== ССЫЛКА НА MINI APP ====================
+
+def _uid_signature(telegram_id: int, expires_at: int) -> str:
+    return _sign(f"uid.{telegram_id}.{expires_at}")[:22]
+
+
+def sign_uid(telegram_id: int, ttl: int = WEBAPP_LINK_TTL) -> Tuple[int, str]:
+    """
+    Подпись uid в ссылке из меню бота (для встроенных стартовых данных):
+    (время истечения в секундах unix, подпись)
+    """
+    expires_at = int(time.time()) + ttl
+    return expires_at, _uid_signature(telegram_id, expires_at)
+
+
+def verify_uid(telegram_id: int, expires_at: Optional[int], signature: Optional[str]) -> bool:
+    if not signature or not expires_at or expires_at < time.time():
+        return False
+    return hmac.compare_digest(signature.encode(), _uid_signature(telegram_id, expires_at).encode())
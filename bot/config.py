@@ -17,6 +17,85 @@ APP_BASE_URL = os.getenv("APP_BASE_URL")
 # URL веб-приложения (Mini App)
 WEBAPP_URL = os.getenv("WEBAPP_URL") or APP_BASE_URL
 
+# Откуда бот получает апдейты: webhook (на APP_BASE_URL) или polling (getUpdates)
+BOT_MODE = os.getenv("BOT_MODE", "webhook" if APP_BASE_URL else "polling")
+
+# Пул обработчиков апдейтов и общий размер их очередей в каждом процессе
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+
+# Сколько секунд Telegram держит запрос getUpdates в режиме polling
+POLLING_TIMEOUT = int(os.getenv("POLLING_TIMEOUT", "30"))
+
+# Встраивать стартовые данные в index.html (Mini App открывается с ?uid=...)
+# и сколько секунд действует подписанная ссылка из меню бота
+WEBAPP_INLINE_BOOTSTRAP = os.getenv("WEBAPP_INLINE_BOOTSTRAP", "0") == "1"
+WEBAPP_LINK_TTL = int(os.getenv("WEBAPP_LINK_TTL", "3600"))
+
+# Сессии Mini App: ключ подписи токенов (по умолчанию выводится из BOT_TOKEN),
+# время жизни токена и максимальный возраст initData, в секундах
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+INIT_DATA_MAX_AGE = int(os.getenv("INIT_DATA_MAX_AGE", "86400"))
+
+# Ограничение частоты: запросов в секунду и запас на всплеск (0 — без ограничения)
+RATE_LIMIT_USER_RATE = float(os.getenv("RATE_LIMIT_USER_RATE", "5"))
+RATE_LIMIT_USER_BURST = int(os.getenv("RATE_LIMIT_USER_BURST", "20"))
+RATE_LIMIT_WORKSPACE_RATE = float(os.getenv("RATE_LIMIT_WORKSPACE_RATE", "20"))
+RATE_LIMIT_WORKSPACE_BURST = int(os.getenv("RATE_LIMIT_WORKSPACE_BURST", "60"))
+RATE_LIMIT_BOT_RATE = float(os.getenv("RATE_LIMIT_BOT_RATE", "1"))
+RATE_LIMIT_BOT_BURST = int(os.getenv("RATE_LIMIT_BOT_BURST", "5"))
+# Сколько прокси перед приложением дописывают X-Forwarded-For (на Render — 1);
+# 0 — заголовку не верим, адрес клиента берётся из соединения
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+# Сколько вёдер держать в памяти на каждый лимит
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+# Число процессов uvicorn (несколько — только через `python -m bot.main`)
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Хранилище состояний FSM: memory — в процессе, sqlite — общее для всех воркеров
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite" if WORKERS > 1 else "memory")
+
+# Аренда ведущего: планировщик работает только в одном процессе.
+# Срок аренды и период её продления, в секундах
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "30"))
+LEADER_LEASE_RENEW = float(os.getenv("LEADER_LEASE_RENEW", "10"))
+
+# Профиль рантайма: fast — uvloop и httptools (если установлены) и
+# настройки сервера ниже, standard — asyncio и h11 с настройками uvicorn по умолчанию
+RUNTIME_PROFILE = os.getenv("RUNTIME_PROFILE", "fast")
+
+# Сервер (профиль fast): keep-alive в секундах — дольше простоя у прокси
+# Render, очередь входящих соединений и предел одновременных запросов на
+# воркер (сверх него — 503, 0 — без предела)
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "65"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+SERVER_LIMIT_CONCURRENCY = int(os.getenv("SERVER_LIMIT_CONCURRENCY", "1000"))
+
+# Соединения бота с Bot API (профиль fast): сколько держать открытыми
+# и сколько секунд хранить простаивающее
+BOT_CONNECTION_LIMIT = int(os.getenv("BOT_CONNECTION_LIMIT", "20"))
+BOT_KEEPALIVE = int(os.getenv("BOT_KEEPALIVE", "30"))
+
+# Токен для GET /metrics (Authorization: Bearer); без него метрики открыты
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Трассировка: доля записываемых трасс (0 — выключена, 1 — все) и
+# пользователи (telegram_id через запятую), чьи апдейты пишутся всегда
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_USER_IDS = {int(value) for value in os.getenv("TRACE_USER_IDS", "").split(",") if value.strip()}
+# Куда выгружать спаны (OTLP/JSON): файл JSON Lines (пусто — не писать)
+# и адрес коллектора OTLP/HTTP, например http://localhost:4318/v1/traces
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT")
+
 # Проверка токена
 if not TOKEN:
     raise ValueError("❌ Не найден BOT_TOKEN!")
+
+if BOT_MODE not in ("webhook", "polling"):
+    raise ValueError(f"❌ Неизвестный BOT_MODE: {BOT_MODE}")
+
+if RUNTIME_PROFILE not in ("fast", "standard"):
+    raise ValueError(f"❌ Неизвестный RUNTIME_PROFILE: {RUNTIME_PROFILE}")
@@ -4,12 +4,76 @@
 """
 
 import aiosqlite
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 import secrets
 import logging
-
-DATABASE_PATH = "crm_database.db"
+import re
+
+from bot.metrics import DB_QUERY_SECONDS, DB_ERRORS, instrument_functions
+from bot.tracing import trace_functions
+from bot.models import User, Member, Workspace, Task, Note, Comment
+from bot.ordering import MAX_KEY_LENGTH, key_between, spread_keys
+
+DATABASE_PATH = os.getenv("DATABASE_PATH", "crm_database.db")
+
+# Соединение открытой транзакции (unit of work) для текущей задачи asyncio
+_current_connection: ContextVar[Optional[aiosqlite.Connection]] = ContextVar(
+    "db_connection", default=None
+)
+
+
+@asynccontextmanager
+async def _connect():
+    """Соединение текущей транзакции, либо новое на время одного вызова"""
+    conn = _current_connection.get()
+    if conn is not None:
+        yield conn
+        return
+    async with aiosqlite.connect(DATABASE_PATH) as conn:
+        yield conn
+
+
+async def _commit(conn: aiosqlite.Connection):
+    """Коммит вне транзакции; внутри неё фиксирует только transaction()"""
+    if _current_connection.get() is not conn:
+        await conn.commit()
+
+
+@asynccontextmanager
+async def transaction(readonly: bool = False):
+    """
+    Unit of work: все вызовы этого модуля внутри блока работают
+    через одно соединение и одну транзакцию.
+
+        async with db.transaction():
+            user_id = await db.create_user(...)
+            await db.create_personal_workspace(user_id)
+
+    Вложенные блоки присоединяются к внешней транзакции.
+    """
+    if _current_connection.get() is not None:
+        yield
+        return
+
+    async with aiosqlite.connect(DATABASE_PATH) as conn:
+        # IMMEDIATE сразу берёт блокировку записи, чтобы чтение-затем-запись
+        # не упиралось в SQLITE_BUSY при повышении блокировки
+        await conn.execute("BEGIN" if readonly else "BEGIN IMMEDIATE")
+        token = _current_connection.set(conn)
+        try:
+            yield
+        except BaseException:
+            await conn.rollback()
+            raise
+        else:
+            await conn.commit()
+        finally:
+            _current_connection.reset(token)
 
 
 async def check_and_update_schema():
@@ -25,6 +89,16 @@ async def check_and_update_schema():
             # tasks - НОВЫЕ КОЛОНКИ
             ("tasks", "due_time", "TEXT"),
             ("tasks", "assigned_username", "TEXT"),
+            ("tasks", "sort_key", "TEXT"),
+            # funnel_stages
+            ("funnel_stages", "sort_key", "TEXT"),
+            # users
+            ("users", "personal_workspace_id", "INTEGER"),
+            ("users", "username_lower", "TEXT"),
+            # workspaces
+            ("workspaces", "version", "INTEGER DEFAULT 0"),
+            # idempotency_keys
+            ("idempotency_keys", "request_hash", "TEXT"),
         ]
         
         for table, column, col_type in required_columns:
@@ -37,12 +111,86 @@ async def check_and_update_schema():
                     print(f"✅ Добавлена колонка: {column} в {table}")
                 except Exception as e:
                     print(f"❌ Не удалось добавить колонку {column}: {e}")
+        
+        # Указатель на личное пространство для пользователей, созданных до его появления
+        await db.execute("""
+            UPDATE users SET personal_workspace_id = (
+                SELECT w.id FROM workspaces w
+                WHERE w.owner_id = users.id AND w.is_personal = TRUE
+                ORDER BY w.id LIMIT 1
+            )
+            WHERE personal_workspace_id IS NULL
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_personal_workspace ON users(personal_workspace_id)"
+        )
+        
+        # Нормализованный username для поиска без учёта регистра
+        await db.execute("""
+            UPDATE users SET username_lower = lower(username)
+            WHERE username IS NOT NULL AND username_lower IS NOT lower(username)
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(username_lower)"
+        )
+        
+        # Индексы по датам для календаря
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_workspace_due ON tasks(workspace_id, due_date)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_notes_workspace_date ON notes(workspace_id, note_date)"
+        )
+        # Срочные задачи для главной: открытые с высоким приоритетом
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_workspace_priority ON tasks(workspace_id, priority, status)"
+        )
+        
+        # Входящие «назначено мне» по всем пространствам
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_assignee_inbox ON tasks(assigned_to, status, due_date)"
+        )
+        
+        # Ручной порядок: доска читает задачи этапа прямо по индексу
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_board_order ON tasks(workspace_id, stage_id, sort_key)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_funnel_stages_order ON funnel_stages(funnel_id, sort_key)"
+        )
+        # Ключи для строк, созданных до появления sort_key
+        if await _rebalance_sort_keys(db, MAX_KEY_LENGTH):
+            print("✅ Заполнен порядок задач и этапов")
+        
+        # Версия пространства растёт при любом изменении его задач, заметок
+        # и участников — по ней сбрасываются кэши и сверяются клиенты
+        for table in ("tasks", "notes", "workspace_members"):
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_insert AFTER INSERT ON {table} BEGIN
+                    UPDATE workspaces SET version = version + 1 WHERE id = NEW.workspace_id;
+                END
+            """)
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_update AFTER UPDATE ON {table} BEGIN
+                    UPDATE workspaces SET version = version + 1
+                    WHERE id IN (OLD.workspace_id, NEW.workspace_id);
+                END
+            """)
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_delete AFTER DELETE ON {table} BEGIN
+                    UPDATE workspaces SET version = version + 1 WHERE id = OLD.workspace_id;
+                END
+            """)
+        await db.commit()
 
 
 async def init_database():
     """Создаём таблицы"""
     async with aiosqlite.connect(DATABASE_PATH) as db:
         
+        # WAL: чтение не ждёт запись — важно, когда с базой работают несколько процессов
+        await db.execute("PRAGMA journal_mode=WAL")
+        
         # Пользователи
         await db.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -50,6 +198,8 @@ async def init_database():
                 telegram_id INTEGER UNIQUE NOT NULL,
                 username TEXT,
                 full_name TEXT,
+                username_lower TEXT,
+                personal_workspace_id INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
@@ -63,6 +213,7 @@ async def init_database():
                 owner_id INTEGER NOT NULL,
                 is_personal BOOLEAN DEFAULT FALSE,
                 invite_code TEXT UNIQUE,
+                version INTEGER DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (owner_id) REFERENCES users(id)
             )
@@ -107,6 +258,7 @@ async def init_database():
                 funnel_id INTEGER NOT NULL,
                 name TEXT NOT NULL,
                 position INTEGER DEFAULT 0,
+                sort_key TEXT,
                 color TEXT DEFAULT '#95a5a6',
                 FOREIGN KEY (funnel_id) REFERENCES funnels(id)
             )
@@ -128,6 +280,7 @@ async def init_database():
                 created_by INTEGER NOT NULL,
                 assigned_to INTEGER,
                 assigned_username TEXT,
+                sort_key TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (workspace_id) REFERENCES workspaces(id),
@@ -182,21 +335,224 @@ async def init_database():
             )
         """)
         
+        # Ответы на запросы с Idempotency-Key (повторы отдаются отсюда)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                request_hash TEXT,
+                status_code INTEGER NOT NULL,
+                body BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (scope, key)
+            ) WITHOUT ROWID
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys(created_at)"
+        )
+        
+        # Аренды: какой процесс сейчас ведущий (например, запускает планировщик)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        
+        # Состояния FSM бота — общие для всех процессов
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS fsm_storage (
+                key TEXT PRIMARY KEY,
+                state TEXT,
+                data TEXT
+            )
+        """)
+        
+        # Счётчики задач: по пространству, статусу, этапу и исполнителю.
+        # Поддерживаются триггерами, поэтому точны при любом пути записи.
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS task_counters (
+                workspace_id INTEGER NOT NULL,
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (workspace_id, dimension, key)
+            ) WITHOUT ROWID
+        """)
+        
+        await db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_task_counters_insert AFTER INSERT ON tasks
+            BEGIN
+                {_counters_upsert("NEW", 1)}
+            END
+        """)
+        
+        await db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_task_counters_delete AFTER DELETE ON tasks
+            BEGIN
+                {_counters_upsert("OLD", -1)}
+            END
+        """)
+        
+        await db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_task_counters_update
+            AFTER UPDATE OF workspace_id, status, stage_id, assigned_to ON tasks
+            WHEN OLD.workspace_id IS NOT NEW.workspace_id
+              OR OLD.status IS NOT NEW.status
+              OR OLD.stage_id IS NOT NEW.stage_id
+              OR OLD.assigned_to IS NOT NEW.assigned_to
+            BEGIN
+                {_counters_upsert("OLD", -1)}
+                {_counters_upsert("NEW", 1)}
+            END
+        """)
+        
         await db.commit()
     
     await check_and_update_schema()
+    await init_search_index()
+    
+    # Первое заполнение счётчиков для базы, где задачи уже есть
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        cursor = await db.execute("SELECT 1 FROM task_counters LIMIT 1")
+        has_counters = await cursor.fetchone()
+        cursor = await db.execute("SELECT 1 FROM tasks LIMIT 1")
+        has_tasks = await cursor.fetchone()
+    if has_tasks and not has_counters:
+        await rebuild_task_counters()
+        print("✅ Счётчики задач пересчитаны")
+    
     print("✅ База данных готова!")
 
 
+def _counters_upsert(row: str, delta: int) -> str:
+    """Тело триггера: сдвинуть все счётчики строки задачи на delta"""
+    return f"""
+        INSERT INTO task_counters (workspace_id, dimension, key, count) VALUES
+            ({row}.workspace_id, 'total', '', {delta}),
+            ({row}.workspace_id, 'status', COALESCE({row}.status, ''), {delta}),
+            ({row}.workspace_id, 'stage', COALESCE({row}.stage_id, ''), {delta}),
+            ({row}.workspace_id, 'assignee', COALESCE({row}.assigned_to, ''), {delta})
+        ON CONFLICT (workspace_id, dimension, key) DO UPDATE SET count = count + excluded.count;
+    """
+
+
+# ==================== ПОЛНОТЕКСТОВЫЙ ПОИСК ====================
+
+# FTS5-индекс -> (таблица, индексируемые колонки)
+SEARCH_INDEXES = {
+    "tasks_fts": ("tasks", ("title", "description")),
+    "notes_fts": ("notes", ("title", "content")),
+    "task_comments_fts": ("task_comments", ("comment_text",)),
+}
+
+
+def _fts_norm(expr: str) -> str:
+    """ё -> е: unicode61 не снимает диакритику с кириллицы"""
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+async def init_search_index():
+    """FTS5-таблицы поверх задач, заметок и комментариев + триггеры синхронизации"""
+    async with aiosqlite.connect(DATABASE_PATH) as db:
+        for fts, (table, columns) in SEARCH_INDEXES.items():
+            cursor = await db.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+            )
+            exists = await cursor.fetchone()
+            
+            cols = ", ".join(columns)
+            new_values = ", ".join(_fts_norm(f"NEW.{c}") for c in columns)
+            old_values = ", ".join(_fts_norm(f"OLD.{c}") for c in columns)
+            
+            # external content: текст хранится только в исходной таблице
+            await db.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {cols}, content='{table}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )
+            """)
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new_values});
+                END
+            """)
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old_values});
+                END
+            """)
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN
+                    INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old_values});
+                    INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new_values});
+                END
+            """)
+            
+            if not exists:
+                # 'rebuild' взял бы текст без нормализации, поэтому заполняем сами
+                await db.execute(f"""
+                    INSERT INTO {fts} (rowid, {cols})
+                    SELECT id, {", ".join(_fts_norm(c) for c in columns)} FROM {table}
+                """)
+                print(f"✅ Построен поисковый индекс {fts}")
+        
+        # Триграммы username: поиск по подстроке для автодополнения
+        cursor = await db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_trigram'"
+        )
+        trigram_exists = await cursor.fetchone()
+        await db.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS users_trigram USING fts5(
+                username_lower, content='users', content_rowid='id', tokenize='trigram'
+            )
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS users_trigram_insert AFTER INSERT ON users BEGIN
+                INSERT INTO users_trigram (rowid, username_lower) VALUES (NEW.id, NEW.username_lower);
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS users_trigram_delete AFTER DELETE ON users BEGIN
+                INSERT INTO users_trigram (users_trigram, rowid, username_lower)
+                VALUES ('delete', OLD.id, OLD.username_lower);
+            END
+        """)
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS users_trigram_update AFTER UPDATE OF username_lower ON users BEGIN
+                INSERT INTO users_trigram (users_trigram, rowid, username_lower)
+                VALUES ('delete', OLD.id, OLD.username_lower);
+                INSERT INTO users_trigram (rowid, username_lower) VALUES (NEW.id, NEW.username_lower);
+            END
+        """)
+        if not trigram_exists:
+            await db.execute("INSERT INTO users_trigram (users_trigram) VALUES ('rebuild')")
+        
+        await db.commit()
+
+
+# Те же счётчики, посчитанные с нуля по таблице tasks
+_COUNTERS_FROM_TASKS = """
+    SELECT workspace_id, 'total', '', COUNT(*) FROM tasks GROUP BY workspace_id
+    UNION ALL
+    SELECT workspace_id, 'status', COALESCE(status, ''), COUNT(*) FROM tasks GROUP BY 1, 3
+    UNION ALL
+    SELECT workspace_id, 'stage', COALESCE(stage_id, ''), COUNT(*) FROM tasks GROUP BY 1, 3
+    UNION ALL
+    SELECT workspace_id, 'assignee', COALESCE(assigned_to, ''), COUNT(*) FROM tasks GROUP BY 1, 3
+"""
+
+
 # ==================== ПОЛЬЗОВАТЕЛИ ====================
 
 async def create_user(telegram_id: int, username: str = None, full_name: str = None) -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         await db.execute(
-            "INSERT OR IGNORE INTO users (telegram_id, username, full_name) VALUES (?, ?, ?)",
-            (telegram_id, username, full_name)
+            "INSERT OR IGNORE INTO users (telegram_id, username, full_name, username_lower) VALUES (?, ?, ?, ?)",
+            (telegram_id, username, full_name, username.lower() if username else None)
         )
-        await db.commit()
+        await _commit(db)
         
         cursor = await db.execute(
             "SELECT id FROM users WHERE telegram_id = ?", (telegram_id,)
@@ -205,35 +561,154 @@ async def create_user(telegram_id: int, username: str = None, full_name: str = N
         return row[0]
 
 
-async def get_user(telegram_id: int) -> Optional[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def ensure_user(telegram_id: int, username: str = None, full_name: str = None) -> User:
+    """
+    Регистрация для /start: пользователь и его личное пространство.
+
+    Если пользователь уже есть, профиль не менялся и указатель на личное
+    пространство заполнен — это одно чтение по уникальному индексу.
+    Иначе upsert и создание пространства идут одной транзакцией.
+    """
+    async with _connect() as db:
         cursor = await db.execute(
-            "SELECT * FROM users WHERE telegram_id = ?", (telegram_id,)
+            f"SELECT {User.select()} FROM users WHERE telegram_id = ?", (telegram_id,)
         )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        user = User.from_row(await cursor.fetchone())
+    
+    if (user and user.personal_workspace_id
+            and user.username == username and user.full_name == full_name):
+        return user
+    
+    async with transaction():
+        async with _connect() as db:
+            cursor = await db.execute(f"""
+                INSERT INTO users (telegram_id, username, full_name, username_lower) VALUES (?, ?, ?, ?)
+                ON CONFLICT(telegram_id) DO UPDATE
+                SET username = excluded.username, full_name = excluded.full_name,
+                    username_lower = excluded.username_lower
+                RETURNING {User.select()}
+            """, (telegram_id, username, full_name, username.lower() if username else None))
+            user = User.from_row(await cursor.fetchone())
+            
+            if not user.personal_workspace_id:
+                cursor = await db.execute(
+                    "SELECT id FROM workspaces WHERE owner_id = ? AND is_personal = TRUE ORDER BY id LIMIT 1",
+                    (user.id,)
+                )
+                existing = await cursor.fetchone()
+                if existing:
+                    await db.execute(
+                        "UPDATE users SET personal_workspace_id = ? WHERE id = ?",
+                        (existing[0], user.id)
+                    )
+                    user.personal_workspace_id = existing[0]
+                else:
+                    user.personal_workspace_id = await create_personal_workspace(user.id)
+        
+        return user
 
 
-async def get_user_by_username(username: str) -> Optional[Dict]:
-    clean_username = username.replace('@', '').strip()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_user(telegram_id: int) -> Optional[User]:
+    async with _connect() as db:
         cursor = await db.execute(
-            "SELECT * FROM users WHERE username = ?", (clean_username,)
+            f"SELECT {User.select()} FROM users WHERE telegram_id = ?", (telegram_id,)
         )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        return User.from_row(await cursor.fetchone())
 
 
-async def get_user_by_id(user_id: int) -> Optional[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def get_user_by_username(username: str) -> Optional[User]:
+    clean_username = username.replace('@', '').strip().lower()
+    async with _connect() as db:
+        cursor = await db.execute(
+            f"SELECT {User.select()} FROM users WHERE username_lower = ?", (clean_username,)
+        )
+        return User.from_row(await cursor.fetchone())
+
+
+async def autocomplete_users(query: str, workspace_id: int = None, limit: int = 8) -> List[Dict]:
+    """
+    Подсказки username по началу (индекс username_lower) и по подстроке
+    (триграммы). Участники пространства идут первыми.
+    """
+    prefix = query.replace('@', '').strip().lower()
+    if not prefix:
+        return []
+    upper = prefix + "\U0010ffff"
+    
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
+        found: Dict[int, Dict] = {}
+        
+        if workspace_id:
+            cursor = await db.execute("""
+                SELECT u.id, u.username, u.full_name, 1 AS is_member
+                FROM workspace_members wm
+                JOIN users u ON u.id = wm.user_id
+                WHERE wm.workspace_id = ? AND u.username_lower >= ? AND u.username_lower < ?
+                ORDER BY u.username_lower
+                LIMIT ?
+            """, (workspace_id, prefix, upper, limit))
+            for row in await cursor.fetchall():
+                found[row["id"]] = dict(row)
+        
+        if len(found) < limit:
+            cursor = await db.execute("""
+                SELECT id, username, full_name, 0 AS is_member
+                FROM users
+                WHERE username_lower >= ? AND username_lower < ?
+                ORDER BY username_lower
+                LIMIT ?
+            """, (prefix, upper, limit))
+            for row in await cursor.fetchall():
+                found.setdefault(row["id"], dict(row))
+        
+        # Триграммный индекс работает от трёх символов
+        if len(found) < limit and len(prefix) >= 3:
+            cursor = await db.execute("""
+                SELECT u.id, u.username, u.full_name,
+                       EXISTS (SELECT 1 FROM workspace_members wm
+                               WHERE wm.workspace_id = ? AND wm.user_id = u.id) AS is_member
+                FROM users_trigram
+                JOIN users u ON u.id = users_trigram.rowid
+                WHERE users_trigram MATCH ?
+                ORDER BY is_member DESC, length(u.username_lower)
+                LIMIT ?
+            """, (workspace_id, '"' + prefix.replace('"', '""') + '"', limit))
+            for row in await cursor.fetchall():
+                found.setdefault(row["id"], dict(row))
+    
+    results = sorted(found.values(), key=lambda u: not u["is_member"])
+    return results[:limit]
+
+
+async def get_user_by_id(user_id: int) -> Optional[User]:
+    async with _connect() as db:
         cursor = await db.execute(
-            "SELECT * FROM users WHERE id = ?", (user_id,)
+            f"SELECT {User.select()} FROM users WHERE id = ?", (user_id,)
         )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+        return User.from_row(await cursor.fetchone())
+
+
+async def get_users_by_ids(user_ids: List[int]) -> List[User]:
+    if not user_ids:
+        return []
+    placeholders = ", ".join("?" for _ in user_ids)
+    async with _connect() as db:
+        cursor = await db.execute(
+            f"SELECT {User.select()} FROM users WHERE id IN ({placeholders})", list(user_ids)
+        )
+        return User.from_rows(await cursor.fetchall())
+
+
+async def get_users_by_telegram_ids(telegram_ids: List[int]) -> List[User]:
+    if not telegram_ids:
+        return []
+    placeholders = ", ".join("?" for _ in telegram_ids)
+    async with _connect() as db:
+        cursor = await db.execute(
+            f"SELECT {User.select()} FROM users WHERE telegram_id IN ({placeholders})", list(telegram_ids)
+        )
+        return User.from_rows(await cursor.fetchall())
 
 
 # ==================== ПРОСТРАНСТВА ====================
@@ -241,7 +716,7 @@ async def get_user_by_id(user_id: int) -> Optional[Dict]:
 async def create_workspace(name: str, owner_id: int, is_personal: bool = False, description: str = None) -> int:
     invite_code = secrets.token_urlsafe(8) if not is_personal else None
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute(
             "INSERT INTO workspaces (name, description, owner_id, is_personal, invite_code) VALUES (?, ?, ?, ?, ?)",
             (name, description, owner_id, is_personal, invite_code)
@@ -261,62 +736,105 @@ async def create_workspace(name: str, owner_id: int, is_personal: bool = False,
         funnel_id = cursor.lastrowid
         
         stages = [("📥 Новые", 0, "#e74c3c"), ("🔄 В работе", 1, "#f39c12"), ("✅ Готово", 2, "#27ae60")]
-        for stage_name, position, color in stages:
+        for (stage_name, position, color), sort_key in zip(stages, spread_keys(len(stages))):
             await db.execute(
-                "INSERT INTO funnel_stages (funnel_id, name, position, color) VALUES (?, ?, ?, ?)",
-                (funnel_id, stage_name, position, color)
+                "INSERT INTO funnel_stages (funnel_id, name, position, sort_key, color) VALUES (?, ?, ?, ?, ?)",
+                (funnel_id, stage_name, position, sort_key, color)
             )
         
-        await db.commit()
+        await _commit(db)
         return workspace_id
 
 
 async def create_personal_workspace(user_id: int) -> int:
-    return await create_workspace("🏠 Личное пространство", user_id, True, "Ваши личные задачи")
+    async with transaction():
+        workspace_id = await create_workspace("🏠 Личное пространство", user_id, True, "Ваши личные задачи")
+        async with _connect() as db:
+            await db.execute(
+                "UPDATE users SET personal_workspace_id = ? WHERE id = ?", (workspace_id, user_id)
+            )
+        return workspace_id
 
 
-async def get_user_workspaces(user_id: int) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("""
-            SELECT w.*, wm.role, wm.custom_role, wm.can_edit_tasks, wm.can_delete_tasks, 
+async def get_user_workspaces(user_id: int) -> List[Workspace]:
+    async with _connect() as db:
+        cursor = await db.execute(f"""
+            SELECT {Workspace.select("w")}, wm.role, wm.custom_role, wm.can_edit_tasks, wm.can_delete_tasks, 
                    wm.can_assign_tasks, wm.can_manage_members
             FROM workspaces w
             JOIN workspace_members wm ON w.id = wm.workspace_id
             WHERE wm.user_id = ?
             ORDER BY w.is_personal DESC, w.created_at ASC
         """, (user_id,))
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return Workspace.from_rows(await cursor.fetchall())
 
 
-async def get_workspace(workspace_id: int) -> Optional[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM workspaces WHERE id = ?", (workspace_id,))
+async def get_workspace(workspace_id: int) -> Optional[Workspace]:
+    async with _connect() as db:
+        cursor = await db.execute(
+            f"SELECT {Workspace.select()} FROM workspaces WHERE id = ?", (workspace_id,)
+        )
+        return Workspace.from_row(await cursor.fetchone())
+
+
+async def get_personal_workspace(telegram_id: int) -> Optional[Workspace]:
+    """Личное пространство по указателю в users — без перебора всех пространств"""
+    async with _connect() as db:
+        cursor = await db.execute(f"""
+            SELECT {Workspace.select("w")} FROM users u
+            JOIN workspaces w ON w.id = u.personal_workspace_id
+            WHERE u.telegram_id = ?
+        """, (telegram_id,))
+        return Workspace.from_row(await cursor.fetchone())
+
+
+async def get_workspace_version(workspace_id: int) -> Optional[int]:
+    async with _connect() as db:
+        cursor = await db.execute("SELECT version FROM workspaces WHERE id = ?", (workspace_id,))
         row = await cursor.fetchone()
-        return dict(row) if row else None
+        return row[0] if row else None
 
 
-async def get_workspace_members(workspace_id: int) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("""
-            SELECT u.*, wm.role, wm.custom_role, wm.can_edit_tasks, wm.can_delete_tasks,
+async def get_workspaces_by_ids(workspace_ids: List[int]) -> List[Workspace]:
+    if not workspace_ids:
+        return []
+    placeholders = ", ".join("?" for _ in workspace_ids)
+    async with _connect() as db:
+        cursor = await db.execute(
+            f"SELECT {Workspace.select()} FROM workspaces WHERE id IN ({placeholders})", list(workspace_ids)
+        )
+        return Workspace.from_rows(await cursor.fetchall())
+
+
+async def get_workspace_members(workspace_id: int) -> List[Member]:
+    async with _connect() as db:
+        cursor = await db.execute(f"""
+            SELECT {Member.select("u")}, wm.role, wm.custom_role, wm.can_edit_tasks, wm.can_delete_tasks,
                    wm.can_assign_tasks, wm.can_manage_members, wm.joined_at
             FROM users u
             JOIN workspace_members wm ON u.id = wm.user_id
             WHERE wm.workspace_id = ?
             ORDER BY wm.role DESC, wm.joined_at ASC
         """, (workspace_id,))
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return Member.from_rows(await cursor.fetchall())
+
+
+async def get_workspace_member(workspace_id: int, user_id: int) -> Optional[Member]:
+    async with _connect() as db:
+        cursor = await db.execute(f"""
+            SELECT {Member.select("u")}, wm.role, wm.custom_role, wm.can_edit_tasks, wm.can_delete_tasks,
+                   wm.can_assign_tasks, wm.can_manage_members, wm.joined_at
+            FROM workspace_members wm
+            JOIN users u ON u.id = wm.user_id
+            WHERE wm.workspace_id = ? AND wm.user_id = ?
+        """, (workspace_id, user_id))
+        return Member.from_row(await cursor.fetchone())
 
 
 async def add_member_to_workspace(workspace_id: int, user_id: int, role: str = 'member', 
                                    custom_role: str = None, permissions: dict = None) -> bool:
     perms = permissions or {}
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         try:
             await db.execute("""
                 INSERT INTO workspace_members 
@@ -330,7 +848,7 @@ async def add_member_to_workspace(workspace_id: int, user_id: int, role: str = '
                 perms.get('can_assign_tasks', False),
                 perms.get('can_manage_members', False)
             ))
-            await db.commit()
+            await _commit(db)
             return True
         except:
             return False
@@ -338,7 +856,7 @@ async def add_member_to_workspace(workspace_id: int, user_id: int, role: str = '
 
 async def update_member_role(workspace_id: int, user_id: int, role: str = None, 
                               custom_role: str = None, permissions: dict = None) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         updates = []
         params = []
         
@@ -360,22 +878,22 @@ async def update_member_role(workspace_id: int, user_id: int, role: str = None,
         query = f"UPDATE workspace_members SET {', '.join(updates)} WHERE workspace_id = ? AND user_id = ?"
         
         await db.execute(query, params)
-        await db.commit()
+        await _commit(db)
         return True
 
 
 async def remove_member_from_workspace(workspace_id: int, user_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         await db.execute(
             "DELETE FROM workspace_members WHERE workspace_id = ? AND user_id = ?",
             (workspace_id, user_id)
         )
-        await db.commit()
+        await _commit(db)
         return True
 
 
 async def join_workspace_by_code(user_id: int, invite_code: str) -> Optional[int]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute("SELECT id FROM workspaces WHERE invite_code = ?", (invite_code,))
         row = await cursor.fetchone()
         
@@ -387,14 +905,14 @@ async def join_workspace_by_code(user_id: int, invite_code: str) -> Optional[int
             "INSERT OR IGNORE INTO workspace_members (workspace_id, user_id, role) VALUES (?, ?, 'member')",
             (workspace_id, user_id)
         )
-        await db.commit()
+        await _commit(db)
         return workspace_id
 
 
 # ==================== ВОРОНКИ ====================
 
 async def get_funnels(workspace_id: int) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
             "SELECT * FROM funnels WHERE workspace_id = ? ORDER BY position", (workspace_id,)
@@ -404,39 +922,73 @@ async def get_funnels(workspace_id: int) -> List[Dict]:
 
 
 async def get_funnel_stages(funnel_id: int) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM funnel_stages WHERE funnel_id = ? ORDER BY position", (funnel_id,)
+            "SELECT * FROM funnel_stages WHERE funnel_id = ? ORDER BY sort_key, position", (funnel_id,)
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
 
 
 async def create_funnel(workspace_id: int, name: str) -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute(
             "INSERT INTO funnels (workspace_id, name) VALUES (?, ?)", (workspace_id, name)
         )
         funnel_id = cursor.lastrowid
         
         stages = [("📥 Новые", 0), ("🔄 В работе", 1), ("✅ Готово", 2)]
-        for stage_name, position in stages:
+        for (stage_name, position), sort_key in zip(stages, spread_keys(len(stages))):
             await db.execute(
-                "INSERT INTO funnel_stages (funnel_id, name, position) VALUES (?, ?, ?)",
-                (funnel_id, stage_name, position)
+                "INSERT INTO funnel_stages (funnel_id, name, position, sort_key) VALUES (?, ?, ?, ?)",
+                (funnel_id, stage_name, position, sort_key)
             )
-        await db.commit()
+        await _commit(db)
         return funnel_id
 
 
+async def get_stage_workspace_id(stage_id: int) -> Optional[int]:
+    """Пространство, которому принадлежит этап воронки"""
+    async with _connect() as db:
+        cursor = await db.execute("""
+            SELECT f.workspace_id FROM funnel_stages s JOIN funnels f ON f.id = s.funnel_id
+            WHERE s.id = ?
+        """, (stage_id,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def move_stage(stage_id: int, after_id: int = None) -> Optional[Dict]:
+    """
+    Ставит этап сразу после этапа after_id (None — в начало воронки), меняя одну строку.
+    ValueError — если after_id не в этой воронке
+    """
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT funnel_id FROM funnel_stages WHERE id = ?", (stage_id,))
+        stage = await cursor.fetchone()
+        if not stage:
+            return None
+        
+        sort_key = await _sort_key_after(
+            db, "funnel_stages", {"funnel_id": stage["funnel_id"]}, after_id, stage_id
+        )
+        cursor = await db.execute(
+            "UPDATE funnel_stages SET sort_key = ? WHERE id = ? RETURNING *", (sort_key, stage_id)
+        )
+        row = await cursor.fetchone()
+        await _commit(db)
+        return dict(row)
+
+
 # ==================== ЗАДАЧИ ====================
 
 async def create_task(workspace_id: int, title: str, created_by: int, 
                       description: str = None, priority: str = "medium",
                       due_date: str = None, due_time: str = None,
                       assigned_to: int = None, assigned_username: str = None) -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute(
             "SELECT id FROM funnels WHERE workspace_id = ? LIMIT 1", (workspace_id,)
         )
@@ -446,89 +998,476 @@ async def create_task(workspace_id: int, title: str, created_by: int,
         stage_id = None
         if funnel_id:
             cursor = await db.execute(
-                "SELECT id FROM funnel_stages WHERE funnel_id = ? ORDER BY position LIMIT 1", (funnel_id,)
+                "SELECT id FROM funnel_stages WHERE funnel_id = ? ORDER BY sort_key, position LIMIT 1", (funnel_id,)
             )
             stage_row = await cursor.fetchone()
             stage_id = stage_row[0] if stage_row else None
         
+        # Новая задача — первой в этапе
+        sort_key = await _sort_key_after(
+            db, "tasks", {"workspace_id": workspace_id, "stage_id": stage_id}, None
+        )
+        
         cursor = await db.execute("""
             INSERT INTO tasks 
             (workspace_id, funnel_id, stage_id, title, description, priority, 
-             due_date, due_time, created_by, assigned_to, assigned_username)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             due_date, due_time, created_by, assigned_to, assigned_username, sort_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (workspace_id, funnel_id, stage_id, title, description, priority, 
-              due_date, due_time, created_by, assigned_to, assigned_username))
+              due_date, due_time, created_by, assigned_to, assigned_username, sort_key))
         
-        await db.commit()
+        await _commit(db)
         return cursor.lastrowid
 
 
-async def get_tasks(workspace_id: int, stage_id: int = None) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        
+async def get_tasks(workspace_id: int, stage_id: int = None, limit: int = -1) -> List[Task]:
+    async with _connect() as db:
         if stage_id:
             cursor = await db.execute(
-                "SELECT * FROM tasks WHERE workspace_id = ? AND stage_id = ? ORDER BY priority DESC, created_at DESC",
-                (workspace_id, stage_id)
+                f"SELECT {Task.select()} FROM tasks WHERE workspace_id = ? AND stage_id = ? ORDER BY sort_key, id LIMIT ?",
+                (workspace_id, stage_id, limit)
             )
         else:
             cursor = await db.execute(
-                "SELECT * FROM tasks WHERE workspace_id = ? ORDER BY priority DESC, created_at DESC", 
-                (workspace_id,)
+                f"SELECT {Task.select()} FROM tasks WHERE workspace_id = ? ORDER BY stage_id, sort_key, id LIMIT ?", 
+                (workspace_id, limit)
             )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return Task.from_rows(await cursor.fetchall())
+
+
+async def get_assigned_tasks(user_id: int, status: str = "todo", cursor: str = None,
+                             limit: int = 20) -> Tuple[List[Task], Optional[str]]:
+    """
+    Задачи, назначенные пользователю, во всех его пространствах.
+    Сначала со сроком (по due_date, id), затем без срока (по id).
+    Курсор — "d|<due_date>|<id>" или "n|<id>"; возвращает (задачи, следующий курсор)
+    """
+    phase, due_after, id_after = "d", "", 0
+    if cursor:
+        parts = cursor.split("|")
+        try:
+            if parts[0] == "d" and len(parts) == 3:
+                due_after, id_after = parts[1], int(parts[2])
+            elif parts[0] == "n" and len(parts) == 2:
+                phase, id_after = "n", int(parts[1])
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"Некорректный курсор: {cursor}")
+    
+    select = f"""
+        SELECT {Task.select("t")}, w.name AS workspace_name
+        FROM tasks t
+        JOIN workspaces w ON w.id = t.workspace_id
+    """
+    
+    async with _connect() as db:
+        tasks = []
+        
+        if phase == "d":
+            cur = await db.execute(select + """
+                WHERE t.assigned_to = ? AND t.status = ?
+                  AND t.due_date IS NOT NULL AND (t.due_date, t.id) > (?, ?)
+                ORDER BY t.due_date, t.id
+                LIMIT ?
+            """, (user_id, status, due_after, id_after, limit + 1))
+            tasks = Task.from_rows(await cur.fetchall())
+            if len(tasks) > limit:
+                last = tasks[limit - 1]
+                return tasks[:limit], f"d|{last.due_date}|{last.id}"
+            id_after = 0
+        
+        # Задачи без срока — после всех задач со сроком
+        cur = await db.execute(select + """
+            WHERE t.assigned_to = ? AND t.status = ?
+              AND t.due_date IS NULL AND t.id > ?
+            ORDER BY t.id
+            LIMIT ?
+        """, (user_id, status, id_after, limit - len(tasks) + 1))
+        tasks += Task.from_rows(await cur.fetchall())
+        
+        if len(tasks) > limit:
+            last = tasks[limit - 1]
+            # Страница могла закончиться ровно на последней задаче со сроком
+            return tasks[:limit], f"n|{last.id if last.due_date is None else 0}"
+        return tasks, None
 
 
-async def get_task(task_id: int) -> Optional[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-        row = await cursor.fetchone()
-        return dict(row) if row else None
+async def get_task(task_id: int) -> Optional[Task]:
+    async with _connect() as db:
+        cursor = await db.execute(f"SELECT {Task.select()} FROM tasks WHERE id = ?", (task_id,))
+        return Task.from_row(await cursor.fetchone())
 
 
-async def update_task(task_id: int, **kwargs) -> bool:
+async def get_tasks_by_ids(task_ids: List[int]) -> List[Task]:
+    if not task_ids:
+        return []
+    placeholders = ", ".join("?" for _ in task_ids)
+    async with _connect() as db:
+        cursor = await db.execute(
+            f"SELECT {Task.select()} FROM tasks WHERE id IN ({placeholders})", list(task_ids)
+        )
+        return Task.from_rows(await cursor.fetchall())
+
+
+async def update_task(task_id: int, **kwargs) -> Optional[Task]:
+    """Обновляет задачу и возвращает её новую версию (None — если задачи нет)"""
     if not kwargs:
-        return False
+        return None
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
+        if "stage_id" in kwargs and "sort_key" not in kwargs:
+            # Смена этапа ставит задачу первой в новом этапе
+            cursor = await db.execute("SELECT workspace_id, stage_id FROM tasks WHERE id = ?", (task_id,))
+            row = await cursor.fetchone()
+            if row and row[1] != kwargs["stage_id"]:
+                kwargs["sort_key"] = await _sort_key_after(
+                    db, "tasks", {"workspace_id": row[0], "stage_id": kwargs["stage_id"]}, None, task_id
+                )
+        
         set_clause = ", ".join(f"{key} = ?" for key in kwargs.keys())
-        await db.execute(
-            f"UPDATE tasks SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        cursor = await db.execute(
+            f"UPDATE tasks SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING {Task.select()}",
             list(kwargs.values()) + [task_id]
         )
-        await db.commit()
-        return True
+        row = await cursor.fetchone()
+        await _commit(db)
+        return Task.from_row(row)
+
+
+async def move_task(task_id: int, stage_id: int, after_id: int = None) -> Optional[Task]:
+    """
+    Перенос задачи в этап stage_id сразу после задачи after_id
+    (None — первой в этапе). Меняется одна строка.
+    ValueError — если этап из другого пространства или after_id не в этом этапе
+    """
+    async with _connect() as db:
+        cursor = await db.execute("SELECT workspace_id FROM tasks WHERE id = ?", (task_id,))
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        
+        cursor = await db.execute("""
+            SELECT 1 FROM funnel_stages s JOIN funnels f ON f.id = s.funnel_id
+            WHERE s.id = ? AND f.workspace_id = ?
+        """, (stage_id, row[0]))
+        if not await cursor.fetchone():
+            raise ValueError(f"Этап {stage_id} не найден в пространстве задачи")
+        
+        sort_key = await _sort_key_after(
+            db, "tasks", {"workspace_id": row[0], "stage_id": stage_id}, after_id, task_id
+        )
+        cursor = await db.execute(f"""
+            UPDATE tasks SET stage_id = ?, sort_key = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            RETURNING {Task.select()}
+        """, (stage_id, sort_key, task_id))
+        row = await cursor.fetchone()
+        await _commit(db)
+        return Task.from_row(row)
+
+
+async def toggle_task(task_id: int) -> Optional[Task]:
+    """Переключает статус done <-> todo одним UPDATE"""
+    async with _connect() as db:
+        cursor = await db.execute(f"""
+            UPDATE tasks
+            SET status = CASE WHEN status = 'done' THEN 'todo' ELSE 'done' END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            RETURNING {Task.select()}
+        """, (task_id,))
+        row = await cursor.fetchone()
+        await _commit(db)
+        return Task.from_row(row)
 
 
-async def delete_task(task_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+async def delete_task(task_id: int) -> Optional[int]:
+    """Удалить задачу; возвращает id её пространства (None — задачи не было)"""
+    async with _connect() as db:
         await db.execute("DELETE FROM reminders WHERE task_id = ?", (task_id,))
         await db.execute("DELETE FROM task_comments WHERE task_id = ?", (task_id,))
-        await db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        await db.commit()
-        return True
+        cursor = await db.execute("DELETE FROM tasks WHERE id = ? RETURNING workspace_id", (task_id,))
+        row = await cursor.fetchone()
+        await _commit(db)
+        return row[0] if row else None
+
+
+# ==================== ПОРЯДОК ЗАДАЧ И ЭТАПОВ ====================
+
+# Таблица -> колонки группы, внутри которой действует порядок,
+# и прежняя сортировка для строк без ключа
+_ORDERED_TABLES = {
+    "tasks": (("workspace_id", "stage_id"), "priority DESC, created_at DESC, id"),
+    "funnel_stages": (("funnel_id",), "position, id"),
+}
+
+
+async def _sort_key_after(db: aiosqlite.Connection, table: str, group: Dict,
+                          after_id: Optional[int], exclude_id: int = None) -> str:
+    """
+    Ключ для строки сразу после after_id в группе (None — в начало).
+    Соседа справа находим одним поиском по индексу (группа, sort_key)
+    """
+    where = " AND ".join(f"{column} IS ?" for column in group)
+    params = list(group.values())
+    
+    after_key = None
+    if after_id is not None:
+        cursor = await db.execute(
+            f"SELECT sort_key FROM {table} WHERE id = ? AND {where}", [after_id] + params
+        )
+        row = await cursor.fetchone()
+        if not row or row[0] is None:
+            raise ValueError(f"Элемент {after_id} не найден в этой группе")
+        after_key = row[0]
+    
+    cursor = await db.execute(f"""
+        SELECT sort_key FROM {table}
+        WHERE {where} AND sort_key > ? AND id IS NOT ?
+        ORDER BY sort_key LIMIT 1
+    """, params + [after_key or "", exclude_id])
+    row = await cursor.fetchone()
+    return key_between(after_key, row[0] if row else None)
+
+
+async def _rebalance_sort_keys(db: aiosqlite.Connection, max_length: int) -> int:
+    """Заново раздаёт ключи группам с пустыми, повторяющимися или слишком длинными ключами"""
+    updated = 0
+    for table, (group, legacy_order) in _ORDERED_TABLES.items():
+        columns = ", ".join(group)
+        cursor = await db.execute(f"""
+            SELECT {columns} FROM {table}
+            GROUP BY {columns}
+            HAVING count(sort_key) < count(*)
+                OR count(DISTINCT sort_key) < count(*)
+                OR max(length(sort_key)) > ?
+        """, (max_length,))
+        groups = await cursor.fetchall()
+        
+        where = " AND ".join(f"{column} IS ?" for column in group)
+        for values in groups:
+            cursor = await db.execute(f"""
+                SELECT id FROM {table} WHERE {where}
+                ORDER BY sort_key IS NOT NULL, sort_key, {legacy_order}
+            """, values)
+            ids = [row[0] for row in await cursor.fetchall()]
+            await db.executemany(
+                f"UPDATE {table} SET sort_key = ? WHERE id = ?",
+                zip(spread_keys(len(ids)), ids)
+            )
+            updated += len(ids)
+    return updated
+
+
+async def rebalance_sort_keys(max_length: int = MAX_KEY_LENGTH) -> int:
+    """Фоновая перебалансировка ключей порядка; возвращает число переписанных строк"""
+    async with transaction():
+        async with _connect() as db:
+            return await _rebalance_sort_keys(db, max_length)
+
+
+# ==================== СЧЁТЧИКИ ЗАДАЧ ====================
+
+async def get_task_counters(workspace_id: int) -> Dict:
+    """
+    Счётчики пространства без чтения самих задач:
+    {"total": 10, "status": {"done": 3, ...}, "stage": {5: 4, ...}, "assignee": {7: 2, ...}}
+    """
+    async with _connect() as db:
+        cursor = await db.execute(
+            "SELECT dimension, key, count FROM task_counters WHERE workspace_id = ? AND count != 0",
+            (workspace_id,)
+        )
+        rows = await cursor.fetchall()
+    
+    result = {"total": 0, "status": {}, "stage": {}, "assignee": {}}
+    for dimension, key, count in rows:
+        if dimension == "total":
+            result["total"] = count
+        elif dimension == "status":
+            result["status"][key] = count
+        elif key != "":
+            result[dimension][int(key)] = count
+    return result
+
+
+async def get_user_task_stats(user_id: int) -> Dict:
+    """Всего / выполнено по всем пространствам пользователя"""
+    async with _connect() as db:
+        cursor = await db.execute("""
+            SELECT
+                COALESCE(SUM(CASE WHEN c.dimension = 'total' THEN c.count END), 0),
+                COALESCE(SUM(CASE WHEN c.dimension = 'status' THEN c.count END), 0)
+            FROM workspace_members wm
+            JOIN task_counters c ON c.workspace_id = wm.workspace_id
+            WHERE wm.user_id = ?
+              AND (c.dimension = 'total' OR (c.dimension = 'status' AND c.key = 'done'))
+        """, (user_id,))
+        total, done = await cursor.fetchone()
+        return {"total": total, "done": done}
+
+
+async def rebuild_task_counters() -> None:
+    """Пересчитать счётчики с нуля (после ручных правок базы)"""
+    async with transaction():
+        async with _connect() as db:
+            await db.execute("DELETE FROM task_counters")
+            await db.execute(
+                f"INSERT INTO task_counters (workspace_id, dimension, key, count) {_COUNTERS_FROM_TASKS}"
+            )
+
+
+async def verify_task_counters() -> List[Dict]:
+    """Расхождения между счётчиками и таблицей tasks (пустой список — всё точно)"""
+    async with _connect() as db:
+        cursor = await db.execute(f"""
+            WITH expected (workspace_id, dimension, key, count) AS ({_COUNTERS_FROM_TASKS}),
+            stored AS (SELECT * FROM task_counters WHERE count != 0)
+            SELECT e.workspace_id, e.dimension, e.key, e.count, COALESCE(s.count, 0)
+            FROM expected e
+            LEFT JOIN stored s USING (workspace_id, dimension, key)
+            WHERE s.count IS NOT e.count
+            UNION ALL
+            SELECT s.workspace_id, s.dimension, s.key, 0, s.count
+            FROM stored s
+            LEFT JOIN expected e USING (workspace_id, dimension, key)
+            WHERE e.count IS NULL
+        """)
+        rows = await cursor.fetchall()
+        return [
+            {"workspace_id": ws, "dimension": dim, "key": key, "expected": exp, "stored": stored}
+            for ws, dim, key, exp, stored in rows
+        ]
+
+
+# ==================== ПОИСК ====================
+
+def _fts_query(text: str) -> Optional[str]:
+    """Пользовательский ввод -> запрос FTS5: все слова, каждое как префикс"""
+    words = re.findall(r"\w+", text.replace("ё", "е").replace("Ё", "Е"))
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+async def search(user_id: int, text: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    Поиск по задачам, заметкам и комментариям во всех пространствах
+    пользователя. Результаты отсортированы по bm25 (лучшие первыми).
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+    
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("""
+            WITH my_workspaces AS (
+                SELECT workspace_id FROM workspace_members WHERE user_id = :user_id
+            )
+            SELECT * FROM (
+                SELECT 'task' AS kind, t.id, t.id AS task_id, t.workspace_id, t.title,
+                       snippet(tasks_fts, -1, '', '', '…', 12) AS snippet,
+                       bm25(tasks_fts) AS rank
+                FROM tasks_fts
+                JOIN tasks t ON t.id = tasks_fts.rowid
+                WHERE tasks_fts MATCH :query
+                  AND t.workspace_id IN my_workspaces
+                
+                UNION ALL
+                
+                SELECT 'note', n.id, NULL, n.workspace_id, n.title,
+                       snippet(notes_fts, -1, '', '', '…', 12),
+                       bm25(notes_fts)
+                FROM notes_fts
+                JOIN notes n ON n.id = notes_fts.rowid
+                WHERE notes_fts MATCH :query
+                  AND n.workspace_id IN my_workspaces
+                
+                UNION ALL
+                
+                SELECT 'comment', c.id, c.task_id, t.workspace_id, t.title,
+                       snippet(task_comments_fts, -1, '', '', '…', 12),
+                       bm25(task_comments_fts)
+                FROM task_comments_fts
+                JOIN task_comments c ON c.id = task_comments_fts.rowid
+                JOIN tasks t ON t.id = c.task_id
+                WHERE task_comments_fts MATCH :query
+                  AND t.workspace_id IN my_workspaces
+            )
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        """, {"user_id": user_id, "query": query, "limit": limit, "offset": offset})
+        rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+
+# ==================== КАЛЕНДАРЬ ====================
+
+async def get_calendar_items(workspace_id: int, date_from: str, date_to: str) -> Dict:
+    """Задачи со сроком и заметки с датой в полуинтервале [date_from, date_to)"""
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("""
+            SELECT id, title, description, priority, status, due_date, due_time, assigned_username, created_at
+            FROM tasks
+            WHERE workspace_id = ? AND due_date >= ? AND due_date < ?
+            ORDER BY due_date, due_time
+        """, (workspace_id, date_from, date_to))
+        tasks = [dict(row) for row in await cursor.fetchall()]
+        
+        cursor = await db.execute("""
+            SELECT id, title, content, note_date, color
+            FROM notes
+            WHERE workspace_id = ? AND note_date >= ? AND note_date < ?
+            ORDER BY note_date, created_at
+        """, (workspace_id, date_from, date_to))
+        notes = [dict(row) for row in await cursor.fetchall()]
+        
+        return {"tasks": tasks, "notes": notes}
+
+
+async def get_urgent_tasks(workspace_id: int, limit: int = 5) -> Dict:
+    """Открытые задачи с высоким приоритетом: сколько всего и первые limit по сроку"""
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("""
+            SELECT COUNT(*) FROM tasks
+            WHERE workspace_id = ? AND priority = 'high' AND status != 'done'
+        """, (workspace_id,))
+        count = (await cursor.fetchone())[0]
+        
+        cursor = await db.execute("""
+            SELECT id, title, description, priority, status, due_date, due_time, assigned_username, created_at
+            FROM tasks
+            WHERE workspace_id = ? AND priority = 'high' AND status != 'done'
+            ORDER BY due_date IS NULL, due_date, due_time, id
+            LIMIT ?
+        """, (workspace_id, limit))
+        tasks = [dict(row) for row in await cursor.fetchall()]
+        
+        return {"count": count, "tasks": tasks}
 
 
 # ==================== НАПОМИНАНИЯ ====================
 
 async def create_reminder(task_id: int, user_id: int, remind_at: datetime) -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute(
             "INSERT INTO reminders (task_id, user_id, remind_at) VALUES (?, ?, ?)",
             (task_id, user_id, remind_at)
         )
-        await db.commit()
+        await _commit(db)
         return cursor.lastrowid
 
 
 async def get_pending_reminders() -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute("""
-            SELECT r.*, t.title as task_title, u.telegram_id
+            SELECT r.*, t.title as task_title, u.telegram_id,
+                   (julianday('now') - julianday(r.remind_at)) * 86400 AS overdue_seconds
             FROM reminders r
             JOIN tasks t ON r.task_id = t.id
             JOIN users u ON r.user_id = u.id
@@ -539,14 +1478,14 @@ async def get_pending_reminders() -> List[Dict]:
 
 
 async def mark_reminder_sent(reminder_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         await db.execute("UPDATE reminders SET is_sent = TRUE WHERE id = ?", (reminder_id,))
-        await db.commit()
+        await _commit(db)
         return True
 
 
 async def get_user_reminders(user_id: int) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute("""
             SELECT r.*, t.title as task_title FROM reminders r
@@ -562,75 +1501,177 @@ async def get_user_reminders(user_id: int) -> List[Dict]:
 
 async def create_note(workspace_id: int, user_id: int, title: str, 
                       content: str = None, note_date: str = None, color: str = '#ffc107') -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute("""
             INSERT INTO notes (workspace_id, user_id, title, content, note_date, color)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (workspace_id, user_id, title, content, note_date, color))
-        await db.commit()
+        await _commit(db)
         return cursor.lastrowid
 
 
-async def get_notes(workspace_id: int, note_date: str = None) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        
+async def get_note(note_id: int) -> Optional[Note]:
+    async with _connect() as db:
+        cursor = await db.execute(f"SELECT {Note.select()} FROM notes WHERE id = ?", (note_id,))
+        return Note.from_row(await cursor.fetchone())
+
+
+async def get_notes(workspace_id: int, note_date: str = None) -> List[Note]:
+    async with _connect() as db:
         if note_date:
             cursor = await db.execute(
-                "SELECT * FROM notes WHERE workspace_id = ? AND note_date = ? ORDER BY created_at DESC",
+                f"SELECT {Note.select()} FROM notes WHERE workspace_id = ? AND note_date = ? ORDER BY created_at DESC",
                 (workspace_id, note_date)
             )
         else:
             cursor = await db.execute(
-                "SELECT * FROM notes WHERE workspace_id = ? ORDER BY created_at DESC",
+                f"SELECT {Note.select()} FROM notes WHERE workspace_id = ? ORDER BY created_at DESC",
                 (workspace_id,)
             )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return Note.from_rows(await cursor.fetchall())
 
 
-async def update_note(note_id: int, **kwargs) -> bool:
+async def update_note(note_id: int, **kwargs) -> Optional[Note]:
     if not kwargs:
-        return False
+        return None
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         set_clause = ", ".join(f"{key} = ?" for key in kwargs.keys())
-        await db.execute(
-            f"UPDATE notes SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        cursor = await db.execute(
+            f"UPDATE notes SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING {Note.select()}",
             list(kwargs.values()) + [note_id]
         )
-        await db.commit()
-        return True
+        row = await cursor.fetchone()
+        await _commit(db)
+        return Note.from_row(row)
 
 
-async def delete_note(note_id: int) -> bool:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute("DELETE FROM notes WHERE id = ?", (note_id,))
-        await db.commit()
-        return True
+async def delete_note(note_id: int) -> Optional[int]:
+    """Удалить заметку; возвращает id её пространства (None — заметки не было)"""
+    async with _connect() as db:
+        cursor = await db.execute("DELETE FROM notes WHERE id = ? RETURNING workspace_id", (note_id,))
+        row = await cursor.fetchone()
+        await _commit(db)
+        return row[0] if row else None
 
 
 # ==================== КОММЕНТАРИИ К ЗАДАЧАМ ====================
 
 async def add_task_comment(task_id: int, user_id: int, comment_text: str) -> int:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         cursor = await db.execute(
             "INSERT INTO task_comments (task_id, user_id, comment_text) VALUES (?, ?, ?)",
             (task_id, user_id, comment_text)
         )
-        await db.commit()
+        await _commit(db)
         return cursor.lastrowid
 
 
-async def get_task_comments(task_id: int) -> List[Dict]:
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("""
-            SELECT tc.*, u.username, u.full_name
+async def get_task_comments(task_id: int) -> List[Comment]:
+    async with _connect() as db:
+        cursor = await db.execute(f"""
+            SELECT {Comment.select("tc")}, u.username, u.full_name
             FROM task_comments tc
             JOIN users u ON tc.user_id = u.id
             WHERE tc.task_id = ?
             ORDER BY tc.created_at ASC
         """, (task_id,))
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        return Comment.from_rows(await cursor.fetchall())
+
+
+# ==================== КЛЮЧИ ИДЕМПОТЕНТНОСТИ ====================
+
+async def get_idempotent_response(scope: str, key: str, ttl: int) -> Optional[Tuple[Optional[str], int, bytes]]:
+    """Сохранённый ответ (хэш запроса, код, тело), если ключ моложе ttl секунд"""
+    async with _connect() as db:
+        cursor = await db.execute("""
+            SELECT request_hash, status_code, body FROM idempotency_keys
+            WHERE scope = ? AND key = ? AND created_at > datetime('now', ?)
+        """, (scope, key, f"-{ttl} seconds"))
+        row = await cursor.fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+
+async def save_idempotent_response(scope: str, key: str, request_hash: str, status_code: int, body: bytes):
+    async with _connect() as db:
+        await db.execute("""
+            INSERT OR REPLACE INTO idempotency_keys (scope, key, request_hash, status_code, body)
+            VALUES (?, ?, ?, ?, ?)
+        """, (scope, key, request_hash, status_code, body))
+        await _commit(db)
+
+
+async def purge_idempotency_keys(ttl: int) -> int:
+    """Удаляет ключи старше ttl секунд"""
+    async with _connect() as db:
+        cursor = await db.execute(
+            "DELETE FROM idempotency_keys WHERE created_at <= datetime('now', ?)", (f"-{ttl} seconds",)
+        )
+        await _commit(db)
+        return cursor.rowcount
+
+
+# ==================== АРЕНДА ВЕДУЩЕГО ====================
+
+async def acquire_lease(name: str, holder: str, ttl: float) -> bool:
+    """
+    Взять или продлить аренду name на ttl секунд. Удаётся, если аренда
+    свободна, истекла или уже принадлежит holder
+    """
+    now = time.time()
+    async with _connect() as db:
+        cursor = await db.execute("""
+            INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE
+            SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+            RETURNING holder
+        """, (name, holder, now + ttl, now))
+        row = await cursor.fetchone()
+        await _commit(db)
+        return row is not None
+
+
+async def release_lease(name: str, holder: str):
+    async with _connect() as db:
+        await db.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+        await _commit(db)
+
+
+# ==================== СОСТОЯНИЯ FSM ====================
+
+async def get_fsm_record(key: str) -> Tuple[Optional[str], Optional[str]]:
+    """(состояние, данные в JSON) по ключу"""
+    async with _connect() as db:
+        cursor = await db.execute("SELECT state, data FROM fsm_storage WHERE key = ?", (key,))
+        row = await cursor.fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+
+async def set_fsm_state(key: str, state: Optional[str]):
+    async with _connect() as db:
+        await db.execute("""
+            INSERT INTO fsm_storage (key, state) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET state = excluded.state
+        """, (key, state))
+        await db.execute("DELETE FROM fsm_storage WHERE key = ? AND state IS NULL AND data IS NULL", (key,))
+        await _commit(db)
+
+
+async def set_fsm_data(key: str, data: Optional[str]):
+    async with _connect() as db:
+        await db.execute("""
+            INSERT INTO fsm_storage (key, data) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET data = excluded.data
+        """, (key, data))
+        await db.execute("DELETE FROM fsm_storage WHERE key = ? AND state IS NULL AND data IS NULL", (key,))
+        await _commit(db)
+
+
+# ==================== МЕТРИКИ И ТРАССИРОВКА ====================
+
+# Время каждой публичной функции модуля — в crm_db_query_seconds{function=...}
+instrument_functions(globals(), DB_QUERY_SECONDS, DB_ERRORS)
+
+# Спан «db.<функция>» на вызов внутри трассы
+trace_functions(globals(), "db.")
@@ -6,6 +6,7 @@ from . import tasks
 from . import workspaces
 from . import reminders
 from . import comments # НОВЫЙ ХЭНДЛЕР
+from . import search
 
 # Создаем главный роутер, который соберет все остальные
 main_router = Router()
@@ -16,5 +17,6 @@ main_router.include_router(workspaces.router)
 main_router.include_router(tasks.router)
 main_router.include_router(reminders.router)
 main_router.include_router(comments.router)
+main_router.include_router(search.router)
 
 # Мы возвращаем main_router, чтобы импортировать его в main.py
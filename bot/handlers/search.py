@@ -0,0 +1,105 @@
+# Файл: bot/handlers/search.py
+"""
+Поиск по задачам, заметкам и комментариям
+"""
+
+import html
+import logging
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from bot import database as db
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+PAGE_SIZE = 8
+
+
+class SearchStates(StatesGroup):
+    waiting_query = State()
+
+
+async def send_results(message: Message, telegram_id: int, query: str, offset: int = 0, edit: bool = False):
+    """Показать страницу результатов поиска"""
+    user = await db.get_user(telegram_id)
+    if not user:
+        await message.answer("❌ Отправьте /start")
+        return
+
+    results = await db.search(user["id"], query, limit=PAGE_SIZE + 1, offset=offset)
+    has_more = len(results) > PAGE_SIZE
+    results = results[:PAGE_SIZE]
+
+    builder = InlineKeyboardBuilder()
+
+    # HTML, а не Markdown: запрос, названия и фрагменты — текст пользователей,
+    # и любой «_» или «*» в них ломал бы разметку сообщения
+    if not results:
+        text = f"🔍 <b>Поиск:</b> {html.escape(query)}\n\n<i>Ничего не найдено</i>"
+    else:
+        kind_icons = {"task": "📋", "note": "📝", "comment": "💬"}
+        text = f"🔍 <b>Поиск:</b> {html.escape(query)}\n\n"
+        for r in results:
+            text += f"{kind_icons.get(r['kind'], '•')} {html.escape(r['title'])}\n"
+            if r["snippet"] and r["snippet"] != r["title"]:
+                text += f"   <i>{html.escape(r['snippet'])}</i>\n"
+            if r["task_id"]:
+                title = r["title"][:25] + "..." if len(r["title"]) > 25 else r["title"]
+                builder.add(InlineKeyboardButton(
+                    text=f"{kind_icons['task']} {title}",
+                    callback_data=f"task:{r['task_id']}"
+                ))
+
+    if offset > 0:
+        builder.add(InlineKeyboardButton(text="◀️ Назад", callback_data=f"search:{max(0, offset - PAGE_SIZE)}"))
+    if has_more:
+        builder.add(InlineKeyboardButton(text="▶️ Ещё", callback_data=f"search:{offset + PAGE_SIZE}"))
+    builder.adjust(1)
+
+    if edit:
+        await message.edit_text(text, parse_mode="HTML", reply_markup=builder.as_markup())
+    else:
+        await message.answer(text, parse_mode="HTML", reply_markup=builder.as_markup())
+
+
+@router.message(Command("search"))
+async def cmd_search(message: Message, command: CommandObject, state: FSMContext):
+    """/search <текст>"""
+    logger.info(f"=== SEARCH from {message.from_user.id}: {command.args} ===")
+
+    if not command.args:
+        await message.answer("🔍 Что найти? Введите текст для поиска:")
+        await state.set_state(SearchStates.waiting_query)
+        return
+
+    await state.set_state(None)
+    await state.update_data(search_query=command.args)
+    await send_results(message, message.from_user.id, command.args)
+
+
+@router.message(SearchStates.waiting_query)
+async def process_search_query(message: Message, state: FSMContext):
+    """Текст запроса после /search без аргументов"""
+    await state.set_state(None)
+    await state.update_data(search_query=message.text)
+    await send_results(message, message.from_user.id, message.text)
+
+
+@router.callback_query(F.data.startswith("search:"))
+async def callback_search_page(callback: CallbackQuery, state: FSMContext):
+    """Листание результатов"""
+    offset = int(callback.data.split(":")[1])
+    data = await state.get_data()
+    query = data.get("search_query")
+
+    if not query:
+        await callback.answer("❌ Повторите поиск: /search", show_alert=True)
+        return
+
+    await send_results(callback.message, callback.from_user.id, query, offset, edit=True)
+    await callback.answer()
@@ -24,15 +24,8 @@ async def cmd_start(message: Message, state: FSMContext):
     username = message.from_user.username
     full_name = message.from_user.full_name
 
-    # Создаём пользователя
-    user_id = await db.create_user(telegram_id, username, full_name)
-
-    # Проверяем личное пространство
-    workspaces = await db.get_user_workspaces(user_id)
-    has_personal = any(ws.get("is_personal") for ws in workspaces)
-
-    if not has_personal:
-        await db.create_personal_workspace(user_id)
+    # Создаём пользователя и личное пространство (для повторного /start — одно чтение)
+    await db.ensure_user(telegram_id, username, full_name)
 
     welcome_text = f"""
 👋 Привет, {full_name}!
@@ -54,7 +47,7 @@ async def cmd_start(message: Message, state: FSMContext):
     await message.answer(
         welcome_text,
         parse_mode="Markdown",
-        reply_markup=get_main_menu(WEBAPP_URL if WEBAPP_URL else None)
+        reply_markup=get_main_menu(WEBAPP_URL if WEBAPP_URL else None, telegram_id)
     )
 
 
@@ -88,6 +81,7 @@ async def cmd_help(message: Message):
 **Команды:**
 /start — Главное меню
 /help — Эта справка
+/search — Поиск по задачам, заметкам и комментариям
 
 **Как пользоваться:**
 
@@ -3,6 +3,8 @@
 Управление задачами
 """
 
+import asyncio
+import html
 import logging
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
@@ -10,12 +12,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from bot import database as db
+from bot.loader import Loader
 from bot.keyboards import (
     get_tasks_keyboard, 
     get_task_menu,
     get_priority_keyboard,
     get_stages_keyboard,
     get_confirm_delete_keyboard,
+    get_inbox_keyboard,
     get_main_menu
 )
 from bot.config import WEBAPP_URL
@@ -39,16 +43,10 @@ async def show_my_tasks(message: Message):
     """Показать задачи из личного пространства"""
     logger.info(f"=== SHOW MY TASKS from {message.from_user.id} ===")
     
-    user = await db.get_user(message.from_user.id)
-    if not user:
-        await message.answer("❌ Отправьте /start")
-        return
-    
-    workspaces = await db.get_user_workspaces(user["id"])
-    personal = next((ws for ws in workspaces if ws.get("is_personal")), None)
+    personal = await db.get_personal_workspace(message.from_user.id)
     
     if not personal:
-        await message.answer("❌ Личное пространство не найдено")
+        await message.answer("❌ Личное пространство не найдено. Отправьте /start")
         return
     
     tasks = await db.get_tasks(personal["id"])
@@ -72,13 +70,15 @@ async def show_my_tasks(message: Message):
 
 
 @router.callback_query(F.data.startswith("tasks:"))
-async def callback_tasks(callback: CallbackQuery):
+async def callback_tasks(callback: CallbackQuery, loader: Loader):
     """Список задач пространства"""
     logger.info(f"=== CALLBACK TASKS: {callback.data} ===")
     
     workspace_id = int(callback.data.split(":")[1])
-    tasks = await db.get_tasks(workspace_id)
-    workspace = await db.get_workspace(workspace_id)
+    tasks, workspace = await asyncio.gather(
+        db.get_tasks(workspace_id),
+        loader.workspace(workspace_id)
+    )
     
     if not tasks:
         text = f"📋 **{workspace['name']}**\n\n_Нет задач_"
@@ -99,6 +99,58 @@ async def callback_tasks(callback: CallbackQuery):
     await callback.answer()
 
 
+# ==================== НАЗНАЧЕННЫЕ МНЕ ====================
+
+INBOX_PAGE_SIZE = 10
+
+
+async def render_inbox(telegram_id: int, cursor: str = None):
+    """Текст и клавиатура страницы «Назначенные мне»"""
+    user = await db.get_user(telegram_id)
+    if not user:
+        return "❌ Отправьте /start", None
+    
+    tasks, next_cursor = await db.get_assigned_tasks(user["id"], "todo", cursor, INBOX_PAGE_SIZE)
+    
+    # HTML: названия задач и пространств экранируются, Markdown так не умеет
+    if not tasks:
+        text = "📥 <b>Назначенные мне</b>\n\n<i>Нет открытых задач</i>"
+    else:
+        priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
+        text = "📥 <b>Назначенные мне:</b>\n\n"
+        
+        for task in tasks:
+            icon = priority_icons.get(task.get("priority", "medium"), "⚪")
+            due = f" 📅 {html.escape(str(task['due_date']))}" if task.get("due_date") else ""
+            text += f"{icon} {html.escape(task['title'])}{due}\n   <i>{html.escape(task['workspace_name'])}</i>\n"
+    
+    return text, get_inbox_keyboard(tasks, next_cursor, is_first_page=not cursor)
+
+
+@router.message(F.text == "📥 Назначенные мне")
+async def show_inbox(message: Message):
+    """Задачи, назначенные пользователю во всех пространствах"""
+    logger.info(f"=== SHOW INBOX from {message.from_user.id} ===")
+    
+    text, keyboard = await render_inbox(message.from_user.id)
+    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+
+
+@router.callback_query(F.data.startswith("inbox:"))
+async def callback_inbox(callback: CallbackQuery):
+    """Следующая страница «Назначенные мне»"""
+    cursor = callback.data.split(":", 1)[1] or None
+    
+    try:
+        text, keyboard = await render_inbox(callback.from_user.id, cursor)
+    except ValueError:
+        await callback.answer("❌ Список устарел, откройте его заново", show_alert=True)
+        return
+    
+    await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    await callback.answer()
+
+
 # ==================== СОЗДАНИЕ ЗАДАЧИ ====================
 
 @router.message(F.text == "➕ Новая задача")
@@ -106,14 +158,7 @@ async def new_task_start(message: Message, state: FSMContext):
     """Начало создания задачи"""
     logger.info(f"=== NEW TASK BUTTON from {message.from_user.id} ===")
     
-    user = await db.get_user(message.from_user.id)
-    if not user:
-        logger.warning("User not found!")
-        await message.answer("❌ Отправьте /start")
-        return
-    
-    workspaces = await db.get_user_workspaces(user["id"])
-    personal = next((ws for ws in workspaces if ws.get("is_personal")), None)
+    personal = await db.get_personal_workspace(message.from_user.id)
     
     if personal:
         await state.update_data(workspace_id=personal["id"])
@@ -185,7 +230,7 @@ async def process_task_description(message: Message, state: FSMContext):
         f"🟡 Приоритет: Средний\n"
         f"📥 Этап: Новые",
         parse_mode="Markdown",
-        reply_markup=get_main_menu(WEBAPP_URL if WEBAPP_URL else None)
+        reply_markup=get_main_menu(WEBAPP_URL if WEBAPP_URL else None, message.from_user.id)
     )
     await state.clear()
 
@@ -193,12 +238,12 @@ async def process_task_description(message: Message, state: FSMContext):
 # ==================== ПРОСМОТР ЗАДАЧИ ====================
 
 @router.callback_query(F.data.startswith("task:"))
-async def callback_task(callback: CallbackQuery):
+async def callback_task(callback: CallbackQuery, loader: Loader):
     """Просмотр задачи"""
     logger.info(f"=== VIEW TASK: {callback.data} ===")
     
     task_id = int(callback.data.split(":")[1])
-    task = await db.get_task(task_id)
+    task = await loader.task(task_id)
     
     if not task:
         await callback.answer("❌ Задача не найдена", show_alert=True)
@@ -253,8 +298,11 @@ async def process_edit_title(message: Message, state: FSMContext):
     data = await state.get_data()
     task_id = data["editing_task_id"]
     
-    await db.update_task(task_id, title=message.text)
-    task = await db.get_task(task_id)
+    task = await db.update_task(task_id, title=message.text)
+    if not task:
+        await message.answer("❌ Задача не найдена")
+        await state.clear()
+        return
     
     await message.answer(
         f"✅ Название изменено!\n\n📋 {message.text}",
@@ -290,12 +338,14 @@ async def callback_set_priority(callback: CallbackQuery):
     task_id = int(parts[1])
     priority = parts[2]
     
-    await db.update_task(task_id, priority=priority)
+    task = await db.update_task(task_id, priority=priority)
+    if not task:
+        await callback.answer("❌ Задача не найдена", show_alert=True)
+        return
     
     priority_names = {"high": "🔴 Высокий", "medium": "🟡 Средний", "low": "🟢 Низкий"}
     await callback.answer(f"✅ Приоритет: {priority_names[priority]}", show_alert=True)
     
-    task = await db.get_task(task_id)
     status_names = {"todo": "⬜ Не начата", "in_progress": "🔄 В работе", "done": "✅ Выполнена"}
     
     text = f"""
@@ -317,12 +367,12 @@ async def callback_set_priority(callback: CallbackQuery):
 # ==================== ЭТАПЫ ВОРОНКИ ====================
 
 @router.callback_query(F.data.startswith("stage:"))
-async def callback_stage(callback: CallbackQuery):
+async def callback_stage(callback: CallbackQuery, loader: Loader):
     """Выбор этапа"""
     logger.info(f"=== STAGE: {callback.data} ===")
     
     task_id = int(callback.data.split(":")[1])
-    task = await db.get_task(task_id)
+    task = await loader.task(task_id)
     
     if not task or not task.get("funnel_id"):
         await callback.answer("❌ Воронка не найдена", show_alert=True)
@@ -347,10 +397,12 @@ async def callback_set_stage(callback: CallbackQuery):
     task_id = int(parts[1])
     stage_id = int(parts[2])
     
-    await db.update_task(task_id, stage_id=stage_id)
+    task = await db.update_task(task_id, stage_id=stage_id)
+    if not task:
+        await callback.answer("❌ Задача не найдена", show_alert=True)
+        return
     await callback.answer("✅ Этап изменён!", show_alert=True)
     
-    task = await db.get_task(task_id)
     priority_names = {"high": "🔴 Высокий", "medium": "🟡 Средний", "low": "🟢 Низкий"}
     status_names = {"todo": "⬜ Не начата", "in_progress": "🔄 В работе", "done": "✅ Выполнена"}
     
@@ -373,22 +425,22 @@ async def callback_set_stage(callback: CallbackQuery):
 # ==================== ВЫПОЛНЕНИЕ ====================
 
 @router.callback_query(F.data.startswith("done:"))
-async def callback_done(callback: CallbackQuery):
+async def callback_done(callback: CallbackQuery, loader: Loader):
     """Отметить как выполненную"""
     logger.info(f"=== DONE: {callback.data} ===")
     
     task_id = int(callback.data.split(":")[1])
-    task = await db.get_task(task_id)
-    
-    new_status = "todo" if task.get("status") == "done" else "done"
-    await db.update_task(task_id, status=new_status)
+    task = await db.toggle_task(task_id)
+    if not task:
+        await callback.answer("❌ Задача не найдена", show_alert=True)
+        return
+    loader.tasks.prime(task)
     
-    if new_status == "done":
+    if task["status"] == "done":
         await callback.answer("✅ Задача выполнена!", show_alert=True)
     else:
         await callback.answer("⬜ Задача открыта заново", show_alert=True)
     
-    task = await db.get_task(task_id)
     priority_names = {"high": "🔴 Высокий", "medium": "🟡 Средний", "low": "🟢 Низкий"}
     status_names = {"todo": "⬜ Не начата", "in_progress": "🔄 В работе", "done": "✅ Выполнена"}
     
@@ -411,12 +463,12 @@ async def callback_done(callback: CallbackQuery):
 # ==================== УДАЛЕНИЕ ====================
 
 @router.callback_query(F.data.startswith("delete:"))
-async def callback_delete(callback: CallbackQuery):
+async def callback_delete(callback: CallbackQuery, loader: Loader):
     """Подтверждение удаления"""
     logger.info(f"=== DELETE: {callback.data} ===")
     
     task_id = int(callback.data.split(":")[1])
-    task = await db.get_task(task_id)
+    task = await loader.task(task_id)
     
     await callback.message.edit_text(
         f"🗑 **Удалить задачу?**\n\n📋 {task['title']}",
@@ -427,19 +479,23 @@ async def callback_delete(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("confirm_del:"))
-async def callback_confirm_delete(callback: CallbackQuery):
+async def callback_confirm_delete(callback: CallbackQuery, loader: Loader):
     """Удаление задачи"""
     logger.info(f"=== CONFIRM DELETE: {callback.data} ===")
     
     task_id = int(callback.data.split(":")[1])
-    task = await db.get_task(task_id)
+    task = await loader.task(task_id)
     workspace_id = task['workspace_id']
     
     await db.delete_task(task_id)
+    loader.tasks.clear(task_id)
     await callback.answer("✅ Задача удалена!", show_alert=True)
     
-    tasks = await db.get_tasks(workspace_id)
-    workspace = await db.get_workspace(workspace_id)
+    tasks, workspace = await asyncio.gather(
+        db.get_tasks(workspace_id),
+        loader.workspace(workspace_id)
+    )
+    loader.prime_tasks(tasks)
     
     text = f"📋 **{workspace['name']}**\n\n"
     if not tasks:
@@ -473,21 +529,25 @@ async def callback_funnel(callback: CallbackQuery):
         return
     
     funnel = funnels[0]
-    stages = await db.get_funnel_stages(funnel["id"])
+    stages, counters = await asyncio.gather(
+        db.get_funnel_stages(funnel["id"]),
+        db.get_task_counters(workspace_id)
+    )
     
     text = f"📊 **{funnel['name']}**\n\n"
     
     for stage in stages:
-        tasks = await db.get_tasks(workspace_id, stage_id=stage["id"])
-        text += f"**{stage['name']}** ({len(tasks)})\n"
+        stage_count = counters["stage"].get(stage["id"], 0)
+        text += f"**{stage['name']}** ({stage_count})\n"
         
-        for task in tasks[:5]:
+        tasks = await db.get_tasks(workspace_id, stage_id=stage["id"], limit=5) if stage_count else []
+        for task in tasks:
             priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
             icon = priority_icons.get(task.get("priority", "medium"), "⚪")
             text += f"  {icon} {task['title'][:20]}\n"
         
-        if len(tasks) > 5:
-            text += f"  _...и ещё {len(tasks) - 5}_\n"
+        if stage_count > 5:
+            text += f"  _...и ещё {stage_count - 5}_\n"
         text += "\n"
     
     from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -96,8 +96,7 @@ async def callback_workspace(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Не найдено", show_alert=True)
         return
     
-    tasks = await db.get_tasks(workspace_id)
-    done_count = len([t for t in tasks if t.get("status") == "done"])
+    counters = await db.get_task_counters(workspace_id)
     
     icon = "🏠" if workspace.get("is_personal") else "👥"
     text = f"""
@@ -106,8 +105,8 @@ async def callback_workspace(callback: CallbackQuery, state: FSMContext):
 {workspace.get('description') or ''}
 
 📊 **Статистика:**
-• Всего задач: {len(tasks)}
-• Выполнено: {done_count}
+• Всего задач: {counters["total"]}
+• Выполнено: {counters["status"].get("done", 0)}
 """
     
     await callback.message.edit_text(
@@ -136,9 +135,10 @@ async def process_ws_description(message: Message, state: FSMContext):
     name = data["name"]
     description = None if message.text == "-" else message.text
     
-    user = await db.get_user(message.from_user.id)
-    workspace_id = await db.create_workspace(name, user["id"], False, description)
-    workspace = await db.get_workspace(workspace_id)
+    async with db.transaction():
+        user = await db.get_user(message.from_user.id)
+        workspace_id = await db.create_workspace(name, user["id"], False, description)
+        workspace = await db.get_workspace(workspace_id)
     
     await message.answer(
         f"✅ **Команда создана!**\n\n"
@@ -154,16 +154,16 @@ async def process_ws_description(message: Message, state: FSMContext):
 async def process_invite_code(message: Message, state: FSMContext):
     """Присоединяемся по коду"""
     code = message.text.strip()
-    user = await db.get_user(message.from_user.id)
-    
-    workspace_id = await db.join_workspace_by_code(user["id"], code)
+    async with db.transaction():
+        user = await db.get_user(message.from_user.id)
+        workspace_id = await db.join_workspace_by_code(user["id"], code)
+        workspace = await db.get_workspace(workspace_id) if workspace_id else None
     
     if not workspace_id:
         await message.answer("❌ **Код не найден**\n\nПроверьте и попробуйте снова.", parse_mode="Markdown")
         await state.clear()
         return
     
-    workspace = await db.get_workspace(workspace_id)
     await message.answer(f"✅ **Вы присоединились!**\n\n👥 {workspace['name']}", parse_mode="Markdown")
     await state.clear()
 
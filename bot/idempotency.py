@@ -0,0 +1,113 @@
+# Файл: bot/idempotency.py
+"""
+Ключи идемпотентности для записывающих эндпоинтов Mini App.
+
+Клиент шлёт заголовок Idempotency-Key и при обрыве связи повторяет
+запрос с тем же ключом. Ключ действует в пределах пользователя, метода
+и адреса; вместе с ним хранится хэш тела запроса, и тот же ключ с другим
+телом отклоняется (422). Ответ первой попытки сохраняется в таблицу
+idempotency_keys в той же транзакции, что и сама запись, и в кэш в
+памяти. Повтор получает сохранённый ответ: запись и уведомления второй
+раз не выполняются. Параллельный повтор ждёт блокировку записи
+(BEGIN IMMEDIATE) и после коммита первой попытки видит её ответ.
+"""
+
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+from fastapi import HTTPException, Request
+from starlette.responses import Response
+
+from bot import database as db
+from bot.cache import TTLCache
+from bot.responses import FastJSONResponse
+
+# Сколько хранится ответ по ключу
+IDEMPOTENCY_TTL = 24 * 60 * 60
+
+KEY_MAX_LENGTH = 128
+
+# (scope, key) -> (хэш запроса, код, тело)
+_cache = TTLCache(maxsize=4096, ttl=IDEMPOTENCY_TTL)
+
+
+class IdempotentWrite:
+    """Запись в рамках idempotent_write: либо повтор, либо новый ответ"""
+
+    __slots__ = ("scope", "key", "request_hash", "replayed", "status_code", "body")
+
+    def __init__(self, scope: str, key: Optional[str], request_hash: Optional[str] = None):
+        self.scope = scope
+        self.key = key
+        self.request_hash = request_hash
+        self.replayed: Optional[Response] = None
+        self.status_code: Optional[int] = None
+        self.body: Optional[bytes] = None
+
+    def replay(self, request_hash: Optional[str], status_code: int, body: bytes) -> None:
+        """Повтор сохранённого ответа; тот же ключ с другим телом — 422"""
+        if request_hash is not None and request_hash != self.request_hash:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key уже использован с другим запросом",
+            )
+        self.replayed = Response(
+            content=body,
+            status_code=status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    def respond(self, content: Any, status_code: int = 200) -> FastJSONResponse:
+        """Ответ записи; по ключу он сохранится вместе с транзакцией"""
+        response = FastJSONResponse(content, status_code=status_code)
+        self.status_code, self.body = status_code, bytes(response.body)
+        return response
+
+
+@asynccontextmanager
+async def idempotent_write(request: Request, user_id: int, key: Optional[str]):
+    """
+    Транзакция записи с ключом идемпотентности:
+
+        async with idempotent_write(request, session.user_id, idempotency_key) as write:
+            if write.replayed:
+                return write.replayed
+            ...
+            response = write.respond({...})
+
+    Без ключа — обычная db.transaction().
+    """
+    if key is not None and not (0 < len(key) <= KEY_MAX_LENGTH):
+        raise HTTPException(status_code=400, detail="Некорректный Idempotency-Key")
+
+    # Ключ действует в пределах пользователя, метода и адреса
+    write = IdempotentWrite(f"{user_id} {request.method} {request.url.path}", key)
+
+    if key:
+        write.request_hash = hashlib.sha256(await request.body()).hexdigest()
+        cached = _cache.get((write.scope, key))
+        if cached is not None:
+            write.replay(*cached)
+            yield write
+            return
+
+    async with db.transaction():
+        if key:
+            stored = await db.get_idempotent_response(write.scope, key, IDEMPOTENCY_TTL)
+            if stored is not None:
+                _cache.set((write.scope, key), stored)
+                write.replay(*stored)
+                yield write
+                return
+
+        yield write
+
+        if key and write.body is not None:
+            await db.save_idempotent_response(
+                write.scope, key, write.request_hash, write.status_code, write.body
+            )
+
+    if key and write.body is not None:
+        _cache.set((write.scope, key), (write.request_hash, write.status_code, write.body))
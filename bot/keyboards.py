@@ -10,24 +10,33 @@ from aiogram.types import (
 )
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
+from bot.auth import sign_uid
+from bot.config import WEBAPP_INLINE_BOOTSTRAP
 
-def get_main_menu(webapp_url: str = None) -> ReplyKeyboardMarkup:
+
+def get_main_menu(webapp_url: str = None, telegram_id: int = None) -> ReplyKeyboardMarkup:
     """Главное меню бота"""
     builder = ReplyKeyboardBuilder()
 
     if webapp_url:
+        if telegram_id and WEBAPP_INLINE_BOOTSTRAP:
+            # По uid сервер встраивает стартовые данные прямо в страницу
+            expires_at, signature = sign_uid(telegram_id)
+            separator = "&" if "?" in webapp_url else "?"
+            webapp_url = f"{webapp_url}{separator}uid={telegram_id}&exp={expires_at}&sig={signature}"
         builder.add(KeyboardButton(
             text="📱 Открыть CRM",
             web_app=WebAppInfo(url=webapp_url)
         ))
 
     builder.add(KeyboardButton(text="📋 Мои задачи"))
+    builder.add(KeyboardButton(text="📥 Назначенные мне"))
     builder.add(KeyboardButton(text="🏠 Пространства"))
     builder.add(KeyboardButton(text="➕ Новая задача"))
     builder.add(KeyboardButton(text="🔔 Напоминания"))
     builder.add(KeyboardButton(text="⚙️ Настройки"))
 
-    builder.adjust(1, 2, 2, 1)
+    builder.adjust(1, 2, 2, 2)
     return builder.as_markup(resize_keyboard=True)
 
 
@@ -89,6 +98,29 @@ def get_tasks_keyboard(tasks: list, workspace_id: int) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+def get_inbox_keyboard(tasks: list, next_cursor: str = None, is_first_page: bool = True) -> InlineKeyboardMarkup:
+    """Назначенные мне задачи"""
+    builder = InlineKeyboardBuilder()
+
+    priority_icons = {"high": "🔴", "medium": "🟡", "low": "🟢"}
+
+    for task in tasks:
+        icon = priority_icons.get(task.get("priority", "medium"), "⚪")
+        title = task["title"][:25] + "..." if len(task["title"]) > 25 else task["title"]
+        builder.add(InlineKeyboardButton(
+            text=f"{icon} {title}",
+            callback_data=f"task:{task['id']}"
+        ))
+
+    if not is_first_page:
+        builder.add(InlineKeyboardButton(text="⏮ В начало", callback_data="inbox:"))
+    if next_cursor:
+        builder.add(InlineKeyboardButton(text="▶️ Ещё", callback_data=f"inbox:{next_cursor}"))
+
+    builder.adjust(1)
+    return builder.as_markup()
+
+
 def get_task_menu(task_id: int, workspace_id: int) -> InlineKeyboardMarkup:
     """Меню задачи"""
     builder = InlineKeyboardBuilder()
@@ -0,0 +1,95 @@
+# Файл: bot/leader.py
+"""
+Выбор ведущего процесса через аренду в SQLite.
+
+При нескольких воркерах фоновые задачи (напоминания, перебалансировка,
+чистка ключей) должен выполнять ровно один процесс. Каждый процесс
+периодически пытается взять или продлить аренду в таблице leases;
+владелец — ведущий. Если ведущий упал и перестал продлевать аренду,
+после её истечения ведущим станет другой процесс.
+
+Ошибка базы при продлении не снимает роль сразу: пока не истекла уже
+взятая аренда, её не может забрать никто другой, и ведущий продолжает
+работу. Роль снимается только после истечения аренды.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from bot import database as db
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """Аренда name: on_elected/on_demoted вызываются при смене роли процесса"""
+
+    def __init__(self, name: str, ttl: float = 30.0, renew_interval: float = 10.0,
+                 on_elected: Callable[[], Awaitable[None]] = None,
+                 on_demoted: Callable[[], Awaitable[None]] = None):
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        # До этого момента (time.monotonic) аренда точно за нами
+        self._expires_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _set_leader(self, is_leader: bool) -> None:
+        if is_leader == self.is_leader:
+            return
+        self.is_leader = is_leader
+        callback = self.on_elected if is_leader else self.on_demoted
+        logger.info(f"{'Ведущий' if is_leader else 'Ведомый'} процесс для «{self.name}»: {self.holder}")
+        if callback:
+            await callback()
+
+    async def try_acquire(self) -> bool:
+        """Одна попытка взять или продлить аренду"""
+        # Срок в базе отсчитывается не раньше этого момента
+        started = time.monotonic()
+        try:
+            held = await db.acquire_lease(self.name, self.holder, self.ttl)
+        except Exception as e:
+            # База занята или недоступна — остаёмся ведущим, пока не истекла прежняя аренда
+            logger.error(f"Ошибка аренды «{self.name}»: {e}")
+            held = self.is_leader and time.monotonic() < self._expires_at
+        else:
+            if held:
+                self._expires_at = started + self.ttl
+        await self._set_leader(held)
+        return held
+
+    def _next_attempt(self) -> float:
+        # Ведущий не пропускает момент истечения аренды, если продление не удаётся
+        if self.is_leader:
+            return max(0.0, min(self.renew_interval, self._expires_at - time.monotonic()))
+        return self.renew_interval
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._next_attempt())
+            await self.try_acquire()
+
+    async def start(self) -> bool:
+        """Первая попытка сразу, дальше — продление в фоне"""
+        held = await self.try_acquire()
+        self._task = asyncio.create_task(self._run())
+        return held
+
+    async def stop(self) -> None:
+        """Остановить продление и отдать аренду, чтобы другой процесс подхватил её сразу"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self.is_leader:
+            await db.release_lease(self.name, self.holder)
+            await self._set_leader(False)
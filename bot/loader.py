@@ -0,0 +1,105 @@
+# Файл: bot/loader.py
+"""
+Загрузчик данных в рамках одного запроса / апдейта.
+
+Запоминает строки по первичному ключу и собирает одновременные
+обращения в один запрос `WHERE id IN (...)`. Живёт ровно один
+HTTP-запрос или один апдейт Telegram, поэтому не требует инвалидации
+между запросами.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from bot import database as db
+
+
+class KeyLoader:
+    """Мемоизация и батчинг загрузки по одному ключу"""
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Awaitable[List[Dict]]], key: str):
+        self._batch_fn = batch_fn
+        self._key = key
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def load(self, key: Hashable) -> Optional[Dict]:
+        future = self._cache.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._cache[key] = future
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                # Ждём конца текущего шага цикла, чтобы собрать соседние load()
+                asyncio.get_running_loop().call_soon(self._schedule_dispatch)
+        return await future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Dict]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, row: Dict) -> None:
+        """Положить в кэш уже полученную строку (например, после UPDATE)"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(row)
+        self._cache[row[self._key]] = future
+
+    def clear(self, key: Hashable) -> None:
+        self._cache.pop(key, None)
+
+    def _schedule_dispatch(self) -> None:
+        self._dispatch_task = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        try:
+            rows = await self._batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._cache.pop(key, None)
+                if future and not future.done():
+                    future.set_exception(e)
+            return
+
+        by_key = {row[self._key]: row for row in rows}
+        for key in keys:
+            future = self._cache.get(key)
+            if future and not future.done():
+                future.set_result(by_key.get(key))
+
+
+class Loader:
+    """Набор загрузчиков задач, пользователей и пространств"""
+
+    def __init__(self):
+        self.tasks = KeyLoader(db.get_tasks_by_ids, "id")
+        self.users = KeyLoader(db.get_users_by_ids, "id")
+        self.users_by_telegram = KeyLoader(db.get_users_by_telegram_ids, "telegram_id")
+        self.workspaces = KeyLoader(db.get_workspaces_by_ids, "id")
+
+    async def task(self, task_id: int) -> Optional[Dict]:
+        return await self.tasks.load(task_id)
+
+    async def user(self, telegram_id: int) -> Optional[Dict]:
+        user = await self.users_by_telegram.load(telegram_id)
+        if user:
+            self.users.prime(user)
+        return user
+
+    async def user_by_id(self, user_id: int) -> Optional[Dict]:
+        user = await self.users.load(user_id)
+        if user:
+            self.users_by_telegram.prime(user)
+        return user
+
+    async def workspace(self, workspace_id: int) -> Optional[Dict]:
+        return await self.workspaces.load(workspace_id)
+
+    def prime_tasks(self, tasks: Iterable[Dict]) -> None:
+        for task in tasks:
+            self.tasks.prime(task)
+
+
+def get_loader() -> Loader:
+    """Зависимость FastAPI: один загрузчик на HTTP-запрос"""
+    return Loader()
@@ -1,10 +1,14 @@
 # Файл: bot/main.py
 
 import asyncio
+import hmac
 import logging
 import os
+import sys
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Update
@@ -13,16 +17,38 @@ import uvicorn
 from aiogram.enums import ParseMode
 
 # Импорт конфигурации
-from bot.config import TOKEN, WEBAPP_URL, APP_BASE_URL
+from bot.config import (
+    TOKEN, WEBAPP_URL, APP_BASE_URL,
+    BOT_MODE, UPDATE_WORKERS, UPDATE_QUEUE_SIZE, POLLING_TIMEOUT,
+    RATE_LIMIT_BOT_RATE, RATE_LIMIT_BOT_BURST, RATE_LIMIT_MAX_KEYS,
+    WORKERS, FSM_STORAGE, LEADER_LEASE_TTL, LEADER_LEASE_RENEW,
+    METRICS_TOKEN,
+)
 
 # Импорт базы данных
 from bot.database import init_database
 
 # Импорт API роутера
-from bot.api import api_app, router as api_router
+from bot.api import api_app, router as api_router, static_assets
 
 # Импорт роутеров бота
 from bot.handlers import routers
+from bot.leader import LeaderLease
+from bot.metrics import QUEUE_DEPTH, REMINDER_LAG_SECONDS, render as render_metrics
+from bot.middlewares import (
+    LoaderMiddleware, ThrottlingMiddleware, HandlerMetricsMiddleware, TelegramMetricsMiddleware,
+    HandlerTracingMiddleware, TelegramTracingMiddleware,
+)
+from bot.ratelimit import RateLimiter
+from bot.runtime import bot_session, describe, server_options
+from bot.storage import SQLiteStorage
+from bot.tracing import TraceExporter, span
+from bot.updates import UpdateQueue
+
+# Воркер uvicorn (spawn) сначала выполняет этот файл как __mp_main__, а затем
+# импортирует bot.main — без псевдонима бот и роутеры создались бы дважды
+if __name__ == "__mp_main__":
+    sys.modules.setdefault("bot.main", sys.modules[__name__])
 
 # Настройка логов
 logging.basicConfig(
@@ -32,19 +58,43 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Инициализация бота и диспетчера
-bot = Bot(token=TOKEN)
-dp = Dispatcher(storage=MemoryStorage())
+bot = Bot(token=TOKEN, session=bot_session())
+dp = Dispatcher(storage=SQLiteStorage() if FSM_STORAGE == "sqlite" else MemoryStorage())
 
-# Планировщик
+# Апдейты из webhook или getUpdates обрабатывает пул задач
+updates = UpdateQueue(dp, bot, workers=UPDATE_WORKERS, maxsize=UPDATE_QUEUE_SIZE)
+
+# Планировщик: задачи выполняет только ведущий процесс
 scheduler = AsyncIOScheduler()
 
 # Подключаем API роутер
 api_app.include_router(api_router)
 
+# Ограничение частоты апдейтов от одного пользователя — до любой работы
+dp.update.outer_middleware(ThrottlingMiddleware(
+    RateLimiter(RATE_LIMIT_BOT_RATE, RATE_LIMIT_BOT_BURST, RATE_LIMIT_MAX_KEYS)
+))
+
+# Загрузчик данных на каждый апдейт
+dp.update.outer_middleware(LoaderMiddleware())
+
 # Регистрируем все роутеры бота
 for router in routers:
     dp.include_router(router)
 
+# Время и спаны хэндлеров (inner-middleware на dp действует и во вложенных
+# роутерах) и запросов к Bot API
+for event_name, observer in dp.observers.items():
+    if event_name != "update":
+        observer.middleware(HandlerMetricsMiddleware())
+        observer.middleware(HandlerTracingMiddleware())
+bot.session.middleware(TelegramMetricsMiddleware())
+bot.session.middleware(TelegramTracingMiddleware())
+
+# Выгрузка спанов трассировки
+trace_exporter = TraceExporter()
+QUEUE_DEPTH.set_function(updates.qsize, "updates")
+
 
 # ==================== ПЛАНИРОВЩИК НАПОМИНАНИЙ ====================
 
@@ -54,36 +104,108 @@ async def check_reminders_job():
     
     try:
         pending_reminders = await db.get_pending_reminders()
+        fetched_at = time.monotonic()
         
         for reminder in pending_reminders:
-            try:
-                text = f"🔔 **Напоминание о задаче:**\n\n📋 {reminder['task_title']}"
-                await bot.send_message(
-                    chat_id=reminder['telegram_id'],
-                    text=text,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                await db.mark_reminder_sent(reminder['id'])
-                logger.info(f"Напоминание {reminder['id']} отправлено")
-            except Exception as e:
-                logger.error(f"Ошибка отправки напоминания {reminder['id']}: {e}")
+            with span("job reminder", **{"reminder.id": reminder['id']}):
+                try:
+                    text = f"🔔 **Напоминание о задаче:**\n\n📋 {reminder['task_title']}"
+                    await bot.send_message(
+                        chat_id=reminder['telegram_id'],
+                        text=text,
+                        parse_mode=ParseMode.MARKDOWN
+                    )
+                    await db.mark_reminder_sent(reminder['id'])
+                    REMINDER_LAG_SECONDS.observe(
+                        reminder['overdue_seconds'] + time.monotonic() - fetched_at
+                    )
+                    logger.info(f"Напоминание {reminder['id']} отправлено")
+                except Exception as e:
+                    logger.error(f"Ошибка отправки напоминания {reminder['id']}: {e}")
                 
     except Exception as e:
         logger.error(f"Ошибка в check_reminders_job: {e}")
 
 
+async def rebalance_sort_keys_job():
+    """Укорачивание разросшихся ключей порядка задач и этапов"""
+    from bot import database as db
+    
+    try:
+        updated = await db.rebalance_sort_keys()
+        if updated:
+            logger.info(f"Перебалансирован порядок: {updated} строк")
+    except Exception as e:
+        logger.error(f"Ошибка в rebalance_sort_keys_job: {e}")
+
+
+async def purge_idempotency_keys_job():
+    """Удаление просроченных ключей идемпотентности"""
+    from bot import database as db
+    from bot.idempotency import IDEMPOTENCY_TTL
+    
+    try:
+        await db.purge_idempotency_keys(IDEMPOTENCY_TTL)
+    except Exception as e:
+        logger.error(f"Ошибка в purge_idempotency_keys_job: {e}")
+
+
+# ==================== ВЕДУЩИЙ ПРОЦЕСС ====================
+
+async def on_elected():
+    """Процесс стал ведущим: ставим вебхук или запускаем polling, включаем планировщик"""
+    if BOT_MODE == "polling":
+        # Пока вебхук установлен, getUpdates отвечает ошибкой
+        try:
+            await bot.delete_webhook()
+        except Exception as e:
+            logger.error(f"❌ Ошибка удаления webhook: {e}")
+        updates.start_polling(POLLING_TIMEOUT)
+        logger.info("✅ Long polling запущен")
+    elif APP_BASE_URL:
+        base_url = APP_BASE_URL.rstrip('/')
+        webhook_url = f"{base_url}{WEBHOOK_PATH}"
+        
+        try:
+            await bot.set_webhook(webhook_url)
+            logger.info(f"✅ Webhook установлен: {webhook_url}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка установки webhook: {e}")
+    else:
+        logger.warning("⚠️ APP_BASE_URL не установлен")
+    
+    scheduler.resume()
+    logger.info("✅ Планировщик запущен")
+
+
+async def on_demoted():
+    """Аренду потеряли: задачи и polling теперь у другого процесса"""
+    await updates.stop_polling()
+    scheduler.pause()
+    logger.info("⏸ Планировщик приостановлен")
+
+
+leader = LeaderLease(
+    "scheduler",
+    ttl=LEADER_LEASE_TTL,
+    renew_interval=LEADER_LEASE_RENEW,
+    on_elected=on_elected,
+    on_demoted=on_demoted,
+)
+
+
 # ==================== WEBHOOK ENDPOINT ====================
 
 WEBHOOK_PATH = "/webhook"
 
 @api_app.post(WEBHOOK_PATH)
 async def telegram_webhook(request: Request):
-    """Обработка входящих обновлений от Telegram"""
+    """Приём обновления от Telegram: в очередь, обработка — после ответа"""
     try:
         json_data = await request.json()
         logger.info(f"Получен webhook: {json_data.get('update_id', 'unknown')}")
         update = Update(**json_data)
-        await dp.feed_update(bot, update)
+        await updates.put(update)
         return {"ok": True}
     except Exception as e:
         logger.error(f"Ошибка в webhook: {e}")
@@ -96,24 +218,16 @@ async def telegram_webhook(request: Request):
 async def on_startup():
     """Действия при запуске приложения"""
     
-    # Инициализируем базу данных
-    await init_database()
-    logger.info("✅ База данных инициализирована")
-    
-    # Устанавливаем вебхук
-    if APP_BASE_URL:
-        base_url = APP_BASE_URL.rstrip('/')
-        webhook_url = f"{base_url}{WEBHOOK_PATH}"
-        
-        try:
-            await bot.set_webhook(webhook_url)
-            logger.info(f"✅ Webhook установлен: {webhook_url}")
-        except Exception as e:
-            logger.error(f"❌ Ошибка установки webhook: {e}")
-    else:
-        logger.warning("⚠️ APP_BASE_URL не установлен")
-    
-    # Запускаем планировщик
+    # Инициализируем базу данных (при нескольких воркерах это уже сделал
+    # родительский процесс — не гоняем миграции N раз параллельно)
+    if os.environ.get("CRM_DB_READY") != "1":
+        await init_database()
+        logger.info("✅ База данных инициализирована")
+
+    # Статика Mini App: читаем и сжимаем один раз
+    static_assets.load()
+
+    # Задачи планировщика есть в каждом процессе, но до выбора ведущим он на паузе
     scheduler.add_job(
         check_reminders_job, 
         'interval', 
@@ -121,8 +235,28 @@ async def on_startup():
         id='reminders_job',
         replace_existing=True
     )
-    scheduler.start()
-    logger.info("✅ Планировщик запущен")
+    scheduler.add_job(
+        rebalance_sort_keys_job,
+        'interval',
+        minutes=10,
+        id='rebalance_sort_keys_job',
+        replace_existing=True
+    )
+    scheduler.add_job(
+        purge_idempotency_keys_job,
+        'interval',
+        hours=1,
+        id='purge_idempotency_keys_job',
+        replace_existing=True
+    )
+    scheduler.start(paused=True)
+    
+    # Пул обработчиков апдейтов — в каждом процессе (webhook приходит в любой)
+    updates.start()
+    trace_exporter.start()
+    
+    # Вебхук (или polling) и планировщик включит тот процесс, который возьмёт аренду
+    await leader.start()
     
     print("🚀 Бот успешно запущен!")
 
@@ -131,6 +265,9 @@ async def on_startup():
 async def on_shutdown():
     """Действия при остановке - НЕ УДАЛЯЕМ WEBHOOK!"""
     try:
+        await leader.stop()
+        await updates.stop()
+        await trace_exporter.stop()
         scheduler.shutdown(wait=False)
         await bot.session.close()
         logger.info("👋 Бот остановлен")
@@ -138,6 +275,19 @@ async def on_shutdown():
         logger.error(f"Ошибка при остановке: {e}")
 
 
+# ==================== МЕТРИКИ ====================
+
+@api_app.get("/metrics")
+async def metrics(request: Request):
+    """Метрики процесса в формате Prometheus"""
+    if METRICS_TOKEN:
+        expected = f"Bearer {METRICS_TOKEN}"
+        received = request.headers.get("authorization", "")
+        if not hmac.compare_digest(received.encode(), expected.encode()):
+            raise HTTPException(status_code=401, detail="Нужен токен метрик")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 # ==================== HEALTH CHECK ====================
 
 @api_app.get("/health")
@@ -155,5 +305,14 @@ async def head_root():
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
-    print(f"🔧 Запуск на порту {port}...")
-    uvicorn.run(api_app, host="0.0.0.0", port=port, log_level="info")
+    print(f"🔧 Запуск на порту {port}, режим: {BOT_MODE}, воркеров: {WORKERS}, профиль: {describe()}...")
+    if WORKERS > 1:
+        # Схему создаём один раз до запуска воркеров
+        asyncio.run(init_database())
+        os.environ["CRM_DB_READY"] = "1"
+        uvicorn.run(
+            "bot.main:api_app", host="0.0.0.0", port=port, log_level="info",
+            workers=WORKERS, **server_options(),
+        )
+    else:
+        uvicorn.run(api_app, host="0.0.0.0", port=port, log_level="info", **server_options())
@@ -0,0 +1,56 @@
+# Файл: bot/maintenance.py
+"""
+Служебные команды для базы данных
+
+    python -m bot.maintenance verify-counters
+    python -m bot.maintenance rebuild-counters
+"""
+
+import argparse
+import asyncio
+import sys
+
+from bot import database as db
+
+
+async def verify_counters() -> int:
+    mismatches = await db.verify_task_counters()
+    if not mismatches:
+        print("✅ Счётчики задач совпадают с таблицей tasks")
+        return 0
+
+    print(f"❌ Найдено расхождений: {len(mismatches)}")
+    for m in mismatches:
+        print(
+            f"  workspace={m['workspace_id']} {m['dimension']}={m['key'] or '-'}: "
+            f"ожидалось {m['expected']}, в счётчике {m['stored']}"
+        )
+    return 1
+
+
+async def rebuild_counters() -> int:
+    await db.rebuild_task_counters()
+    print("✅ Счётчики задач пересчитаны")
+    return await verify_counters()
+
+
+COMMANDS = {
+    "verify-counters": verify_counters,
+    "rebuild-counters": rebuild_counters,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Обслуживание базы CRM")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+
+    async def run():
+        await db.init_database()
+        return await COMMANDS[args.command]()
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
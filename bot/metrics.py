@@ -0,0 +1,279 @@
+# Файл: bot/metrics.py
+"""
+Метрики в текстовом формате Prometheus (GET /metrics).
+
+Счётчики, измерители и гистограммы живут в памяти процесса; запись —
+пара сложений без блокировок.
+Число серий (наборов значений меток) у каждой метрики ограничено:
+после max_series новые значения попадают в серию «other», чтобы
+случайный адрес или имя не раздули память и вывод.
+
+При нескольких воркерах у каждого процесса свои метрики: серии
+различаются меткой pid в выводе.
+"""
+
+import functools
+import inspect
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OVERFLOW = "other"
+
+_PID = str(os.getpid())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    """Общая часть: имя, описание, метки и ограничение числа серий"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 max_series: int = 200):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames) + ("pid",)
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def _get(self, labels: Tuple[str, ...]):
+        series = self._series.get(labels)
+        if series is None:
+            if len(self._series) >= self.max_series:
+                labels = (OVERFLOW,) * len(labels)
+                series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = self._new_series()
+        return series
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return [0.0]
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._get(labels)[0] += amount
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels + (_PID,))} {_format_value(series[0])}"
+            for labels, series in self._series.items()
+        ]
+
+
+class Gauge(Metric):
+    """Измеритель: set() или функция, которую опрашивают при выводе"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 max_series: int = 200):
+        super().__init__(name, documentation, labelnames, max_series)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def _new_series(self):
+        return [0.0]
+
+    def set(self, value: float, *labels: str) -> None:
+        self._get(labels)[0] = value
+
+    def set_function(self, function: Callable[[], float], *labels: str) -> None:
+        self._functions[labels] = function
+
+    def _samples(self) -> List[str]:
+        values = {labels: series[0] for labels, series in self._series.items()}
+        for labels, function in self._functions.items():
+            values[labels] = function()
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels + (_PID,))} {_format_value(value)}"
+            for labels, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, max_series: int = 200):
+        super().__init__(name, documentation, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self):
+        # Счётчики по корзинам (последняя — +Inf) и сумма
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._get(labels)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for labels, series in self._series.items():
+            labels = labels + (_PID,)
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                total += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {total}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {total}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def render() -> str:
+    """Все метрики процесса в текстовом формате Prometheus 0.0.4"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# ==================== МЕТРИКИ ПРИЛОЖЕНИЯ ====================
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "crm_http_request_seconds", "Время обработки HTTP-запроса", ("method", "route", "status"),
+    max_series=500,
+)
+BOT_UPDATE_SECONDS = Histogram(
+    "crm_bot_update_seconds", "Время обработки апдейта Telegram целиком", ("type",),
+)
+BOT_HANDLER_SECONDS = Histogram(
+    "crm_bot_handler_seconds", "Время работы хэндлера aiogram", ("handler",),
+)
+DB_QUERY_SECONDS = Histogram(
+    "crm_db_query_seconds", "Время вызова функции bot/database.py", ("function",),
+)
+DB_ERRORS = Counter(
+    "crm_db_errors_total", "Исключения в функциях bot/database.py", ("function",),
+)
+TELEGRAM_REQUEST_SECONDS = Histogram(
+    "crm_telegram_request_seconds", "Время запроса к Bot API", ("method",),
+    buckets=LATENCY_BUCKETS + (30.0, 60.0),
+)
+TELEGRAM_ERRORS = Counter(
+    "crm_telegram_errors_total", "Ошибки запросов к Bot API", ("method", "error"),
+)
+REMINDER_LAG_SECONDS = Histogram(
+    "crm_reminder_lag_seconds", "Опоздание напоминания: отправка минус remind_at",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 3600),
+)
+QUEUE_DEPTH = Gauge(
+    "crm_queue_depth", "Длина очереди", ("queue",),
+)
+
+
+# ==================== ИНСТРУМЕНТИРОВАНИЕ ====================
+
+def instrument_functions(namespace: Dict[str, object], histogram: Histogram,
+                         errors: Optional[Counter] = None) -> None:
+    """
+    Обернуть все публичные async-функции модуля замером времени
+    (метка — имя функции). Вызывается в конце модуля: globals()
+    """
+    module = namespace["__name__"]
+    for name, function in list(namespace.items()):
+        if (name.startswith("_") or not inspect.iscoroutinefunction(function)
+                or function.__module__ != module):
+            continue
+        namespace[name] = _timed(function, histogram, errors)
+
+
+def _timed(function, histogram: Histogram, errors: Optional[Counter]):
+    name = function.__name__
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        except Exception:
+            if errors is not None:
+                errors.inc(name)
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: время HTTP-запроса по шаблону маршрута, а не по адресу"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._routes: Dict[Callable, str] = {}
+
+    def _route(self, scope: Scope) -> str:
+        # Роутер Starlette записывает найденный endpoint в scope; если до
+        # роутера запрос не дошёл (например, 429), сопоставляем адрес сами
+        endpoint = scope.get("endpoint")
+        route = self._routes.get(endpoint) if endpoint is not None else None
+        if route is not None:
+            return route
+        for candidate in scope["app"].router.routes:
+            if endpoint is not None and getattr(candidate, "endpoint", None) is endpoint:
+                self._routes[endpoint] = candidate.path
+                return candidate.path
+            if endpoint is None and candidate.matches(scope)[0] == Match.FULL:
+                return candidate.path
+        return "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"], self._route(scope), status,
+            )
@@ -0,0 +1,143 @@
+# Файл: bot/middlewares.py
+"""
+Middleware для aiogram
+"""
+
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject, Update
+
+from bot.cache import TTLCache
+from bot.loader import Loader
+from bot.metrics import BOT_HANDLER_SECONDS, TELEGRAM_REQUEST_SECONDS, TELEGRAM_ERRORS
+from bot.ratelimit import RateLimiter
+from bot import tracing
+
+
+class LoaderMiddleware(BaseMiddleware):
+    """Создаёт свой Loader на каждый апдейт и передаёт его в хэндлеры"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["loader"] = Loader()
+        return await handler(event, data)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничивает частоту апдейтов от одного пользователя. Лишние апдейты
+    не обрабатываются; пользователь получает одно вежливое предупреждение
+    на период ожидания
+    """
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self._warned = TTLCache(maxsize=limiter.maxsize, ttl=limiter.idle_ttl or 1)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        allowed, retry_after = self.limiter.hit(f"user:{user.id}")
+        if allowed:
+            self._warned.pop(user.id)
+            return await handler(event, data)
+
+        if self._warned.get(user.id) is None:
+            self._warned.set(user.id, True, ttl=max(retry_after, 1))
+            text = f"⏳ Слишком много запросов. Подождите {math.ceil(retry_after)} с."
+            if isinstance(event, Update) and event.message:
+                await event.message.answer(text)
+            elif isinstance(event, Update) and event.callback_query:
+                await event.callback_query.answer(text)
+        return None
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Время работы хэндлера; регистрируется как inner-middleware событий"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            callback = data["handler"].callback
+            # Модуль в имени: одноимённые хэндлеры есть в разных роутерах
+            name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+            BOT_HANDLER_SECONDS.observe(time.perf_counter() - started, name)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Время и ошибки запросов к Bot API по методу"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_ERRORS.inc(method.__api_method__, type(e).__name__)
+            raise
+        finally:
+            TELEGRAM_REQUEST_SECONDS.observe(time.perf_counter() - started, method.__api_method__)
+
+
+class HandlerTracingMiddleware(BaseMiddleware):
+    """Спан на время хэндлера; между ним и спаном апдейта — маршрутизация и outer-middleware"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        parent = tracing.current_span()
+        if not isinstance(parent, tracing.Span):
+            return await handler(event, data)
+
+        callback = data["handler"].callback
+        name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+        with tracing.span(f"handler {name}", parent=parent):
+            return await handler(event, data)
+
+
+class TelegramTracingMiddleware(BaseRequestMiddleware):
+    """Спан на запрос к Bot API"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        parent = tracing.current_span()
+        if not isinstance(parent, tracing.Span):
+            return await make_request(bot, method)
+
+        with tracing.span(f"telegram {method.__api_method__}", parent=parent, kind=tracing.KIND_CLIENT):
+            return await make_request(bot, method)
@@ -0,0 +1,171 @@
+# Файл: bot/models.py
+"""
+Типизированные записи строк базы данных.
+
+Вместо dict(row) на каждую строку — компактные объекты со __slots__,
+собранные прямо из кортежа строки. Поля без значения по умолчанию — это
+колонки самой таблицы, и SELECT строится по ним (Task.select("t")), так
+что порядок колонок в файле базы не важен. Поля со значением по
+умолчанию приходят из JOIN.
+
+Для старого кода записи читаются как словарь: task["title"],
+task.get("due_date"), dict(task).
+"""
+
+from dataclasses import MISSING, dataclass, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Record:
+    """Общая часть записей: построение из строк и доступ как к словарю"""
+
+    __slots__ = ()
+
+    _fields: Tuple[str, ...] = ()
+    _field_set: frozenset = frozenset()
+    _columns: Tuple[str, ...] = ()
+
+    @classmethod
+    def select(cls, alias: str = None) -> str:
+        """Список колонок таблицы для SELECT / RETURNING"""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + column for column in cls._columns)
+
+    @classmethod
+    def from_row(cls, row: Optional[Iterable]) -> Optional["Record"]:
+        return cls(*row) if row is not None else None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Iterable]) -> List["Record"]:
+        return [cls(*row) for row in rows]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self._fields}
+
+    # --- совместимость со словарём (только чтение) ---
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._field_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in self._field_set:
+            return default
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._field_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((name, getattr(self, name)) for name in self._fields)
+
+
+def record(cls):
+    """dataclass со __slots__ и списком колонок таблицы"""
+    cls = dataclass(slots=True)(cls)
+    cls._fields = tuple(f.name for f in fields(cls))
+    cls._field_set = frozenset(cls._fields)
+    cls._columns = tuple(
+        f.name for f in fields(cls)
+        if f.default is MISSING and f.default_factory is MISSING
+    )
+    return cls
+
+
+@record
+class User(Record):
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    full_name: Optional[str]
+    username_lower: Optional[str]
+    personal_workspace_id: Optional[int]
+    created_at: Optional[str]
+
+
+@record
+class Member(User):
+    """Пользователь вместе с его ролью и правами в пространстве"""
+    role: Optional[str] = None
+    custom_role: Optional[str] = None
+    can_edit_tasks: Optional[bool] = None
+    can_delete_tasks: Optional[bool] = None
+    can_assign_tasks: Optional[bool] = None
+    can_manage_members: Optional[bool] = None
+    joined_at: Optional[str] = None
+
+
+@record
+class Workspace(Record):
+    id: int
+    name: str
+    description: Optional[str]
+    owner_id: int
+    is_personal: bool
+    invite_code: Optional[str]
+    version: int
+    created_at: Optional[str]
+    # Роль текущего пользователя (get_user_workspaces)
+    role: Optional[str] = None
+    custom_role: Optional[str] = None
+    can_edit_tasks: Optional[bool] = None
+    can_delete_tasks: Optional[bool] = None
+    can_assign_tasks: Optional[bool] = None
+    can_manage_members: Optional[bool] = None
+
+
+@record
+class Task(Record):
+    id: int
+    workspace_id: int
+    funnel_id: Optional[int]
+    stage_id: Optional[int]
+    title: str
+    description: Optional[str]
+    priority: Optional[str]
+    status: Optional[str]
+    due_date: Optional[str]
+    due_time: Optional[str]
+    created_by: int
+    assigned_to: Optional[int]
+    assigned_username: Optional[str]
+    created_at: Optional[str]
+    updated_at: Optional[str]
+    sort_key: Optional[str]
+    # Название пространства (входящие «назначено мне»)
+    workspace_name: Optional[str] = None
+
+
+@record
+class Note(Record):
+    id: int
+    workspace_id: int
+    user_id: int
+    title: str
+    content: Optional[str]
+    note_date: Optional[str]
+    color: Optional[str]
+    created_at: Optional[str]
+    updated_at: Optional[str]
+
+
+@record
+class Comment(Record):
+    id: int
+    task_id: int
+    user_id: int
+    comment_text: str
+    created_at: Optional[str]
+    # Автор
+    username: Optional[str] = None
+    full_name: Optional[str] = None
@@ -0,0 +1,126 @@
+# Файл: bot/ordering.py
+"""
+Дробные ключи порядка (fractional indexing).
+
+Порядок задач в этапе и этапов в воронке хранится строкой sort_key и
+сравнивается лексикографически. Чтобы поставить элемент между двумя
+соседями, достаточно выдать ключ строго между их ключами и обновить
+одну строку — остальные не перенумеровываются.
+
+Ключи — строки из цифр base62 без завершающего "0" (иначе между "A" и
+"A0" не было бы места). При частых вставках в одно место ключи
+удлиняются; фоновая перебалансировка (db.rebalance_sort_keys) заново
+раздаёт короткие равномерные ключи.
+
+Вставки в начало и в конец (новые задачи, перенос на край колонки) не
+делят интервал пополам, а уменьшают или увеличивают ключ на единицу.
+Число ведущих "0" (или "z") задаёт ширину ключа: z нулей — ключ из
+2z + 1 цифр, так что каждый следующий разряд вмещает в 62 раза больше
+вставок, а длина растёт логарифмически.
+"""
+
+from typing import List, Optional, Tuple
+
+# Порядок символов совпадает с порядком байт ASCII, а значит и с сортировкой SQLite
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# Ключи длиннее этого перебалансировщик укорачивает
+MAX_KEY_LENGTH = 12
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    """Ключ строго между low и high (high=None — без верхней границы)"""
+    if high is not None:
+        # Общий префикс переносим как есть
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else "0") == high[n]:
+            n += 1
+        if n > 0:
+            return high[:n] + _midpoint(low[n:], high[n:])
+
+    digit_low = DIGITS.index(low[0]) if low else 0
+    digit_high = DIGITS.index(high[0]) if high is not None else BASE
+    if digit_high - digit_low > 1:
+        return DIGITS[(digit_low + digit_high + 1) // 2]
+    # Соседние цифры: либо хватает первой цифры high, либо уходим на разряд глубже
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[digit_low] + _midpoint(low[1:], None)
+
+
+def _edge_width(key: str, digit: str) -> Tuple[int, int]:
+    """Число ведущих digit в ключе и ширина ключей этой зоны"""
+    zeros = len(key) - len(key.lstrip(digit))
+    return zeros, 2 * zeros + 1
+
+
+def _to_int(digits: str) -> int:
+    value = 0
+    for char in digits:
+        value = value * BASE + DIGITS.index(char)
+    return value
+
+
+def _from_int(value: int, width: int) -> str:
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits))
+
+
+def _key_before(first: str) -> str:
+    """Ключ меньше first: first минус единица в разряде своей зоны"""
+    zeros, width = _edge_width(first, DIGITS[0])
+    tail = _to_int(first[zeros:width].ljust(width - zeros, DIGITS[0]))
+    if tail - 1 >= BASE ** (width - zeros - 1):
+        return (first[:zeros] + _from_int(tail - 1, width - zeros)).rstrip(DIGITS[0])
+    # Зона исчерпана — переходим в следующую, на разряд шире
+    return DIGITS[0] * (zeros + 1) + DIGITS[-1] * (zeros + 2)
+
+
+def _key_after(last: str) -> str:
+    """Ключ больше last: last плюс единица в разряде своей зоны"""
+    nines, width = _edge_width(last, DIGITS[-1])
+    tail = _to_int(last[nines:width].ljust(width - nines, DIGITS[0]))
+    if tail + 1 < (BASE - 1) * BASE ** (width - nines - 1):
+        return (last[:nines] + _from_int(tail + 1, width - nines)).rstrip(DIGITS[0])
+    return DIGITS[-1] * (nines + 1) + DIGITS[1]
+
+
+def key_between(before: Optional[str], after: Optional[str]) -> str:
+    """
+    Ключ для элемента между before и after.
+    None — край списка: key_between(None, first) ставит в начало,
+    key_between(last, None) — в конец, key_between(None, None) — первый ключ
+    """
+    for key in (before, after):
+        if key is not None and (not key or key[-1] == "0" or any(c not in DIGITS for c in key)):
+            raise ValueError(f"Некорректный ключ порядка: {key!r}")
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Ключи не по порядку: {before!r} >= {after!r}")
+    if before is None and after is not None:
+        return _key_before(after)
+    if before is not None and after is None:
+        return _key_after(before)
+    return _midpoint(before or "", after)
+
+
+def spread_keys(count: int) -> List[str]:
+    """count коротких ключей, равномерно распределённых по всему диапазону"""
+    if count <= 0:
+        return []
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    span = BASE ** width
+    keys = []
+    for i in range(1, count + 1):
+        value = i * span // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
@@ -0,0 +1,154 @@
+# Файл: bot/ratelimit.py
+"""
+Ограничение частоты запросов (token bucket).
+
+У каждого ключа (пользователь, пространство, IP) своё ведро на burst
+жетонов, которое пополняется со скоростью rate жетонов в секунду. Запрос
+забирает жетон; если жетонов нет — сразу отказ с временем, через
+которое стоит повторить, а не очередь к единственному писателю SQLite.
+
+Вёдра хранятся в памяти процесса: их число ограничено, давно не
+использованные вытесняются первыми, а ведро, простоявшее дольше
+времени полного пополнения, удаляется — оно не отличается от нового.
+
+Ведро пользователя (или IP) проверяет middleware до любой работы.
+Ведро пространства списывается позже, в зависимости workspace_member
+(bot/api.py): номер пространства в адресе выбирает клиент, и тратить
+чужое ведро можно только после проверки сессии и участия.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from bot.auth import verify_token
+from bot.responses import FastJSONResponse
+
+TOO_MANY_REQUESTS = "Слишком много запросов, попробуйте чуть позже"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """Набор вёдер с общими rate и burst"""
+
+    def __init__(self, rate: float, burst: int, maxsize: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        # Через столько секунд простоя ведро снова полное
+        self.idle_ttl = burst / rate if rate > 0 else 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def hit(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """Забрать жетоны; (разрешено, через сколько секунд повторить)"""
+        if self.rate <= 0:
+            return True, 0.0
+
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.burst, now)
+            self._buckets[key] = bucket
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return True, 0.0
+        return False, (cost - bucket.tokens) / self.rate
+
+    def refund(self, key: str, cost: float = 1.0) -> None:
+        """Вернуть жетоны, если запрос отклонила следующая проверка"""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.tokens = min(self.burst, bucket.tokens + cost)
+
+    def _evict_idle(self, now: float) -> None:
+        # Порядок словаря — по последнему обращению, простаивающие в начале
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_ttl:
+                break
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI-middleware для /api/*: ведро на пользователя из проверенного
+    токена сессии, без сессии — на IP клиента. telegram_id в адресе
+    выбирает клиент, поэтому ключом он не служит. При отказе — 429 с
+    Retry-After.
+
+    X-Forwarded-For учитывается, только если перед приложением стоят
+    trusted_proxies прокси: каждый дописывает в конец заголовка адрес,
+    с которого пришёл запрос, а всё левее мог прислать сам клиент
+    """
+
+    def __init__(self, app: ASGIApp, user_limiter: RateLimiter,
+                 trusted_proxies: int = 0, prefix: str = "/api/"):
+        self.app = app
+        self.user_limiter = user_limiter
+        self.trusted_proxies = trusted_proxies
+        self.prefix = prefix
+
+    def _client_ip(self, scope: Scope) -> str:
+        if self.trusted_proxies > 0:
+            forwarded = None
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    forwarded = value
+            if forwarded is not None:
+                hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",")]
+                # Адрес клиента дописал самый внешний из доверенных прокси
+                if len(hops) >= self.trusted_proxies and hops[-self.trusted_proxies]:
+                    return hops[-self.trusted_proxies]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    def _session_user(scope: Scope) -> Optional[int]:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer":
+                    session = verify_token(token.strip())
+                    return session.user_id if session else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        user_id = self._session_user(scope)
+        key = f"user:{user_id}" if user_id is not None else f"ip:{self._client_ip(scope)}"
+        allowed, retry_after = self.user_limiter.hit(key)
+        if not allowed:
+            response = FastJSONResponse(
+                {"detail": TOO_MANY_REQUESTS},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,45 @@
+# Файл: bot/responses.py
+"""
+Быстрый JSON-ответ для API Mini App.
+
+Если установлен orjson — сериализует им (записи из bot.models он
+понимает сам, как dataclass), иначе стандартным json. Эндпоинты с
+большими ответами возвращают FastJSONResponse напрямую, минуя обход
+jsonable_encoder.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from bot.models import Record
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse на orjson (или json) с поддержкой записей bot.models"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
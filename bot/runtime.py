@@ -0,0 +1,73 @@
+# Файл: bot/runtime.py
+"""
+Профиль рантайма: цикл событий, HTTP-парсер и настройки сервера.
+
+В профиле fast uvicorn работает на uvloop и httptools — оба заметно
+быстрее asyncio и h11 на разборе запросов и переключении задач. Они
+необязательны (uvloop нет под Windows): если пакета нет, остаётся
+стандартная реализация. Профиль standard — настройки uvicorn по
+умолчанию, для сравнения и отладки.
+"""
+
+import importlib.util
+from typing import Any, Dict
+
+from aiogram.client.session.aiohttp import AiohttpSession
+
+from bot.config import (
+    RUNTIME_PROFILE,
+    SERVER_KEEPALIVE, SERVER_BACKLOG, SERVER_LIMIT_CONCURRENCY,
+    BOT_CONNECTION_LIMIT, BOT_KEEPALIVE,
+)
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(profile: str = RUNTIME_PROFILE) -> Dict[str, Any]:
+    """Аргументы uvicorn.run для профиля"""
+    if profile == "standard":
+        return {"loop": "asyncio", "http": "h11"}
+
+    return {
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "timeout_keep_alive": SERVER_KEEPALIVE,
+        "backlog": SERVER_BACKLOG,
+        "limit_concurrency": SERVER_LIMIT_CONCURRENCY or None,
+    }
+
+
+def describe(profile: str = RUNTIME_PROFILE) -> str:
+    options = server_options(profile)
+    return f"{profile} ({options['loop']}, {options['http']})"
+
+
+# Адрес api.telegram.org кэшируется на час. aiohttp по умолчанию держит
+# его 10 секунд, а AiohttpSession в aiogram 3.4 это значение не меняет
+DNS_CACHE_TTL = 3600
+
+
+class TunedAiohttpSession(AiohttpSession):
+    """
+    Сессия Bot API с пулом соединений под один хост: все запросы идут на
+    api.telegram.org, поэтому предел на хост равен общему. Простаивающие
+    соединения живут BOT_KEEPALIVE секунд, адрес хоста — DNS_CACHE_TTL
+    """
+
+    def __init__(self, limit: int, keepalive_timeout: float, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._connector_init.update(
+            limit=limit,
+            limit_per_host=limit,
+            keepalive_timeout=keepalive_timeout,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+
+
+def bot_session(profile: str = RUNTIME_PROFILE) -> AiohttpSession:
+    """HTTP-сессия для Bot(...)"""
+    if profile == "standard":
+        return AiohttpSession()
+    return TunedAiohttpSession(limit=BOT_CONNECTION_LIMIT, keepalive_timeout=BOT_KEEPALIVE)
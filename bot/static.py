@@ -0,0 +1,178 @@
+# Файл: bot/static.py
+"""
+Статика Mini App: index.html, style.css, app.js.
+
+Файлы читаются один раз, заранее сжимаются (gzip и, если установлен
+пакет brotli, br) и отдаются из памяти. CSS и JS получают адреса с
+хэшем содержимого (assets/app.<hash>.js), которые подставляются в
+index.html, — такие ответы кэшируются навсегда (immutable). Сам
+index.html всегда перепроверяется по ETag.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Для text/* кодировку добавляет сам Response
+CONTENT_TYPES = {
+    ".html": "text/html",
+    ".css": "text/css",
+    ".js": "application/javascript; charset=utf-8",
+}
+
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"
+
+# Файлы, которые получают адрес с хэшем
+HASHED_FILES = ("style.css", "app.js")
+
+
+class Asset:
+    """Файл в памяти вместе со сжатыми версиями"""
+
+    __slots__ = ("body", "content_type", "cache_control", "digest", "encoded")
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str,
+                 encoded: Dict[str, bytes] = None):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        if encoded is not None:
+            self.encoded = encoded
+            return
+
+        self.encoded = {}
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.encoded["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.encoded["br"] = compressed
+
+    def etag(self, encoding: Optional[str]) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def matches(self, if_none_match: str) -> bool:
+        """If-None-Match совпадает с любой из версий файла"""
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-", 1)[0] == self.digest:
+                return True
+        return False
+
+
+class StaticAssets:
+    """Статика webapp/, загруженная в память"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: Dict[str, Asset] = {}
+        self.index_html: Optional[str] = None
+        self.loaded = False
+
+    def _read(self, name: str) -> Optional[bytes]:
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def load(self) -> None:
+        assets: Dict[str, Asset] = {}
+        urls: Dict[str, str] = {}
+
+        for name in HASHED_FILES:
+            body = self._read(name)
+            if body is None:
+                continue
+            content_type = CONTENT_TYPES[os.path.splitext(name)[1]]
+            asset = Asset(body, content_type, CACHE_IMMUTABLE)
+            stem, ext = os.path.splitext(name)
+            url = f"assets/{stem}.{asset.digest}{ext}"
+            assets[url] = asset
+            urls[name] = url
+            # Старый адрес без хэша — для уже открытых страниц
+            assets[name] = Asset(body, content_type, CACHE_REVALIDATE, asset.encoded)
+
+        html = self._read("index.html")
+        if html is not None:
+            text = html.decode("utf-8")
+            for name, url in urls.items():
+                text = re.sub(
+                    rf'(\b(?:href|src)=["\']){re.escape(name)}(["\'])',
+                    rf"\g<1>{url}\g<2>",
+                    text,
+                )
+            self.index_html = text
+            assets["index.html"] = Asset(text.encode("utf-8"), CONTENT_TYPES[".html"], CACHE_REVALIDATE)
+
+        self.assets, self.loaded = assets, True
+        logger.info(
+            "Статика загружена: %s",
+            ", ".join(f"{n} ({len(a.body)} Б, {', '.join(a.encoded) or 'без сжатия'})"
+                      for n, a in assets.items() if not n.startswith("assets/"))
+        )
+
+    def get(self, name: str) -> Optional[Asset]:
+        if not self.loaded:
+            self.load()
+        return self.assets.get(name)
+
+    def render_index(self, bootstrap_json: bytes) -> str:
+        """index.html со встроенными стартовыми данными (window.__BOOTSTRAP__)"""
+        if not self.loaded:
+            self.load()
+        # Экранируем то, что может закрыть <script> или сломать JS-строку
+        payload = (
+            bootstrap_json.decode("utf-8")
+            .replace("<", "\\u003c")
+            .replace(">", "\\u003e")
+            .replace("&", "\\u0026")
+            .replace("\u2028", "\\u2028")
+            .replace("\u2029", "\\u2029")
+        )
+        script = f"<script>window.__BOOTSTRAP__ = {payload};</script>\n"
+        return self.index_html.replace("</head>", script + "</head>", 1)
+
+    def response(self, request: Request, asset: Asset) -> Response:
+        """Ответ с учётом Accept-Encoding и If-None-Match"""
+        accept = request.headers.get("accept-encoding", "")
+        encoding = None
+        if "br" in asset.encoded and "br" in accept:
+            encoding = "br"
+        elif "gzip" in asset.encoded and "gzip" in accept:
+            encoding = "gzip"
+
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+
+        if asset.matches(request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=headers)
+
+        body = asset.body
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            body = asset.encoded[encoding]
+        return Response(content=body, media_type=asset.content_type, headers=headers)
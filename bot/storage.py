@@ -0,0 +1,43 @@
+# Файл: bot/storage.py
+"""
+Хранилище FSM aiogram в SQLite.
+
+MemoryStorage живёт внутри процесса: при нескольких воркерах следующий
+апдейт пользователя может попасть в другой процесс и «забыть» состояние
+диалога. SQLiteStorage хранит состояние и данные в таблице fsm_storage
+той же базы, поэтому видно всем процессам.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from bot import database as db
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM-хранилище поверх bot.database"""
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value: Optional[str] = state.state if isinstance(state, State) else state
+        await db.set_fsm_state(self._key(key), value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await db.get_fsm_record(self._key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await db.set_fsm_data(self._key(key), json.dumps(data, ensure_ascii=False) if data else None)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await db.get_fsm_record(self._key(key))
+        return json.loads(data) if data else {}
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,282 @@
+# Файл: bot/tracing.py
+"""
+Лёгкая трассировка: спаны от webhook до хэндлера, базы и Bot API.
+
+Текущий спан хранится в contextvar, поэтому вложенные вызовы в той же
+задаче asyncio (middleware, функции bot/database.py, запросы к Bot API)
+становятся его потомками без передачи контекста вручную. Между
+webhook и пулом обработчиков контекст передаётся вместе с апдейтом в
+очереди (bot/updates.py).
+
+Решение о записи принимается в корне трассы: доля TRACE_SAMPLE_RATE
+плюс апдейты пользователей из TRACE_USER_IDS. У невыбранной трассы
+потомки не создаются — остаётся одна проверка contextvar.
+
+Готовые спаны копятся в буфере и раз в несколько секунд выгружаются в
+формате OTLP/JSON: строкой в файл TRACE_FILE (как file exporter
+коллектора OpenTelemetry) и, если задан TRACE_OTLP_ENDPOINT, запросом
+POST в коллектор OTLP/HTTP.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Union
+
+import aiohttp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from bot.config import TRACE_SAMPLE_RATE, TRACE_FILE, TRACE_OTLP_ENDPOINT
+
+logger = logging.getLogger(__name__)
+
+# Виды спанов OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+BUFFER_LIMIT = 10_000
+EXPORT_INTERVAL = 5.0
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind",
+                 "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int,
+                 attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+# Маркер невыбранной трассы: потомки ничего не записывают
+_UNSAMPLED = object()
+# Маркер «взять родителя из контекста»
+_CURRENT = object()
+
+_current_span: ContextVar[Union[Span, object, None]] = ContextVar("trace_span", default=None)
+
+_buffer: List[Span] = []
+_dropped = 0
+
+
+def current_span() -> Union[Span, object, None]:
+    """Контекст для передачи в другую задачу: span(..., parent=current_span())"""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, parent: Any = _CURRENT, sample: bool = False,
+         kind: int = KIND_INTERNAL, **attributes: Any):
+    """
+    Спан на время блока; возвращает Span или None, если трасса не пишется.
+    sample=True записывает корневую трассу независимо от доли
+    """
+    if parent is _CURRENT:
+        parent = _current_span.get()
+
+    if parent is _UNSAMPLED:
+        yield None
+        return
+
+    if parent is None and not (sample or (TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE)):
+        token = _current_span.set(_UNSAMPLED)
+        try:
+            yield None
+        finally:
+            _current_span.reset(token)
+        return
+
+    current = Span(
+        name,
+        trace_id=parent.trace_id if parent is not None else os.urandom(16).hex(),
+        parent_id=parent.span_id if parent is not None else None,
+        kind=kind,
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        _record(current)
+
+
+def _record(finished: Span) -> None:
+    global _dropped
+    if len(_buffer) >= BUFFER_LIMIT:
+        _dropped += 1
+        return
+    _buffer.append(finished)
+
+
+# ==================== ИНСТРУМЕНТИРОВАНИЕ ====================
+
+def trace_functions(namespace: Dict[str, object], prefix: str) -> None:
+    """Спан на каждый вызов публичной async-функции модуля (имя — prefix + функция)"""
+    module = namespace["__name__"]
+    for name, function in list(namespace.items()):
+        if (name.startswith("_") or not inspect.iscoroutinefunction(function)
+                or function.__module__ != module):
+            continue
+        namespace[name] = _traced(function, prefix + name)
+
+
+def _traced(function, span_name: str):
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        # Вне трассы — без спана (не начинаем корневую трассу с запроса к базе)
+        parent = _current_span.get()
+        if parent is None or parent is _UNSAMPLED:
+            return await function(*args, **kwargs)
+        with span(span_name, parent=parent, kind=KIND_CLIENT):
+            return await function(*args, **kwargs)
+
+    return wrapper
+
+
+class TracingMiddleware:
+    """ASGI-middleware: корневой спан на HTTP-запрос"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with span(f"{scope['method']} {scope['path']}", kind=KIND_SERVER) as current:
+            if current is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    current.set("http.status_code", message["status"])
+                await send(message)
+
+            current.set("http.method", scope["method"])
+            current.set("http.target", scope["path"])
+            await self.app(scope, receive, send_wrapper)
+
+
+# ==================== ВЫГРУЗКА ====================
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp(spans: List[Span]) -> Dict[str, Any]:
+    """Пакет спанов в формате OTLP/JSON (ExportTraceServiceRequest)"""
+    encoded = []
+    for item in spans:
+        data = {
+            "traceId": item.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": item.kind,
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns),
+            "attributes": [_attribute(key, value) for key, value in item.attributes.items()],
+        }
+        if item.parent_id:
+            data["parentSpanId"] = item.parent_id
+        if item.error:
+            data["status"] = {"code": 2, "message": item.error}
+        encoded.append(data)
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            _attribute("service.name", "telegram-crm"),
+            _attribute("process.pid", os.getpid()),
+        ]},
+        "scopeSpans": [{"scope": {"name": "bot.tracing"}, "spans": encoded}],
+    }]}
+
+
+def _write_line(path: str, line: str) -> None:
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(line + "\n")
+
+
+async def flush() -> int:
+    """Выгрузить накопленные спаны; возвращает их число"""
+    global _buffer, _dropped
+    if not _buffer:
+        return 0
+    spans, _buffer = _buffer, []
+    if _dropped:
+        logger.warning(f"Буфер трассировки переполнен, потеряно спанов: {_dropped}")
+        _dropped = 0
+
+    line = json.dumps(_otlp(spans), ensure_ascii=False, separators=(",", ":"))
+    if TRACE_FILE:
+        await asyncio.to_thread(_write_line, TRACE_FILE, line)
+    if TRACE_OTLP_ENDPOINT:
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    TRACE_OTLP_ENDPOINT,
+                    data=line,
+                    headers={"Content-Type": "application/json"},
+                    timeout=aiohttp.ClientTimeout(total=10),
+                ) as response:
+                    if response.status >= 400:
+                        logger.error(f"Коллектор трасс ответил {response.status}")
+        except Exception as e:
+            logger.error(f"Ошибка выгрузки трасс: {e}")
+    return len(spans)
+
+
+class TraceExporter:
+    """Фоновая выгрузка раз в interval секунд; при остановке — последняя"""
+
+    def __init__(self, interval: float = EXPORT_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await flush()
+            except Exception as e:
+                logger.error(f"Ошибка выгрузки трасс: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await flush()
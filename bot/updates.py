@@ -0,0 +1,152 @@
+# Файл: bot/updates.py
+"""
+Очередь апдейтов Telegram и пул обработчиков.
+
+Webhook кладёт апдейт в очередь и сразу отвечает Telegram — долгий
+обработчик (запросы к Bot API, запись в базу) не держит соединение и не
+вызывает повторную доставку. В режиме polling одна задача получает
+апдейты через getUpdates и кладёт их в ту же очередь. Вместе с
+апдейтом в очередь попадает текущий спан трассировки — обработка
+продолжает трассу webhook-запроса.
+
+Очередь разбита на шарды по чату: апдейты одного чата обрабатывает один
+обработчик строго по порядку (иначе FSM-диалог мог бы перескочить шаг),
+а разные чаты обрабатываются параллельно.
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+from bot import tracing
+from bot.config import TRACE_USER_IDS
+from bot.metrics import BOT_UPDATE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """workers обработчиков, у каждого своя очередь на maxsize апдейтов"""
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, workers: int = 8, maxsize: int = 1000):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self._queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=max(1, maxsize // workers)) for _ in range(workers)
+        ]
+        self._workers: List[asyncio.Task] = []
+        self._polling: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _shard_key(update: Update) -> int:
+        chat, user, _ = UserContextMiddleware.resolve_event_context(update)
+        if chat is not None:
+            return chat.id
+        if user is not None:
+            return user.id
+        return update.update_id
+
+    @staticmethod
+    def _user_id(update: Update) -> Optional[int]:
+        _, user, _ = UserContextMiddleware.resolve_event_context(update)
+        return user.id if user is not None else None
+
+    @staticmethod
+    def _event_type(update: Update) -> str:
+        try:
+            return update.event_type
+        except Exception:
+            return "unknown"
+
+    def qsize(self) -> int:
+        """Сколько апдейтов ждут обработки во всех шардах"""
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def put(self, update: Update) -> None:
+        """В очередь чата; если она полна — ждём (обратное давление на источник)"""
+        queue = self._queues[self._shard_key(update) % len(self._queues)]
+        await queue.put((update, tracing.current_span()))
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            update, parent = await queue.get()
+            started = time.perf_counter()
+            event_type = self._event_type(update)
+            user_id = self._user_id(update)
+            # Апдейты отмеченных пользователей пишутся, даже если webhook-запрос не выбран
+            forced = user_id in TRACE_USER_IDS
+            if forced and not isinstance(parent, tracing.Span):
+                parent = None
+            try:
+                with tracing.span(
+                    f"update {event_type}", parent=parent, sample=forced,
+                    **{"update.id": update.update_id, "update.type": event_type, "user.id": user_id or 0},
+                ):
+                    await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Ошибка обработки апдейта {update.update_id}: {e}")
+            finally:
+                BOT_UPDATE_SECONDS.observe(time.perf_counter() - started, event_type)
+                queue.task_done()
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Остановить polling, дообработать очередь (не дольше timeout) и остановить пул"""
+        await self.stop_polling()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Не все апдейты обработаны до остановки")
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    # ==================== LONG POLLING ====================
+
+    async def _poll(self, timeout: int) -> None:
+        offset = None
+        backoff = 1.0
+        allowed_updates = self.dispatcher.resolve_used_update_types()
+
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=offset,
+                    timeout=timeout,
+                    allowed_updates=allowed_updates,
+                    request_timeout=timeout + 10,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка getUpdates: {e}, повтор через {backoff:.0f} с")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+
+            backoff = 1.0
+            for update in updates:
+                await self.put(update)
+                offset = update.update_id + 1
+
+    def start_polling(self, timeout: int = 30) -> None:
+        if self._polling is None:
+            self._polling = asyncio.create_task(self._poll(timeout))
+
+    async def stop_polling(self) -> None:
+        if self._polling is not None:
+            self._polling.cancel()
+            try:
+                await self._polling
+            except asyncio.CancelledError:
+                pass
+            self._polling = None
@@ -1,3 +0,0 @@
-"""
-Пакет бота
-"""
\ No newline at end of file
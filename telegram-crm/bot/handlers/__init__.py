@@ -1,13 +0,0 @@
-"""
-Инициализация обработчиков
-"""
-
-from bot.handlers import start, tasks, workspaces, reminders
-
-# Список всех роутеров
-routers = [
-    start.router,
-    workspaces.router,
-    tasks.router,
-    reminders.router,
-]
\ No newline at end of file
@@ -2,6 +2,8 @@
 
 const tg = window.Telegram?.WebApp;
 let userId = null;
+let sessionToken = null;
+let sessionPromise = null;
 let userData = null;
 let currentWorkspaceId = null;
 let currentTask = null;
@@ -12,6 +14,15 @@ let currentDate = new Date();
 let selectedDate = null;
 let currentFilter = 'all';
 let isEditing = false;
+let autocompleteTimer = null;
+let currentPage = 'home';
+// Ответы /calendar текущего пространства по месяцам; главная и календарь
+// строятся по ним, без полного списка задач
+let calendarMonths = {};
+let calendarRequests = {};
+let calendarGeneration = 0;
+// Доска со всеми задачами нужна только странице «Задачи»
+let boardWorkspaceId = null;
 
 // ==================== ИНИЦИАЛИЗАЦИЯ ====================
 
@@ -32,83 +43,180 @@ async function init() {
         }
     }
     
-    // Для тестирования без Telegram
-    if (!userId) {
-        userId = 487593106; // Ваш telegram_id
+    // Без подписанного initData сервер не выдаст сессию
+    if (!tg?.initData || !userId) {
+        showToast('⚠️ Откройте приложение из Telegram', 'warning');
+        return;
     }
     
     console.log('Init with userId:', userId);
+    ensureSession().catch(error => console.error('Session error:', error));
     
     updateCurrentDate();
-    await loadUserData();
+    
+    // Стартовые данные, встроенные сервером в страницу, — без лишнего запроса
+    const bootstrap = window.__BOOTSTRAP__;
+    if (bootstrap && String(bootstrap.user?.telegram_id) === String(userId)) {
+        await applyUserData(bootstrap);
+    } else {
+        await loadUserData();
+    }
     setupEventListeners();
     renderCalendar();
 }
 
+// ==================== СЕССИЯ ====================
+
+// Сервер проверяет подпись initData и выдаёт токен для всех запросов к API
+async function createSession() {
+    const response = await fetch('/api/session', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ init_data: tg.initData })
+    });
+    if (!response.ok) throw new Error(`Session: ${response.status}`);
+    
+    const data = await response.json();
+    sessionToken = data.token;
+    userId = data.user.telegram_id;
+    return data;
+}
+
+function ensureSession() {
+    if (!sessionPromise) {
+        sessionPromise = createSession().catch(error => {
+            sessionPromise = null;
+            throw error;
+        });
+    }
+    return sessionPromise;
+}
+
+// Запрос к API с токеном; истёкший токен обновляется один раз
+async function apiFetch(url, options = {}, renew = true) {
+    await ensureSession();
+    const headers = { ...(options.headers || {}), 'Authorization': `Bearer ${sessionToken}` };
+    const response = await fetch(url, { ...options, headers });
+    if (response.status === 401 && renew) {
+        sessionPromise = null;
+        return apiFetch(url, options, false);
+    }
+    return response;
+}
+
 // ==================== ЗАГРУЗКА ДАННЫХ ====================
 
 async function loadUserData() {
     try {
         console.log('Loading user data for:', userId);
-        const response = await fetch(`/api/user/${userId}`);
+        // Пользователь, пространства, статистика и личная доска — одним запросом
+        const response = await apiFetch(`/api/bootstrap/${userId}`);
         if (!response.ok) {
             console.error('Failed to load user:', response.status);
             return;
         }
         
         const data = await response.json();
-        userData = data;
         console.log('User data loaded:', data);
-        
-        const name = tg?.initDataUnsafe?.user?.first_name || data.user.full_name || 'Друг';
-        document.getElementById('greeting').textContent = `👋 Привет, ${name}!`;
-        
-        document.getElementById('profile-name').textContent = data.user.full_name || 'Пользователь';
-        document.getElementById('profile-username').textContent = data.user.username ? `@${data.user.username}` : '';
-        
-        updateStats(data.stats);
-        
-        document.getElementById('profile-total').textContent = data.stats.total;
-        document.getElementById('profile-done').textContent = data.stats.done;
-        
-        const personal = data.workspaces.find(w => w.is_personal);
-        if (personal) {
-            currentWorkspaceId = personal.id;
-            console.log('Current workspace:', currentWorkspaceId);
-            await loadWorkspace(personal.id);
-        }
-        
-        renderWorkspaces(data.workspaces);
-        updateAchievements(data.stats.done);
+        await applyUserData(data);
         
     } catch (error) {
         console.error('Error loading user:', error);
     }
 }
 
+async function applyUserData(data) {
+    userData = data;
+    
+    const name = tg?.initDataUnsafe?.user?.first_name || data.user.full_name || 'Друг';
+    document.getElementById('greeting').textContent = `👋 Привет, ${name}!`;
+    
+    document.getElementById('profile-name').textContent = data.user.full_name || 'Пользователь';
+    document.getElementById('profile-username').textContent = data.user.username ? `@${data.user.username}` : '';
+    
+    const personalId = data.user.personal_workspace_id
+        || data.workspaces.find(w => w.is_personal)?.id;
+    if (personalId) {
+        currentWorkspaceId = personalId;
+        console.log('Current workspace:', currentWorkspaceId);
+        // Личная доска приходит в стартовых данных; иначе — при открытии «Задач»
+        if (data.board && data.board.workspace.id === personalId) {
+            applyBoard(data.board);
+        }
+        loadHome();
+    }
+    
+    applyUserStats(data);
+}
+
+function applyUserStats(data) {
+    updateStats(data.stats);
+    document.getElementById('profile-total').textContent = data.stats.total;
+    document.getElementById('profile-done').textContent = data.stats.done;
+    renderWorkspaces(data.workspaces);
+    updateAchievements(data.stats.done);
+}
+
+// Статистика и пространства без доски — после изменений
+async function loadUserStats() {
+    try {
+        const response = await apiFetch(`/api/user/${userId}`);
+        if (!response.ok) return;
+        applyUserStats(await response.json());
+    } catch (error) {
+        console.error('Error loading stats:', error);
+    }
+}
+
+// После изменения задачи: главная и календарь заново из /calendar,
+// доска — только если открыта страница «Задачи», иначе при её открытии
+async function refreshWorkspace() {
+    resetCalendar();
+    let board = null;
+    if (currentPage === 'tasks') {
+        board = loadWorkspace(currentWorkspaceId);
+    } else {
+        boardWorkspaceId = null;
+    }
+    await Promise.all([loadUserStats(), loadHome(), board]);
+    renderCalendar();
+}
+
 async function loadWorkspace(workspaceId) {
     try {
         console.log('Loading workspace:', workspaceId);
-        const response = await fetch(`/api/workspace/${workspaceId}`);
+        const response = await apiFetch(`/api/workspace/${workspaceId}`);
         if (!response.ok) return;
         
-        const data = await response.json();
-        allTasks = data.tasks || [];
-        allMembers = data.members || [];
-        
-        console.log('Loaded tasks:', allTasks.length);
-        
-        renderBoard(data.funnels);
-        renderTaskList(allTasks);
-        renderTodayTasks();
-        renderUrgentTasks();
-        renderCalendar();
+        applyBoard(await response.json());
         
     } catch (error) {
         console.error('Error loading workspace:', error);
     }
 }
 
+function applyBoard(data) {
+    boardWorkspaceId = data.workspace.id;
+    allTasks = data.tasks || [];
+    allMembers = data.members || [];
+    
+    console.log('Loaded tasks:', allTasks.length);
+    
+    renderBoard(data.funnels);
+    renderTaskList(allTasks);
+}
+
+// Задача из доски, календаря или срочных — доска может быть не загружена
+function findTask(taskId) {
+    const lists = boardWorkspaceId === currentWorkspaceId ? [allTasks] : [];
+    Object.values(calendarMonths).forEach(month => lists.push(month.tasks, month.urgent.tasks));
+    for (const list of lists) {
+        const task = list.find(t => t.id === taskId);
+        if (task) return task;
+    }
+    return null;
+}
+
 // ==================== СТАТИСТИКА ====================
 
 function updateStats(stats) {
@@ -144,6 +252,7 @@ function renderBoard(funnels) {
     funnel.stages.forEach(stage => {
         const column = document.createElement('div');
         column.className = 'column';
+        column.dataset.stageId = stage.id;
         column.innerHTML = `
             <div class="column-header">
                 <span class="column-title">${stage.name}</span>
@@ -153,17 +262,142 @@ function renderBoard(funnels) {
                 ${stage.tasks.map(task => renderTaskCard(task)).join('')}
             </div>
         `;
+        setupColumnDrop(column);
         board.appendChild(column);
     });
 }
 
+// ==================== ПЕРЕТАСКИВАНИЕ ЗАДАЧ ====================
+
+let draggedTaskId = null;
+
+function onTaskDragStart(event, taskId) {
+    draggedTaskId = taskId;
+    event.dataTransfer.effectAllowed = 'move';
+    event.currentTarget.classList.add('dragging');
+}
+
+function onTaskDragEnd(event) {
+    event.currentTarget.classList.remove('dragging');
+    draggedTaskId = null;
+}
+
+// Карточка, после которой окажется задача (null — в начало колонки)
+function cardBefore(container, y) {
+    let before = null;
+    container.querySelectorAll('.task-card:not(.dragging)').forEach(card => {
+        const box = card.getBoundingClientRect();
+        if (y > box.top + box.height / 2) before = card;
+    });
+    return before;
+}
+
+function setupColumnDrop(column) {
+    const container = column.querySelector('.column-tasks');
+    
+    container.addEventListener('dragover', event => {
+        if (draggedTaskId === null) return;
+        event.preventDefault();
+        const dragging = document.querySelector('.task-card.dragging');
+        const before = cardBefore(container, event.clientY);
+        if (before) before.after(dragging);
+        else container.prepend(dragging);
+    });
+    
+    container.addEventListener('drop', async event => {
+        if (draggedTaskId === null) return;
+        event.preventDefault();
+        const taskId = draggedTaskId;
+        const before = cardBefore(container, event.clientY);
+        await moveTask(taskId, column.dataset.stageId, before ? before.dataset.taskId : null);
+    });
+}
+
+// На сенсорных экранах HTML5 drag-and-drop не работает: там перетаскивание
+// начинается долгим нажатием на карточку и идёт по событиям pointer
+const LONG_PRESS_MS = 400;
+let touchDrag = null;
+let pressTimer = null;
+let suppressClick = false;
+
+function onTaskPointerDown(event, taskId) {
+    if (event.pointerType !== 'touch') return;
+    const card = event.currentTarget;
+    clearTimeout(pressTimer);
+    pressTimer = setTimeout(() => {
+        touchDrag = { taskId, card, container: card.parentElement };
+        draggedTaskId = taskId;
+        card.classList.add('dragging');
+        tg?.HapticFeedback?.impactOccurred('medium');
+    }, LONG_PRESS_MS);
+}
+
+document.addEventListener('pointermove', event => {
+    if (!touchDrag) return;
+    const target = document.elementFromPoint(event.clientX, event.clientY);
+    const container = target && target.closest('.column-tasks');
+    if (!container) return;
+    const before = cardBefore(container, event.clientY);
+    if (before) before.after(touchDrag.card);
+    else container.prepend(touchDrag.card);
+    touchDrag.container = container;
+});
+
+// Пока карточку тащат, страница не прокручивается
+document.addEventListener('touchmove', event => {
+    if (touchDrag) event.preventDefault();
+}, { passive: false });
+
+async function finishTouchDrag(event) {
+    clearTimeout(pressTimer);
+    if (!touchDrag) return;
+    const { taskId, card, container } = touchDrag;
+    touchDrag = null;
+    draggedTaskId = null;
+    card.classList.remove('dragging');
+    if (event.type === 'pointercancel') {
+        await loadWorkspace(currentWorkspaceId);
+        return;
+    }
+    suppressClick = true;
+    const before = card.previousElementSibling;
+    await moveTask(taskId, container.closest('.column').dataset.stageId, before ? before.dataset.taskId : null);
+}
+
+document.addEventListener('pointerup', finishTouchDrag);
+document.addEventListener('pointercancel', finishTouchDrag);
+
+// Отпускание после перетаскивания не открывает карточку
+document.addEventListener('click', event => {
+    if (!suppressClick) return;
+    suppressClick = false;
+    event.stopPropagation();
+    event.preventDefault();
+}, true);
+
+async function moveTask(taskId, stageId, afterId) {
+    // Сервер меняет одну строку: ключ порядка между соседями
+    const query = afterId ? `?after_id=${afterId}` : '';
+    try {
+        const response = await apiFetch(`/api/task/${taskId}/move/${stageId}${query}`, { method: 'POST' });
+        if (!response.ok) showToast('❌ Не удалось переместить', 'error');
+    } catch (error) {
+        console.error('Move error:', error);
+        showToast('❌ Ошибка', 'error');
+    }
+    await loadWorkspace(currentWorkspaceId);
+}
+
 function renderTaskCard(task) {
     const isDone = task.status === 'done';
     const assignee = task.assigned_username ? `@${task.assigned_username}` : '';
     const dueDate = task.due_date ? formatDueDate(task.due_date) : '';
     
     return `
-        <div class="task-card ${isDone ? 'done' : ''} priority-${task.priority}" onclick="showTask(${task.id})">
+        <div class="task-card ${isDone ? 'done' : ''} priority-${task.priority}" data-task-id="${task.id}"
+             draggable="true" ondragstart="onTaskDragStart(event, ${task.id})" ondragend="onTaskDragEnd(event)"
+             onpointerdown="onTaskPointerDown(event, ${task.id})"
+             onclick="showTask(${task.id})">
             <div class="task-card-title">${escapeHtml(task.title)}</div>
             <div class="task-card-meta">
                 ${dueDate ? `<span class="task-due">📅 ${dueDate}</span>` : ''}
@@ -218,14 +452,20 @@ function renderTaskItem(task) {
     `;
 }
 
-function renderTodayTasks() {
+// Главная: задачи со сроком сегодня и срочные — из ответа /calendar за текущий месяц
+async function loadHome() {
+    const data = await loadCalendar(monthKey(new Date()));
+    if (!data) return;
+    renderTodayTasks(data.tasks);
+    renderUrgentTasks(data.urgent);
+}
+
+function renderTodayTasks(monthTasks) {
     const container = document.getElementById('today-tasks');
-    const today = new Date().toISOString().split('T')[0];
+    const now = new Date();
+    const today = `${monthKey(now)}-${String(now.getDate()).padStart(2, '0')}`;
     
-    const todayTasks = allTasks.filter(t => {
-        return (t.due_date === today || new Date(t.created_at).toDateString() === new Date().toDateString()) 
-               && t.status !== 'done';
-    });
+    const todayTasks = monthTasks.filter(t => (t.due_date || '').slice(0, 10) === today && t.status !== 'done');
     
     document.getElementById('today-count').textContent = todayTasks.length;
     
@@ -237,18 +477,18 @@ function renderTodayTasks() {
     container.innerHTML = todayTasks.slice(0, 5).map(task => renderTaskItem(task)).join('');
 }
 
-function renderUrgentTasks() {
+function renderUrgentTasks(urgent) {
     const container = document.getElementById('urgent-tasks');
-    const urgentTasks = allTasks.filter(t => t.priority === 'high' && t.status !== 'done');
     
-    document.getElementById('urgent-count').textContent = urgentTasks.length;
+    document.getElementById('urgent-count').textContent = urgent.count;
     
-    if (urgentTasks.length === 0) {
+    if (urgent.count === 0) {
         container.innerHTML = '<div class="empty-state"><span class="empty-icon">😌</span><span>Нет срочных задач</span></div>';
         return;
     }
     
-    container.innerHTML = urgentTasks.slice(0, 5).map(task => renderTaskItem(task)).join('');
+    // Сервер присылает первые пять по сроку
+    container.innerHTML = urgent.tasks.map(task => renderTaskItem(task)).join('');
 }
 
 function renderWorkspaces(workspaces) {
@@ -271,6 +511,47 @@ function renderWorkspaces(workspaces) {
 
 // ==================== КАЛЕНДАРЬ ====================
 
+function monthKey(date) {
+    return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
+}
+
+function calendarMonthKey() {
+    return monthKey(currentDate);
+}
+
+// Сбросить загруженные месяцы (другое пространство или изменились задачи)
+function resetCalendar() {
+    calendarGeneration++;
+    calendarMonths = {};
+    calendarRequests = {};
+}
+
+// Один запрос на месяц, даже если его одновременно ждут главная и календарь
+function loadCalendar(month) {
+    if (!currentWorkspaceId) return Promise.resolve(null);
+    if (calendarMonths[month]) return Promise.resolve(calendarMonths[month]);
+    if (calendarRequests[month]) return calendarRequests[month];
+    
+    const generation = calendarGeneration;
+    const request = apiFetch(`/api/workspace/${currentWorkspaceId}/calendar?month=${month}`)
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            // Ответ устарел, если пространство сменилось или задачи изменились
+            if (!data || generation !== calendarGeneration) return null;
+            calendarMonths[month] = data;
+            return data;
+        })
+        .catch(error => {
+            console.error('Error loading calendar:', error);
+            return null;
+        })
+        .finally(() => {
+            if (calendarRequests[month] === request) delete calendarRequests[month];
+        });
+    calendarRequests[month] = request;
+    return request;
+}
+
 function renderCalendar() {
     const grid = document.getElementById('calendar-grid');
     const monthLabel = document.getElementById('cal-month');
@@ -278,6 +559,16 @@ function renderCalendar() {
     const year = currentDate.getFullYear();
     const month = currentDate.getMonth();
     
+    const data = calendarMonths[calendarMonthKey()];
+    if (!data) {
+        const month = calendarMonthKey();
+        loadCalendar(month).then(() => {
+            // Пользователь мог успеть переключить месяц
+            if (calendarMonths[month] && month === calendarMonthKey()) renderCalendar();
+        });
+    }
+    const days = data ? data.days : {};
+    
     const monthNames = ['Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь', 
                         'Июль', 'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'];
     monthLabel.textContent = `${monthNames[month]} ${year}`;
@@ -302,7 +593,7 @@ function renderCalendar() {
         const dateStr = `${year}-${String(month + 1).padStart(2, '0')}-${String(day).padStart(2, '0')}`;
         const isToday = today.getDate() === day && today.getMonth() === month && today.getFullYear() === year;
         
-        const hasTasks = allTasks.some(t => t.due_date === dateStr);
+        const hasTasks = (days[dateStr]?.tasks || 0) > 0;
         
         const classes = ['calendar-day'];
         if (isToday) classes.push('today');
@@ -336,7 +627,7 @@ function selectDate(dateStr, day) {
     selectedDate = dateStr;
     renderCalendar();
     
-    const dayTasks = allTasks.filter(t => t.due_date === dateStr);
+    const dayTasks = (calendarMonths[calendarMonthKey()]?.tasks || []).filter(t => t.due_date === dateStr);
     
     const monthNames = ['января', 'февраля', 'марта', 'апреля', 'мая', 'июня', 
                         'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря'];
@@ -369,6 +660,11 @@ function updateAchievements(doneCount) {
 // ==================== НАВИГАЦИЯ ====================
 
 function switchPage(pageName) {
+    currentPage = pageName;
+    if (pageName === 'tasks' && currentWorkspaceId && boardWorkspaceId !== currentWorkspaceId) {
+        loadWorkspace(currentWorkspaceId);
+    }
+    
     document.querySelectorAll('.page').forEach(p => p.classList.remove('active'));
     document.getElementById(`page-${pageName}`).classList.add('active');
     
@@ -384,8 +680,11 @@ function switchPage(pageName) {
 
 async function switchWorkspace(workspaceId) {
     currentWorkspaceId = workspaceId;
+    resetCalendar();
     await loadWorkspace(workspaceId);
     switchPage('tasks');
+    loadHome();
+    renderCalendar();
     showToast('✅ Пространство выбрано');
 }
 
@@ -418,6 +717,35 @@ function setupEventListeners() {
             selectedPriority = btn.dataset.priority;
         });
     });
+    
+    const assigneeEl = document.getElementById('task-assignee');
+    if (assigneeEl) {
+        assigneeEl.addEventListener('input', () => {
+            clearTimeout(autocompleteTimer);
+            autocompleteTimer = setTimeout(() => loadAssigneeSuggestions(assigneeEl.value), 150);
+        });
+    }
+}
+
+async function loadAssigneeSuggestions(value) {
+    const query = value.replace('@', '').trim();
+    const datalist = document.getElementById('assignee-suggestions');
+    if (!datalist || !query) return;
+    
+    try {
+        const params = new URLSearchParams({ q: query });
+        if (currentWorkspaceId) params.set('workspace_id', currentWorkspaceId);
+        const response = await apiFetch(`/api/users/autocomplete?${params}`);
+        if (!response.ok) return;
+        
+        const data = await response.json();
+        datalist.innerHTML = data.users
+            .filter(u => u.username)
+            .map(u => `<option value="@${escapeHtml(u.username)}">${escapeHtml(u.full_name || '')}</option>`)
+            .join('');
+    } catch (error) {
+        console.error('Autocomplete error:', error);
+    }
 }
 
 // ==================== МОДАЛЬНЫЕ ОКНА ====================
@@ -451,7 +779,7 @@ function showAddTask() {
 }
 
 function editTask(taskId) {
-    const task = allTasks.find(t => t.id === taskId);
+    const task = findTask(taskId);
     if (!task) return;
     
     isEditing = true;
@@ -481,7 +809,7 @@ function editTask(taskId) {
 }
 
 function showTask(taskId) {
-    const task = allTasks.find(t => t.id === taskId);
+    const task = findTask(taskId);
     if (!task) return;
     
     currentTask = task;
@@ -525,6 +853,28 @@ function closeModal() {
     isEditing = false;
 }
 
+// ==================== ЗАПРОСЫ С ПОВТОРОМ ====================
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+// Повтор при обрыве сети и ответах 5xx. Все попытки идут с одним
+// Idempotency-Key, поэтому сервер не создаст задачу дважды
+async function fetchWithRetry(url, options = {}, attempts = 3) {
+    const headers = { ...(options.headers || {}), 'Idempotency-Key': newIdempotencyKey() };
+    for (let attempt = 1; ; attempt++) {
+        try {
+            const response = await apiFetch(url, { ...options, headers });
+            if (response.status < 500 || attempt >= attempts) return response;
+        } catch (error) {
+            if (attempt >= attempts) throw error;
+        }
+        await new Promise(resolve => setTimeout(resolve, 500 * 2 ** (attempt - 1)));
+    }
+}
+
 // ==================== ДЕЙСТВИЯ С ЗАДАЧАМИ ====================
 
 async function saveTask() {
@@ -574,14 +924,14 @@ async function saveTask() {
         
         if (isEditing && currentTask) {
             console.log('Updating task:', currentTask.id);
-            response = await fetch(`/api/task/${currentTask.id}`, {
+            response = await fetchWithRetry(`/api/task/${currentTask.id}`, {
                 method: 'PUT',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(body)
             });
         } else {
             console.log('Creating task in workspace:', currentWorkspaceId);
-            response = await fetch(`/api/tasks/${currentWorkspaceId}/${userId}`, {
+            response = await fetchWithRetry(`/api/tasks/${currentWorkspaceId}/${userId}`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(body)
@@ -592,7 +942,7 @@ async function saveTask() {
         
         if (response.ok) {
             closeModal();
-            await loadUserData();
+            await refreshWorkspace();
             showToast(isEditing ? '✅ Задача обновлена!' : '✅ Задача создана!');
         } else {
             const error = await response.json();
@@ -607,9 +957,9 @@ async function saveTask() {
 
 async function toggleTask(taskId) {
     try {
-        const response = await fetch(`/api/task/${taskId}/toggle`, { method: 'POST' });
+        const response = await fetchWithRetry(`/api/task/${taskId}/toggle`, { method: 'POST' });
         if (response.ok) {
-            await loadUserData();
+            await refreshWorkspace();
             showToast('✅ Статус изменён');
         }
     } catch (error) {
@@ -632,7 +982,7 @@ function editCurrentTask() {
 }
 
 function confirmDeleteTask(taskId) {
-    const task = allTasks.find(t => t.id === taskId);
+    const task = findTask(taskId);
     if (!task) return;
     
     currentTask = task;
@@ -644,10 +994,10 @@ async function confirmDelete() {
     if (!currentTask) return;
     
     try {
-        const response = await fetch(`/api/task/${currentTask.id}`, { method: 'DELETE' });
+        const response = await apiFetch(`/api/task/${currentTask.id}`, { method: 'DELETE' });
         if (response.ok) {
             closeModal();
-            await loadUserData();
+            await refreshWorkspace();
             showToast('🗑 Задача удалена');
         }
     } catch (error) {